@@ -5,6 +5,40 @@ citeflex/app.py
 Flask application for CiteFlex Unified.
 
 Version History:
+    2026-10-16: With the shared SQLite session backend the store is the source
+                of truth: get() reloads a session another worker has saved
+                since, and update() is a compare-and-set on the stored revision.
+                /api/update, /api/accept-reference and /api/select-citation
+                edit a copy and retry on a conflicting concurrent edit.
+    2026-10-16: /health reports rate limiter waits, rejections and 429 penalties.
+    2026-10-16: /health reports circuit breaker state, error rate and latency per upstream.
+    2026-10-16: /health reports AI response cache hits and dollars saved.
+    2026-10-16: process_author_date submits at most AUTHOR_DATE_WORKERS lookups at a
+                time (Pool.map_window) with per-citation and document timeouts.
+    2026-10-16: process_author_date runs lookups on the shared scheduler pool;
+                /health reports pool queue depth and utilization.
+    2026-10-16: /health reports doi_store counters.
+    2026-10-16: /health reports citation_cache hit/miss counters.
+    2026-10-16: /api/finalize-author-date edits document.xml through DocxPackage
+                instead of extracting the upload to a temp dir.
+    2026-10-16: /api/download streams the processed document from the blob store
+                with send_file (Range and ETag/If-None-Match support) instead of
+                loading the session's bytes per request.
+    2026-10-16: SessionManager storage backend is selectable with SESSION_BACKEND
+                ('file' or 'sqlite'). The SQLite backend is one WAL database shared
+                by all workers, so /api/update no longer retries session lookups.
+    2026-10-16: SessionManager reads only the session index at startup and loads
+                payloads on first get(); saved sessions are evicted LRU-first
+                beyond SESSION_MEMORY_BUDGET_MB.
+    2026-10-16: SessionManager uses striped per-session locks instead of one global
+                lock; disk I/O runs outside the critical section and expired-session
+                cleanup moved to a background sweeper thread.
+    2026-10-16: Added SessionManager.update() for multi-key writes under one lock and
+                one disk commit; /api/process, /api/process-author-date and
+                /api/update now use it.
+    2026-10-16: SessionManager persists per key via session_store.FileSessionStore.
+                Document bytes are written once as content-addressed blobs instead
+                of re-pickling the whole session on every set().
     2025-12-12: Added document topic extraction for AI context.
                 Extracts keywords from document body to help AI disambiguate
                 between authors with same name in different fields.
@@ -27,7 +61,7 @@ Version History:
                       Enhanced /api/process to return notes list for workbench UI
 
 FIXES APPLIED:
-1. Thread-safe session management with threading.Lock()
+1. Thread-safe session management with striped locks
 2. Session expiration (4 hours) to prevent memory leaks
 3. Periodic cleanup of expired sessions
 4. File-based persistence for sessions (survives deployments with Railway Volume)
@@ -38,10 +72,13 @@ FIXES APPLIED:
 """
 
 import os
+import io
 import uuid
 import time
+import hashlib
 import threading
 import pickle
+from collections import OrderedDict
 from pathlib import Path
 from datetime import datetime, timedelta
 from functools import wraps
@@ -53,6 +90,13 @@ from unified_router import get_citation, get_multiple_citations, get_parenthetic
 from formatters.base import get_formatter
 from document_processor import process_document
 from processors.topic_extractor import get_document_context
+from session_store import create_session_store, StaleSessionError
+from citation_cache import citation_cache
+from engines.doi_store import doi_store
+from engines.ai_cache import ai_cache
+import scheduler
+from circuit_breaker import breakers
+from engines.rate_limit import rate_limiter
 
 # =============================================================================
 # APP CONFIGURATION
@@ -76,10 +120,27 @@ class SessionManager:
     Thread-safe session manager with file-based persistence.
     
     Features:
-    1. Thread-safe with threading.Lock()
+    1. Thread-safe with striped locks keyed by session ID - requests for
+       different sessions don't contend on a single global lock
     2. Sessions expire after 4 hours
     3. Persists to disk - survives server restarts/deployments
     4. Requires Railway Volume mounted at /data for full persistence
+    5. Per-key persistence (session_store.py): set() writes only the changed
+       key; document bytes are stored once as content-addressed blobs
+    6. Disk I/O and (de)serialization happen outside the locks; a per-session
+       I/O lock keeps writes to the same session in order
+    7. Expired sessions are cleaned up by a background sweeper thread
+    8. Lazy loading: startup reads only the session index; payloads are
+       loaded on first get(). Saved sessions beyond the memory budget
+       (SESSION_MEMORY_BUDGET_MB) are evicted least-recently-used first
+    9. Pluggable backend (SESSION_BACKEND): 'file' (default) or 'sqlite' -
+       a single WAL-mode database shared by all gunicorn workers
+    10. get_document() locates a document blob on disk so downloads can be
+        streamed without loading the session into memory
+    11. With a backend shared by all workers (sqlite), the store is the source
+        of truth: each get() compares the in-memory copy's revision with the
+        store's and reloads it if another worker saved since; saves are
+        compare-and-set, so a stale copy never overwrites newer edits
     
     Setup for Railway:
     1. Go to your service in Railway
@@ -90,19 +151,32 @@ class SessionManager:
     
     SESSION_EXPIRY_HOURS = 4
     CLEANUP_INTERVAL_MINUTES = 15
+    LOCK_STRIPES = 16
+    UPDATE_ATTEMPTS = 3  # update() re-applies its fields after losing a save race
+    MEMORY_BUDGET_MB = int(os.environ.get('SESSION_MEMORY_BUDGET_MB', '256'))
+    BACKEND = os.environ.get('SESSION_BACKEND', 'file')
     
     def __init__(self, storage_dir: Path = SESSIONS_DIR):
         self._sessions = {}
-        self._lock = threading.Lock()
-        self._last_cleanup = time.time()
+        self._resident = OrderedDict()  # session_id -> in-memory document bytes, LRU first
+        self._resident_bytes = 0
+        self._locks = [threading.Lock() for _ in range(self.LOCK_STRIPES)]
+        self._io_locks = {}  # session_id -> Lock serializing that session's disk writes
+        self._registry_lock = threading.Lock()  # guards _io_locks, _resident and the sweeper thread
+        self._sweeper = None
+        self._sweeper_stop = threading.Event()
         self._storage_dir = storage_dir
+        self._store = None
         self._persistence_available = False
         
         # Try to set up persistent storage
         self._init_storage()
         
-        # Load existing sessions from disk
+        # Index existing sessions on disk (payloads load lazily)
         self._load_sessions()
+        
+        # Clean up expired sessions off the request path
+        self._start_sweeper()
     
     def _init_storage(self):
         """Initialize storage directory if possible."""
@@ -112,84 +186,181 @@ class SessionManager:
             test_file = self._storage_dir / '.test'
             test_file.write_text('test')
             test_file.unlink()
+            self._store = create_session_store(self._storage_dir, self.BACKEND)
             self._persistence_available = True
-            print(f"[SessionManager] Persistent storage enabled at {self._storage_dir}")
+            print(f"[SessionManager] Persistent storage enabled at {self._storage_dir} ({self.BACKEND})")
         except Exception as e:
             self._persistence_available = False
             print(f"[SessionManager] Persistent storage unavailable ({e}). Using in-memory only.")
             print("[SessionManager] To enable persistence, add a Railway Volume mounted at /data")
     
-    def _get_session_file(self, session_id: str) -> Path:
-        """Get the file path for a session."""
-        return self._storage_dir / f"{session_id}.pkl"
+    def _lock_for(self, session_id: str) -> threading.Lock:
+        """Get the striped lock guarding a session's in-memory state."""
+        return self._locks[hash(session_id) % self.LOCK_STRIPES]
+    
+    def _io_lock_for(self, session_id: str) -> threading.Lock:
+        """Get the lock serializing disk writes for a single session."""
+        with self._registry_lock:
+            lock = self._io_locks.get(session_id)
+            if lock is None:
+                lock = self._io_locks[session_id] = threading.Lock()
+            return lock
     
-    def _save_session(self, session_id: str):
-        """Save a single session to disk with file locking."""
+    def _persist(self, session_id: str) -> bool:
+        """
+        Write a session's pending changes to disk.
+        
+        Called WITHOUT the stripe lock held. The state to write is snapshotted
+        under the stripe lock, then serialized and written while holding only
+        this session's I/O lock, so a slow save of a large document doesn't
+        block requests for other sessions.
+        
+        Returns:
+            False if the in-memory copy is gone or was stale - another worker
+            saved the session first, so nothing was written and the copy has
+            been dropped; True otherwise
+        """
         if not self._persistence_available:
-            return
+            return True
+        
+        with self._io_lock_for(session_id):
+            with self._lock_for(session_id):
+                session = self._sessions.get(session_id)
+                if session is None:
+                    return False  # Deleted or dropped meanwhile
+                version = session.get('version', 0)
+                if session.get('saved_version', -1) >= version:
+                    return True  # A concurrent writer already saved this state
+                expected_revision = session.get('revision') if self._store.TRACKS_REVISIONS else None
+                keys = session.get('dirty', set())
+                session['dirty'] = set()
+                snapshot = {
+                    'created_at': session['created_at'],
+                    'expires_at': session['expires_at'],
+                    'data': dict(session['data']),
+                    'refs': session.setdefault('refs', {}),  # Only touched under the I/O lock
+                }
+            
+            try:
+                revision = self._store.save(session_id, snapshot, keys, expected_revision=expected_revision)
+                with self._lock_for(session_id):
+                    # update() bumps version under this lock; never move
+                    # saved_version backwards or mark a newer state saved
+                    if self._sessions.get(session_id) is session:
+                        if session.get('saved_version', -1) < version:
+                            session['saved_version'] = version
+                        if revision is not None:
+                            session['revision'] = revision
+            except StaleSessionError as e:
+                print(f"[SessionManager] Not saving stale copy of session {session_id[:8]}: {e}")
+                self._drop_copy(session_id, session)
+                return False
+            except Exception as e:
+                print(f"[SessionManager] Failed to save session {session_id[:8]}: {e}")
+                with self._lock_for(session_id):
+                    session.setdefault('dirty', set()).update(keys)
+        return True
+    
+    def _drop_copy(self, session_id: str, session: dict) -> None:
+        """Forget an in-memory session copy (not the stored one) so the next get() reloads it."""
+        with self._lock_for(session_id):
+            if self._sessions.get(session_id) is not session:
+                return
+            del self._sessions[session_id]
+        with self._registry_lock:
+            self._resident_bytes -= self._resident.pop(session_id, 0)
+    
+    def _is_current(self, session_id: str, session: dict) -> bool:
+        """
+        Check an in-memory copy against the shared store's revision.
+        
+        Copies with unsaved changes count as current - their save is a
+        compare-and-set that catches any conflict. Stores that don't track
+        revisions (file backend) are never checked.
+        """
+        if not self._persistence_available or not self._store.TRACKS_REVISIONS:
+            return True
+        with self._lock_for(session_id):
+            if session.get('saved_version', -1) < session.get('version', 0):
+                return True
+            revision = session.get('revision')
         try:
-            import fcntl
-            session = self._sessions.get(session_id)
-            if session:
-                session_file = self._get_session_file(session_id)
-                # Write to temp file first, then rename (atomic on POSIX)
-                temp_file = session_file.with_suffix('.tmp')
-                with open(temp_file, 'wb') as f:
-                    fcntl.flock(f.fileno(), fcntl.LOCK_EX)  # Exclusive lock
-                    pickle.dump(session, f)
-                    f.flush()
-                    os.fsync(f.fileno())  # Force write to disk
-                    fcntl.flock(f.fileno(), fcntl.LOCK_UN)  # Unlock
-                # Atomic rename
-                temp_file.rename(session_file)
+            return self._store.revision(session_id) == revision
         except Exception as e:
-            print(f"[SessionManager] Failed to save session {session_id[:8]}: {e}")
+            print(f"[SessionManager] Failed to check revision of {session_id[:8]}: {e}")
+            return True  # Keep serving the copy we have
     
     def _delete_session_file(self, session_id: str):
-        """Delete session file from disk."""
+        """Delete session files from disk."""
         if not self._persistence_available:
             return
         try:
-            session_file = self._get_session_file(session_id)
-            if session_file.exists():
-                session_file.unlink()
+            self._store.delete(session_id)
         except Exception as e:
             print(f"[SessionManager] Failed to delete session file {session_id[:8]}: {e}")
     
+    def _load_from_disk(self, session_id: str):
+        """Load a single session from disk, or None if absent/unreadable."""
+        if not self._persistence_available:
+            return None
+        try:
+            session = self._store.load(session_id)
+        except Exception as e:
+            print(f"[SessionManager] Failed to recover session {session_id[:8]}: {e}")
+            return None
+        if session:
+            # Everything just loaded is already on disk
+            session['version'] = session['saved_version'] = 0
+        return session
+    
+    def _migrate_legacy_sessions(self):
+        """Convert old one-pickle-per-session files to the per-key layout."""
+        for session_file in self._storage_dir.glob("*.pkl"):
+            try:
+                with open(session_file, 'rb') as f:
+                    session = pickle.load(f)
+                if datetime.now() <= session.get('expires_at', datetime.now()):
+                    self._store.save(session_file.stem, session)
+                session_file.unlink()
+            except Exception as e:
+                print(f"[SessionManager] Failed to migrate {session_file.name}: {e}")
+                try:
+                    session_file.unlink()
+                except:
+                    pass
+    
     def _load_sessions(self):
-        """Load all sessions from disk on startup."""
+        """
+        Read the session index on startup.
+        
+        Only session IDs, expiry times and sizes are read; payloads (including
+        document bytes) are loaded on first get(). Expired sessions are deleted.
+        """
         if not self._persistence_available:
             return
         
-        loaded = 0
+        live = 0
+        live_bytes = 0
         expired = 0
-        current_time = datetime.now()
+        now = time.time()
         
         try:
-            for session_file in self._storage_dir.glob("*.pkl"):
-                try:
-                    with open(session_file, 'rb') as f:
-                        session = pickle.load(f)
-                    
-                    # Check if expired
-                    if current_time > session.get('expires_at', current_time):
-                        session_file.unlink()
-                        expired += 1
-                        continue
-                    
-                    session_id = session_file.stem
-                    self._sessions[session_id] = session
-                    loaded += 1
-                except Exception as e:
-                    print(f"[SessionManager] Failed to load {session_file.name}: {e}")
-                    # Remove corrupted file
-                    try:
-                        session_file.unlink()
-                    except:
-                        pass
+            self._migrate_legacy_sessions()
+            
+            for session_id in self._store.expired_session_ids(now):
+                self._delete_session_file(session_id)
+                expired += 1
+            
+            for entry in self._store.index_entries().values():
+                live += 1
+                live_bytes += entry['size']
+            
+            if expired:
+                self._store.compact_index()
             
-            if loaded > 0 or expired > 0:
-                print(f"[SessionManager] Loaded {loaded} sessions, cleaned {expired} expired")
+            if live > 0 or expired > 0:
+                print(f"[SessionManager] Indexed {live} sessions ({live_bytes / 1024 / 1024:.1f} MB on disk), "
+                      f"cleaned {expired} expired")
         except Exception as e:
             print(f"[SessionManager] Failed to load sessions: {e}")
     
@@ -197,106 +368,298 @@ class SessionManager:
         """Create a new session with expiration."""
         session_id = str(uuid.uuid4())
         
-        with self._lock:
+        with self._lock_for(session_id):
             self._sessions[session_id] = {
                 'created_at': datetime.now(),
                 'expires_at': datetime.now() + timedelta(hours=self.SESSION_EXPIRY_HOURS),
-                'data': {}
+                'data': {},
+                'version': 1,
             }
-            self._save_session(session_id)
-            self._maybe_cleanup()
+        self._persist(session_id)
+        self._touch(session_id)
+        
+        # Restart the sweeper if we're in a forked worker (gunicorn --preload)
+        self._start_sweeper()
         
         return session_id
     
+    def _get_live_session(self, session_id: str):
+        """
+        Look up a session, falling back to disk if not in memory.
+        Drops and returns None for expired sessions.
+        
+        With a shared store, an in-memory copy older than the stored
+        revision is dropped and reloaded.
+        
+        The disk fallback runs outside the stripe lock; if two threads load
+        the same session concurrently, the first one inserted wins.
+        """
+        lock = self._lock_for(session_id)
+        with lock:
+            session = self._sessions.get(session_id)
+        
+        if session and not self._is_current(session_id, session):
+            self._drop_copy(session_id, session)
+            session = None
+        
+        # Fallback: try loading from disk if not in memory
+        if not session:
+            loaded = self._load_from_disk(session_id)
+            if not loaded:
+                return None
+            with lock:
+                session = self._sessions.setdefault(session_id, loaded)
+            print(f"[SessionManager] Recovered session {session_id[:8]} from disk")
+        
+        # Check expiration
+        if datetime.now() > session['expires_at']:
+            self._remove(session_id)
+            return None
+        
+        self._touch(session_id)
+        return session
+    
     def get(self, session_id: str) -> dict:
         """Get session data (thread-safe). Falls back to disk if not in memory."""
-        with self._lock:
+        session = self._get_live_session(session_id)
+        return session['data'] if session else None
+    
+    def get_versioned(self, session_id: str):
+        """
+        Get session data along with the version it was read at.
+        
+        Pass the version to update(..., expected_version=version) to write
+        back only if nobody changed the session in between.
+        
+        Returns:
+            (data, version), or (None, None) if the session doesn't exist
+        """
+        session = self._get_live_session(session_id)
+        if not session:
+            return None, None
+        with self._lock_for(session_id):
+            return session['data'], self._version_of(session)
+    
+    @staticmethod
+    def _version_of(session: dict) -> tuple:
+        """Changes with every local update and every save by any worker."""
+        return session.get('revision'), session.get('version', 0)
+    
+    def get_document(self, session_id: str, key: str):
+        """
+        Locate a binary session value (e.g. 'processed_doc') for streaming.
+        
+        Prefers the uncompressed blob on disk so the bytes never have to be
+        read into Python memory; falls back to the in-memory value when the
+        session isn't persisted or the key has unsaved changes.
+        
+        Returns:
+            {'etag': sha256, 'path': Path, 'fields': dict} or
+            {'etag': sha256, 'data': bytes, 'fields': dict},
+            or None if the session/key doesn't exist or has expired
+        """
+        with self._lock_for(session_id):
             session = self._sessions.get(session_id)
+            unsaved = session is not None and key in session.get('dirty', ())
+        
+        if self._persistence_available and not unsaved:
+            try:
+                record = self._store.load_record(session_id)
+            except Exception as e:
+                print(f"[SessionManager] Failed to read session record {session_id[:8]}: {e}")
+                record = None
             
-            # Fallback: try loading from disk if not in memory
-            if not session and self._persistence_available:
-                session_file = self._get_session_file(session_id)
-                if session_file.exists():
-                    try:
-                        with open(session_file, 'rb') as f:
-                            session = pickle.load(f)
-                        self._sessions[session_id] = session
-                        print(f"[SessionManager] Recovered session {session_id[:8]} from disk")
-                    except Exception as e:
-                        print(f"[SessionManager] Failed to recover session {session_id[:8]}: {e}")
-            
-            if not session:
-                return None
-            
-            # Check expiration
-            if datetime.now() > session['expires_at']:
-                del self._sessions[session_id]
-                self._delete_session_file(session_id)
-                return None
-            
-            return session['data']
+            if record is not None:
+                if time.time() > record['expires_at']:
+                    self._remove(session_id)
+                    return None
+                digest = record['blobs'].get(key)
+                path = self._store.blobs.stream_path(digest) if digest else None
+                if path is not None:
+                    self._touch(session_id)
+                    return {'etag': digest, 'path': path, 'fields': record['fields']}
+        
+        data = self.get(session_id)
+        value = data.get(key) if data else None
+        if not isinstance(value, (bytes, bytearray)):
+            return None
+        value = bytes(value)
+        return {'etag': hashlib.sha256(value).hexdigest(), 'data': value, 'fields': data}
     
     def set(self, session_id: str, key: str, value) -> bool:
-        """Set session data (thread-safe). Falls back to disk if not in memory."""
-        with self._lock:
-            session = self._sessions.get(session_id)
-            
-            # Fallback: try loading from disk if not in memory
-            if not session and self._persistence_available:
-                session_file = self._get_session_file(session_id)
-                if session_file.exists():
-                    try:
-                        with open(session_file, 'rb') as f:
-                            session = pickle.load(f)
-                        self._sessions[session_id] = session
-                        print(f"[SessionManager] Recovered session {session_id[:8]} from disk for set()")
-                    except Exception as e:
-                        print(f"[SessionManager] Failed to recover session {session_id[:8]}: {e}")
-            
+        """Set a single session key (thread-safe). See update() for several keys."""
+        return self.update(session_id, **{key: value})
+    
+    def update(self, session_id: str, expected_version=None, **fields) -> bool:
+        """
+        Set several session keys in one transaction (thread-safe).
+        
+        All fields are applied under a single lock acquisition and committed
+        to disk with one session record write, e.g.:
+        
+            sessions.update(session_id, processed_doc=doc, style=style)
+        
+        The save is a compare-and-set against the store's revision; if
+        another worker saved first, the fields are re-applied on top of the
+        reloaded session. With expected_version (from get_versioned()), the
+        update is refused instead whenever the session changed since it
+        was read.
+        
+        Returns:
+            True if the session exists and was updated; False if it doesn't,
+            or if it changed since expected_version
+        """
+        for _ in range(self.UPDATE_ATTEMPTS):
+            session = self._get_live_session(session_id)
             if not session:
                 return False
             
-            if datetime.now() > session['expires_at']:
-                del self._sessions[session_id]
-                self._delete_session_file(session_id)
-                return False
+            with self._lock_for(session_id):
+                if self._sessions.get(session_id) is not session:
+                    continue  # Evicted or reloaded meanwhile
+                if expected_version is not None and self._version_of(session) != expected_version:
+                    return False
+                session['data'].update(fields)
+                session.setdefault('dirty', set()).update(fields)
+                session['version'] = session.get('version', 0) + 1
             
-            session['data'][key] = value
-            self._save_session(session_id)
-            return True
-    
-    def delete(self, session_id: str) -> bool:
-        """Delete a session (thread-safe)."""
-        with self._lock:
-            if session_id in self._sessions:
-                del self._sessions[session_id]
-                self._delete_session_file(session_id)
+            if self._persist(session_id):
+                self._touch(session_id)
                 return True
-            return False
+            if expected_version is not None:
+                return False
+        
+        print(f"[SessionManager] Gave up updating session {session_id[:8]} after {self.UPDATE_ATTEMPTS} conflicts")
+        return False
     
-    def _maybe_cleanup(self) -> None:
+    def _touch(self, session_id: str) -> None:
         """
-        Clean up expired sessions periodically.
-        Called within lock, so no additional locking needed.
+        Mark a session most-recently-used and evict others over the memory budget.
+        
+        Only sessions whose state is fully saved are evicted; they're dropped
+        from memory and reloaded from disk on the next get().
         """
-        now = time.time()
-        if now - self._last_cleanup < self.CLEANUP_INTERVAL_MINUTES * 60:
+        if not self._persistence_available:
+            return
+        
+        session = self._sessions.get(session_id)
+        if session is None:
+            return
+        size = sum(
+            len(value) for value in list(session['data'].values())
+            if isinstance(value, (bytes, bytearray))
+        )
+        
+        budget = self.MEMORY_BUDGET_MB * 1024 * 1024
+        with self._registry_lock:
+            self._resident_bytes += size - self._resident.pop(session_id, 0)
+            self._resident[session_id] = size
+            if self._resident_bytes <= budget:
+                return
+            candidates = [sid for sid in self._resident if sid != session_id]
+        
+        for sid in candidates:
+            if self._resident_bytes <= budget:
+                break
+            with self._lock_for(sid):
+                victim = self._sessions.get(sid)
+                if victim is None or victim.get('saved_version', -1) < victim.get('version', 0):
+                    continue  # Gone, or has unsaved changes
+                del self._sessions[sid]
+            with self._registry_lock:
+                self._resident_bytes -= self._resident.pop(sid, 0)
+    
+    def _remove(self, session_id: str) -> bool:
+        """Remove a session from memory and disk. Returns True if it was in memory."""
+        with self._lock_for(session_id):
+            existed = self._sessions.pop(session_id, None) is not None
+        
+        if self._persistence_available:
+            # Wait for any in-flight write so it can't recreate the files
+            with self._io_lock_for(session_id):
+                self._delete_session_file(session_id)
+        
+        with self._registry_lock:
+            self._io_locks.pop(session_id, None)
+            self._resident_bytes -= self._resident.pop(session_id, 0)
+        
+        return existed
+    
+    def delete(self, session_id: str) -> bool:
+        """Delete a session (thread-safe)."""
+        return self._remove(session_id)
+    
+    def _start_sweeper(self) -> None:
+        """Start the background cleanup thread if it isn't running."""
+        if self._sweeper is not None and self._sweeper.is_alive():
             return
+        with self._registry_lock:
+            if self._sweeper is not None and self._sweeper.is_alive():
+                return
+            self._sweeper = threading.Thread(
+                target=self._sweep_loop,
+                name='session-sweeper',
+                daemon=True
+            )
+            self._sweeper.start()
+    
+    def _sweep_loop(self) -> None:
+        """Run cleanup() every CLEANUP_INTERVAL_MINUTES until stop()."""
+        while not self._sweeper_stop.wait(self.CLEANUP_INTERVAL_MINUTES * 60):
+            try:
+                self.cleanup()
+            except Exception as e:
+                print(f"[SessionManager] Cleanup failed: {e}")
+    
+    def stop(self) -> None:
+        """Stop the background sweeper thread."""
+        self._sweeper_stop.set()
+    
+    def cleanup(self) -> int:
+        """
+        Remove expired sessions and unreferenced document blobs.
+        
+        Covers sessions in memory and, via the index, sessions on disk that
+        were never loaded by this worker. Runs on the sweeper thread; takes
+        each session's lock only briefly.
         
-        self._last_cleanup = now
+        Returns:
+            Number of expired sessions removed
+        """
         current_time = datetime.now()
         
-        expired = [
-            sid for sid, session in self._sessions.items()
+        expired = {
+            sid for sid, session in dict(self._sessions).items()
             if current_time > session['expires_at']
-        ]
+        }
+        
+        if self._persistence_available:
+            try:
+                now = current_time.timestamp()
+                expired.update(
+                    sid for sid in self._store.expired_session_ids(now)
+                    if sid not in self._sessions
+                )
+            except Exception as e:
+                print(f"[SessionManager] Failed to read session index: {e}")
         
         for sid in expired:
-            del self._sessions[sid]
-            self._delete_session_file(sid)
+            self._remove(sid)
         
         if expired:
             print(f"[SessionManager] Cleaned up {len(expired)} expired sessions")
+        
+        # Remove document blobs no longer referenced by any session
+        if self._persistence_available:
+            try:
+                self._store.compact_index()
+                removed = self._store.sweep_blobs()
+                if removed:
+                    print(f"[SessionManager] Removed {removed} unreferenced blobs")
+            except Exception as e:
+                print(f"[SessionManager] Blob sweep failed: {e}")
+        
+        return len(expired)
 
 
 # Global session manager instance
@@ -712,22 +1075,25 @@ def process_doc():
         session_id = sessions.create()
         print(f"[API] Created session {session_id[:8]}... for document {file.filename}")
         
-        sessions.set(session_id, 'processed_doc', processed_bytes)
-        sessions.set(session_id, 'original_bytes', file_bytes)  # Store original for re-processing
-        sessions.set(session_id, 'style', style)
-        sessions.set(session_id, 'results', [
-            {
-                'id': idx + 1,
-                'original': r.original,
-                'formatted': r.formatted,
-                'success': r.success,
-                'error': r.error,
-                'form': r.citation_form,
-                'type': r.citation_type.name.lower() if hasattr(r, 'citation_type') and r.citation_type else 'unknown'
-            }
-            for idx, r in enumerate(results)
-        ])
-        sessions.set(session_id, 'filename', secure_filename(file.filename))
+        sessions.update(
+            session_id,
+            processed_doc=processed_bytes,
+            original_bytes=file_bytes,  # Store original for re-processing
+            style=style,
+            results=[
+                {
+                    'id': idx + 1,
+                    'original': r.original,
+                    'formatted': r.formatted,
+                    'success': r.success,
+                    'error': r.error,
+                    'form': r.citation_form,
+                    'type': r.citation_type.name.lower() if hasattr(r, 'citation_type') and r.citation_type else 'unknown'
+                }
+                for idx, r in enumerate(results)
+            ],
+            filename=secure_filename(file.filename),
+        )
         
         print(f"[API] Session {session_id[:8]} initialized with {len(results)} notes, doc size={len(processed_bytes)}")
         print(f"[API] Total active sessions: {len(sessions._sessions)}")
@@ -775,35 +1141,33 @@ def process_doc():
 
 @app.route('/api/download/<session_id>')
 def download(session_id: str):
-    """Download processed document."""
+    """
+    Download processed document.
+    
+    Streams the content-addressed blob from disk; the blob's sha256 is the
+    ETag, so conditional (If-None-Match) and Range requests are handled by
+    send_file.
+    """
     try:
-        # Get session data using proper method
-        session_data = sessions.get(session_id)
-        
-        if not session_data:
-            return jsonify({
-                'success': False,
-                'error': 'Session not found or expired'
-            }), 404
-        
-        processed_doc = session_data.get('processed_doc')
-        filename = session_data.get('filename', 'processed.docx')
+        document = sessions.get_document(session_id, 'processed_doc')
         
-        if not processed_doc:
+        if not document:
             return jsonify({
                 'success': False,
-                'error': 'Processed document not found'
+                'error': 'Session or processed document not found (or expired)'
             }), 404
         
-        from io import BytesIO
-        buffer = BytesIO(processed_doc)
-        buffer.seek(0)
+        filename = document['fields'].get('filename', 'processed.docx')
+        source = document.get('path') or io.BytesIO(document['data'])
         
         return send_file(
-            buffer,
+            source,
             mimetype='application/vnd.openxmlformats-officedocument.wordprocessingml.document',
             as_attachment=True,
-            download_name=f"citeflex_{filename}" if filename else "citeflex_processed.docx"
+            download_name=f"citeflex_{filename}" if filename else "citeflex_processed.docx",
+            etag=document['etag'],
+            conditional=True,
+            max_age=0
         )
         
     except Exception as e:
@@ -846,6 +1210,10 @@ def get_results(session_id: str):
         }), 500
 
 
+# Read-modify-write rounds before a session edit endpoint gives up (409)
+SESSION_EDIT_ATTEMPTS = 3
+
+
 @app.route('/api/update', methods=['POST'])
 def update_note():
     """
@@ -860,6 +1228,11 @@ def update_note():
     
     This re-processes the document with the updated note.
     Updated: 2025-12-06 - Added retry logic and file locking
+    Updated: 2026-10-16 - Removed retry loop; sessions are committed before
+                          /api/process returns and any worker can load them
+    Updated: 2026-10-16 - Compare-and-set save; re-reads and retries if the
+                          session changed concurrently (409 after
+                          SESSION_EDIT_ATTEMPTS)
     """
     try:
         data = request.get_json()
@@ -880,63 +1253,67 @@ def update_note():
                 'error': 'Missing session_id or note_id'
             }), 400
         
-        # Retry logic - wait for any concurrent writes to complete
-        session_data = None
-        for attempt in range(3):
-            session_data = sessions.get(session_id)
-            if session_data:
-                break
-            print(f"[API] Session {session_id[:8]} not found, attempt {attempt+1}/3, waiting...")
-            time.sleep(0.2)  # Wait 200ms between retries
-        
-        if not session_data:
-            print(f"[API] Session {session_id[:8]} NOT FOUND after 3 attempts")
-            return jsonify({
-                'success': False,
-                'error': 'Session not found or expired'
-            }), 404
-        
-        results = session_data.get('results', [])
-        processed_doc = session_data.get('processed_doc')
-        
-        if not results or not processed_doc:
-            print(f"[API] Session {session_id[:8]} has incomplete data: results={bool(results)}, doc={bool(processed_doc)}")
-            return jsonify({
-                'success': False,
-                'error': 'Session data incomplete'
-            }), 404
-        
-        # Update the specific result
-        note_idx = note_id - 1  # Convert 1-based to 0-based
-        if note_idx < 0 or note_idx >= len(results):
-            return jsonify({
-                'success': False,
-                'error': f'Note {note_id} not found'
-            }), 404
-        
-        # Update the document - this is the critical part
-        from document_processor import update_document_note
-        try:
-            updated_doc = update_document_note(processed_doc, note_id, new_html)
+        for attempt in range(SESSION_EDIT_ATTEMPTS):
+            session_data, version = sessions.get_versioned(session_id)
+            
+            if not session_data:
+                print(f"[API] Session {session_id[:8]} not found")
+                return jsonify({
+                    'success': False,
+                    'error': 'Session not found or expired'
+                }), 404
+            
+            results = session_data.get('results', [])
+            processed_doc = session_data.get('processed_doc')
+            
+            if not results or not processed_doc:
+                print(f"[API] Session {session_id[:8]} has incomplete data: results={bool(results)}, doc={bool(processed_doc)}")
+                return jsonify({
+                    'success': False,
+                    'error': 'Session data incomplete'
+                }), 404
             
-            # Verify the update actually changed something
-            if updated_doc == processed_doc:
-                print(f"[API] Warning: update_document_note returned unchanged document for note {note_id}")
+            # Update the specific result
+            note_idx = note_id - 1  # Convert 1-based to 0-based
+            if note_idx < 0 or note_idx >= len(results):
+                return jsonify({
+                    'success': False,
+                    'error': f'Note {note_id} not found'
+                }), 404
+            
+            # Update the document - this is the critical part
+            from document_processor import update_document_note
+            try:
+                updated_doc = update_document_note(processed_doc, note_id, new_html)
+                
+                # Verify the update actually changed something
+                if updated_doc == processed_doc:
+                    print(f"[API] Warning: update_document_note returned unchanged document for note {note_id}")
+                
+            except Exception as update_err:
+                print(f"[API] Document update failed for note {note_id}: {update_err}")
+                return jsonify({
+                    'success': False,
+                    'error': f'Failed to update document: {str(update_err)}'
+                }), 500
             
-            # Save updated document to session
-            sessions.set(session_id, 'processed_doc', updated_doc)
+            # Update a copy of the results array - the session's own list stays
+            # untouched if another request wins the race below
+            results = [dict(result) for result in results]
+            results[note_idx]['formatted'] = new_html
+            results[note_idx]['success'] = True
             
-        except Exception as update_err:
-            print(f"[API] Document update failed for note {note_id}: {update_err}")
+            # Save updated document and results in one commit, unless the session
+            # changed since it was read (e.g. another note edited in another worker)
+            if sessions.update(session_id, expected_version=version,
+                               processed_doc=updated_doc, results=results):
+                break
+            print(f"[API] Session {session_id[:8]} changed during note {note_id} update, retrying")
+        else:
             return jsonify({
                 'success': False,
-                'error': f'Failed to update document: {str(update_err)}'
-            }), 500
-        
-        # Update results array
-        results[note_idx]['formatted'] = new_html
-        results[note_idx]['success'] = True
-        sessions.set(session_id, 'results', results)
+                'error': 'Session was modified concurrently, please retry'
+            }), 409
         
         print(f"[API] Successfully updated note {note_id}")
         
@@ -954,6 +1331,13 @@ def update_note():
         }), 500
 
 
+# Author-date lookups per document: at most AUTHOR_DATE_WORKERS in flight,
+# AUTHOR_DATE_TIMEOUT seconds each once started, AUTHOR_DATE_DEADLINE overall
+AUTHOR_DATE_WORKERS = int(os.environ.get('AUTHOR_DATE_WORKERS', '5'))
+AUTHOR_DATE_TIMEOUT = int(os.environ.get('AUTHOR_DATE_TIMEOUT', '30'))
+AUTHOR_DATE_DEADLINE = int(os.environ.get('AUTHOR_DATE_DEADLINE', '300'))
+
+
 @app.route('/api/process-author-date', methods=['POST'])
 def process_author_date():
     """
@@ -1029,22 +1413,52 @@ def process_author_date():
         print(f"[API] Extracted {len(extracted_citations)} citations, {len(unique_citations)} unique")
         
         # Process citations in PARALLEL for speed
-        from concurrent.futures import ThreadPoolExecutor, as_completed
-        
-        def process_single_citation(idx, cite):
-            """Process one citation - called in parallel. Returns raw metadata."""
+        def citation_text(cite):
+            """Rebuild the parenthetical citation text for lookup and display."""
             # Preserve ALL author names for better AI lookup accuracy
             # Don't simplify to "et al." - send full author list
             if cite.third_author:
                 # Three or more authors - include all three for better matching
-                original_text = f"({cite.author}, {cite.second_author}, & {cite.third_author}, {cite.year})"
+                return f"({cite.author}, {cite.second_author}, & {cite.third_author}, {cite.year})"
             elif cite.second_author:
                 # Two authors
-                original_text = f"({cite.author} & {cite.second_author}, {cite.year})"
+                return f"({cite.author} & {cite.second_author}, {cite.year})"
             else:
                 # Single author
-                original_text = f"({cite.author}, {cite.year})"
-            
+                return f"({cite.author}, {cite.year})"
+        
+        def keep_original(idx, original_text, error):
+            """Entry offering only the original text, for failed lookups."""
+            return {
+                'id': idx + 1,
+                'note_id': idx + 1,
+                'original': original_text,
+                'options': [{
+                    'id': 0,
+                    'title': '[Keep Original]',
+                    'authors': [],
+                    'year': '',
+                    'journal': '',
+                    'publisher': '',
+                    'volume': '',
+                    'issue': '',
+                    'pages': '',
+                    'doi': '',
+                    'url': '',
+                    'citation_type': 'original',
+                    'source': 'original',
+                    'is_original': True
+                }],
+                'selected_option': 0,
+                'formatted': None,
+                'accepted': False,
+                'error': error
+            }
+        
+        def process_single_citation(item):
+            """Process one citation - called in parallel. Returns raw metadata."""
+            idx, cite = item
+            original_text = citation_text(cite)
             note_id = idx + 1
             
             try:
@@ -1099,53 +1513,35 @@ def process_author_date():
                 
             except Exception as e:
                 print(f"[API] Error processing '{original_text[:40]}': {e}")
-                return {
-                    'id': idx + 1,
-                    'note_id': note_id,
-                    'original': original_text,
-                    'options': [{
-                        'id': 0,
-                        'title': '[Keep Original]',
-                        'authors': [],
-                        'year': '',
-                        'journal': '',
-                        'publisher': '',
-                        'volume': '',
-                        'issue': '',
-                        'pages': '',
-                        'doi': '',
-                        'url': '',
-                        'citation_type': 'original',
-                        'source': 'original',
-                        'is_original': True
-                    }],
-                    'selected_option': 0,
-                    'formatted': None,
-                    'accepted': False,
-                    'error': str(e)
-                }
-        
-        # Run lookups in parallel (up to 5 concurrent)
-        citations = [None] * len(unique_citations)
-        with ThreadPoolExecutor(max_workers=5) as executor:
-            futures = {
-                executor.submit(process_single_citation, idx, cite): idx 
-                for idx, cite in enumerate(unique_citations)
-            }
-            for future in as_completed(futures):
-                idx = futures[future]
-                citations[idx] = future.result()
-                print(f"[API] Completed citation {idx + 1}/{len(unique_citations)}")
+                return keep_original(idx, original_text, str(e))
+        
+        # Run lookups on the shared notes pool, at most AUTHOR_DATE_WORKERS
+        # of this document's at a time
+        citations = scheduler.get_pool('notes').map_window(
+            process_single_citation,
+            list(enumerate(unique_citations)),
+            window=AUTHOR_DATE_WORKERS,
+            item_timeout=AUTHOR_DATE_TIMEOUT,
+            deadline=AUTHOR_DATE_DEADLINE,
+            label='API'
+        )
+        for idx, citation in enumerate(citations):
+            if citation is None:
+                citations[idx] = keep_original(idx, citation_text(unique_citations[idx]), 'Lookup timed out')
+        print(f"[API] Completed {len(citations)} citations")
         
         # Create session to store results
         session_id = sessions.create()
         print(f"[API] Created author-date session {session_id[:8]}... for document {file.filename}")
         
-        sessions.set(session_id, 'original_bytes', file_bytes)
-        sessions.set(session_id, 'style', style)
-        sessions.set(session_id, 'mode', 'author-date')
-        sessions.set(session_id, 'citations', citations)
-        sessions.set(session_id, 'filename', secure_filename(file.filename))
+        sessions.update(
+            session_id,
+            original_bytes=file_bytes,
+            style=style,
+            mode='author-date',
+            citations=citations,
+            filename=secure_filename(file.filename),
+        )
         
         return jsonify({
             'success': True,
@@ -1197,6 +1593,9 @@ def accept_reference():
         "reference_id": 1,
         "formatted": "Simonton, D. K. (1992). ..."
     }
+    
+    Updated: 2026-10-16 - accepted_references is written as a compare-and-set
+                          on a copy (409 after SESSION_EDIT_ATTEMPTS conflicts)
     """
     try:
         data = request.get_json()
@@ -1315,17 +1714,32 @@ def accept_reference():
                     'error': 'Missing reference_id'
                 }), 400
         
-        # Get or create accepted_references dict
-        accepted_refs = session_data.get('accepted_references', {})
-        
-        # Store the formatted reference (keyed by reference_id)
-        accepted_refs[str(reference_id)] = {
-            'formatted': formatted,
-            'accepted_at': time.time()
-        }
-        
-        # Save back to session
-        sessions.set(session_id, 'accepted_references', accepted_refs)
+        # Store the formatted reference (keyed by reference_id) in a copy of
+        # accepted_references, saved only if the session hasn't changed since
+        # it was read - another worker may be accepting other references
+        for attempt in range(SESSION_EDIT_ATTEMPTS):
+            session_data, version = sessions.get_versioned(session_id)
+            if not session_data:
+                return jsonify({
+                    'success': False,
+                    'error': 'Session not found or expired'
+                }), 404
+            
+            accepted_refs = dict(session_data.get('accepted_references') or {})
+            accepted_refs[str(reference_id)] = {
+                'formatted': formatted,
+                'accepted_at': time.time()
+            }
+            
+            if sessions.update(session_id, expected_version=version,
+                               accepted_references=accepted_refs):
+                break
+            print(f"[API] Session {session_id[:8]} changed while accepting reference {reference_id}, retrying")
+        else:
+            return jsonify({
+                'success': False,
+                'error': 'Session was modified concurrently, please retry'
+            }), 409
         
         print(f"[API] Accepted reference {reference_id} for session {session_id[:8]}")
         
@@ -1410,20 +1824,12 @@ def finalize_author_date():
                     })
         
         # Generate document with References section
-        from io import BytesIO
-        import zipfile
-        import tempfile
-        import shutil
         import xml.etree.ElementTree as ET
+        from docx_package import DocxPackage
         
-        temp_dir = tempfile.mkdtemp()
+        package = DocxPackage(original_bytes)
         
         try:
-            with zipfile.ZipFile(BytesIO(original_bytes), 'r') as zf:
-                zf.extractall(temp_dir)
-            
-            doc_path = os.path.join(temp_dir, 'word', 'document.xml')
-            
             # Register namespaces
             namespaces = {
                 'w': 'http://schemas.openxmlformats.org/wordprocessingml/2006/main',
@@ -1432,7 +1838,7 @@ def finalize_author_date():
             for prefix, uri in namespaces.items():
                 ET.register_namespace(prefix, uri)
             
-            tree = ET.parse(doc_path)
+            tree = package.parse_xml('word/document.xml')
             root = tree.getroot()
             body = root.find('.//w:body', namespaces)
             
@@ -1505,20 +1911,9 @@ def finalize_author_date():
                     else:
                         body.append(ref_para)
             
-            # Write modified document
-            tree.write(doc_path, encoding='UTF-8', xml_declaration=True)
-            
-            # Repackage docx
-            output_buffer = BytesIO()
-            with zipfile.ZipFile(output_buffer, 'w', zipfile.ZIP_DEFLATED) as zf:
-                for root_dir, dirs, files in os.walk(temp_dir):
-                    for file in files:
-                        file_path = os.path.join(root_dir, file)
-                        arcname = os.path.relpath(file_path, temp_dir)
-                        zf.write(file_path, arcname)
-            
-            output_buffer.seek(0)
-            processed_bytes = output_buffer.read()
+            # Write modified document; other members are copied verbatim
+            package.write_xml('word/document.xml', tree)
+            processed_bytes = package.save().getvalue()
             
             # Save to session for download
             sessions.set(session_id, 'processed_doc', processed_bytes)
@@ -1531,7 +1926,7 @@ def finalize_author_date():
             })
             
         finally:
-            shutil.rmtree(temp_dir, ignore_errors=True)
+            package.close()
         
     except Exception as e:
         print(f"[API] Error in /api/finalize-author-date: {e}")
@@ -1556,6 +1951,9 @@ def select_citation():
     }
     
     This updates the document with the selected citation.
+    
+    Updated: 2026-10-16 - citations is written as a compare-and-set on a copy
+                          (409 after SESSION_EDIT_ATTEMPTS conflicts)
     """
     try:
         data = request.get_json()
@@ -1576,42 +1974,52 @@ def select_citation():
                 'error': 'Missing session_id or citation_id'
             }), 400
         
-        session_data = sessions.get(session_id)
-        if not session_data:
-            return jsonify({
-                'success': False,
-                'error': 'Session not found or expired'
-            }), 404
-        
-        citations = session_data.get('citations', [])
-        
-        # Find the citation
-        citation = None
-        for c in citations:
-            if c['id'] == citation_id:
-                citation = c
+        for attempt in range(SESSION_EDIT_ATTEMPTS):
+            session_data, version = sessions.get_versioned(session_id)
+            if not session_data:
+                return jsonify({
+                    'success': False,
+                    'error': 'Session not found or expired'
+                }), 404
+            
+            # Work on a copy - the session's own list stays untouched if
+            # another request wins the race below
+            citations = [dict(c) for c in session_data.get('citations', [])]
+            
+            # Find the citation
+            citation = None
+            for c in citations:
+                if c['id'] == citation_id:
+                    citation = c
+                    break
+            
+            if not citation:
+                return jsonify({
+                    'success': False,
+                    'error': f'Citation {citation_id} not found'
+                }), 404
+            
+            options = citation.get('options', [])
+            if option_index < 0 or option_index >= len(options):
+                return jsonify({
+                    'success': False,
+                    'error': f'Invalid option index {option_index}'
+                }), 400
+            
+            selected = options[option_index]
+            
+            # Update the citation with the selection
+            citation['selected'] = selected
+            citation['formatted'] = selected['formatted']
+            
+            if sessions.update(session_id, expected_version=version, citations=citations):
                 break
-        
-        if not citation:
-            return jsonify({
-                'success': False,
-                'error': f'Citation {citation_id} not found'
-            }), 404
-        
-        options = citation.get('options', [])
-        if option_index < 0 or option_index >= len(options):
+            print(f"[API] Session {session_id[:8]} changed while selecting citation {citation_id}, retrying")
+        else:
             return jsonify({
                 'success': False,
-                'error': f'Invalid option index {option_index}'
-            }), 400
-        
-        selected = options[option_index]
-        
-        # Update the citation with the selection
-        citation['selected'] = selected
-        citation['formatted'] = selected['formatted']
-        
-        sessions.set(session_id, 'citations', citations)
+                'error': 'Session was modified concurrently, please retry'
+            }), 409
         
         return jsonify({
             'success': True,
@@ -1682,7 +2090,13 @@ def health():
         'status': 'healthy',
         'version': '2.1.0',  # Updated version for author-date support
         'sessions_count': len(sessions._sessions),
-        'persistence': sessions._persistence_available
+        'persistence': sessions._persistence_available,
+        'citation_cache': citation_cache.stats(),
+        'doi_store': doi_store.stats(),
+        'ai_cache': ai_cache.stats(),
+        'pools': scheduler.stats(),
+        'upstreams': breakers.stats(),
+        'rate_limits': rate_limiter.stats()
     })
 
 
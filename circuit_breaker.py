@@ -0,0 +1,210 @@
+"""
+citeflex/circuit_breaker.py
+
+Per-upstream circuit breakers.
+
+When an upstream is down or throttling us (Semantic Scholar 429s, a
+CourtListener outage, Gemini rate limits), every note used to pay the full
+request timeout before falling through to the next engine or provider.
+A breaker watches each upstream's recent calls and, once most of them
+fail, "opens": calls are refused instantly for a cool-down period. Then
+one probe call is let through ("half-open"); success closes the circuit,
+failure reopens it for twice as long (up to BREAKER_MAX_OPEN_SECONDS).
+
+    closed --(error rate >= threshold over >= min calls)--> open
+    open --(cool-down elapsed)--> half_open (one probe at a time)
+    half_open --(probe ok)--> closed / --(probe failed)--> open
+
+Used by SearchEngine._make_request (keyed by engine name) and
+engines.ai_lookup._call_ai (keyed by provider). State, error rate and
+latency percentiles per upstream are on /health.
+
+Usage:
+    from circuit_breaker import breakers
+
+    breaker = breakers.get('Crossref')
+    if not breaker.allow():
+        return None
+    start = time.monotonic()
+    try:
+        response = call()
+    except Exception:
+        breaker.record(False, time.monotonic() - start)
+        raise
+    breaker.record(True, time.monotonic() - start)
+
+Version History:
+    2026-10-16: Added cancel() for callers that skip the call after allow()
+    2026-10-16: Initial implementation
+"""
+
+import os
+import time
+import threading
+from collections import deque
+from typing import Any, Dict
+
+
+# =============================================================================
+# CONFIGURATION
+# =============================================================================
+
+BREAKER_ENABLED = os.environ.get('BREAKER_ENABLED', 'true').lower() == 'true'
+# Outcomes older than this don't count toward the error rate
+BREAKER_WINDOW_SECONDS = float(os.environ.get('BREAKER_WINDOW_SECONDS', '60'))
+# Calls needed in the window before the circuit can open
+BREAKER_MIN_CALLS = int(os.environ.get('BREAKER_MIN_CALLS', '8'))
+BREAKER_ERROR_RATE = float(os.environ.get('BREAKER_ERROR_RATE', '0.5'))
+BREAKER_OPEN_SECONDS = float(os.environ.get('BREAKER_OPEN_SECONDS', '30'))
+BREAKER_MAX_OPEN_SECONDS = float(os.environ.get('BREAKER_MAX_OPEN_SECONDS', '300'))
+# A half-open probe that hasn't reported back after this long is presumed lost
+PROBE_TIMEOUT_SECONDS = 60
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+
+class CircuitOpenError(Exception):
+    """Raised by callers that skip an upstream whose circuit is open."""
+
+
+# =============================================================================
+# BREAKER
+# =============================================================================
+
+class CircuitBreaker:
+    """Rolling error rate and latency for one upstream, plus its circuit state."""
+
+    def __init__(self, name: str, window: float = BREAKER_WINDOW_SECONDS,
+                 min_calls: int = BREAKER_MIN_CALLS, error_rate: float = BREAKER_ERROR_RATE,
+                 open_seconds: float = BREAKER_OPEN_SECONDS,
+                 max_open_seconds: float = BREAKER_MAX_OPEN_SECONDS,
+                 enabled: bool = BREAKER_ENABLED):
+        self.name = name
+        self.window = window
+        self.min_calls = min_calls
+        self.error_rate = error_rate
+        self.open_seconds = open_seconds
+        self.max_open_seconds = max_open_seconds
+        self.enabled = enabled
+
+        self._lock = threading.Lock()
+        self._outcomes: deque = deque()  # (monotonic time, ok, latency)
+        self._state = CLOSED
+        self._opened_at = 0.0
+        self._cooldown = open_seconds
+        self._probe_started = None
+        self._rejected = 0
+
+    def allow(self) -> bool:
+        """
+        Whether a call may go to the upstream now. In half-open state this
+        reserves the single probe - the caller must record() its outcome.
+        """
+        if not self.enabled:
+            return True
+        now = time.monotonic()
+        with self._lock:
+            if self._state == OPEN and now - self._opened_at >= self._cooldown:
+                self._transition(HALF_OPEN)
+            if self._state == HALF_OPEN:
+                if self._probe_started is None or now - self._probe_started > PROBE_TIMEOUT_SECONDS:
+                    self._probe_started = now
+                    return True
+            if self._state == CLOSED:
+                return True
+            self._rejected += 1
+            return False
+
+    def cancel(self) -> None:
+        """Give back a half-open probe reserved by allow() when no call was made."""
+        with self._lock:
+            if self._state == HALF_OPEN:
+                self._probe_started = None
+
+    def record(self, ok: bool, latency: float = 0.0) -> None:
+        """Report the outcome of an allowed call."""
+        now = time.monotonic()
+        with self._lock:
+            self._outcomes.append((now, ok, latency))
+            self._trim(now)
+
+            if self._state == HALF_OPEN:
+                self._probe_started = None
+                if ok:
+                    self._cooldown = self.open_seconds
+                    self._outcomes.clear()
+                    self._transition(CLOSED)
+                else:
+                    self._cooldown = min(self._cooldown * 2, self.max_open_seconds)
+                    self._open(now)
+                return
+
+            if self._state == CLOSED and not ok and len(self._outcomes) >= self.min_calls:
+                failures = sum(1 for _, success, _ in self._outcomes if not success)
+                if failures / len(self._outcomes) >= self.error_rate:
+                    self._open(now)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            self._trim(time.monotonic())
+            outcomes = list(self._outcomes)
+            stats = {'state': self._state, 'rejected': self._rejected}
+            if self._state == OPEN:
+                stats['retry_in'] = round(max(0.0, self._opened_at + self._cooldown - time.monotonic()), 1)
+        latencies = sorted(latency for _, _, latency in outcomes)
+        stats['calls'] = len(outcomes)
+        stats['error_rate'] = round(sum(1 for _, ok, _ in outcomes if not ok) / len(outcomes), 2) if outcomes else 0.0
+        if latencies:
+            stats['p50_ms'] = round(latencies[len(latencies) // 2] * 1000)
+            stats['p95_ms'] = round(latencies[max(0, int(len(latencies) * 0.95) - 1)] * 1000)
+        return stats
+
+    # =========================================================================
+    # INTERNALS (called with the lock held)
+    # =========================================================================
+
+    def _trim(self, now: float) -> None:
+        while self._outcomes and now - self._outcomes[0][0] > self.window:
+            self._outcomes.popleft()
+
+    def _open(self, now: float) -> None:
+        self._opened_at = now
+        self._transition(OPEN)
+
+    def _transition(self, state: str) -> None:
+        if state != self._state:
+            detail = f" for {self._cooldown:.0f}s" if state == OPEN else ""
+            print(f"[CircuitBreaker] {self.name}: {self._state} -> {state}{detail}")
+            self._state = state
+
+
+# =============================================================================
+# REGISTRY
+# =============================================================================
+
+class BreakerRegistry:
+    """One CircuitBreaker per upstream name, created on first use."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._breakers: Dict[str, CircuitBreaker] = {}
+
+    def get(self, name: str) -> CircuitBreaker:
+        breaker = self._breakers.get(name)
+        if breaker is None:
+            with self._lock:
+                breaker = self._breakers.get(name)
+                if breaker is None:
+                    breaker = self._breakers[name] = CircuitBreaker(name)
+        return breaker
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            breakers = dict(self._breakers)
+        return {name: breaker.stats() for name, breaker in sorted(breakers.items())}
+
+
+# Global instance (per worker process)
+breakers = BreakerRegistry()
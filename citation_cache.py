@@ -0,0 +1,246 @@
+"""
+citeflex/citation_cache.py
+
+Persistent cache of resolved citations, shared by all gunicorn workers.
+
+The same references ("Foucault, Discipline and Punish", "Roe v. Wade",
+common DOIs) are looked up again and again across users. route_citation()
+checks this cache before detection, parallel database searches and AI
+classification; on a hit, formatting is a purely local step.
+
+Entries are keyed on the normalized query and store the resolved
+CitationMetadata (style-independent). Misses are cached too (negative
+caching) with a much shorter TTL - but only definitive ones: route_citation
+skips the put when an engine timed out, failed or was skipped
+(lookup_status), so an upstream outage isn't remembered as "not found".
+
+Storage: one SQLite database in WAL mode under CITATION_CACHE_DIR
+(default /data/cache, the Railway volume; falls back to the system temp
+dir). Size-bounded by CITATION_CACHE_MAX_ENTRIES - expired entries are
+pruned first, then least-recently-used.
+
+Usage:
+    from citation_cache import citation_cache
+
+    found, metadata = citation_cache.get(query)
+    if not found:
+        with track() as status:
+            metadata = resolve(query)
+        if metadata is not None or status.complete:
+            citation_cache.put(query, metadata)
+
+Version History:
+    2026-10-16: Database handling moved to sqlite_db.SQLiteDB (opened on first use)
+    2026-10-16: Documented that only definitive misses are stored
+    2026-10-16: Initial implementation
+"""
+
+import os
+import re
+import json
+import time
+import sqlite3
+import threading
+import unicodedata
+from pathlib import Path
+from typing import Optional, Tuple, Dict, Any
+
+from models import CitationMetadata
+from sqlite_db import SQLiteDB
+
+
+# =============================================================================
+# CONFIGURATION
+# =============================================================================
+
+CACHE_DIR = Path(os.environ.get('CITATION_CACHE_DIR', '/data/cache'))
+CACHE_ENABLED = os.environ.get('CITATION_CACHE_ENABLED', 'true').lower() == 'true'
+POSITIVE_TTL = int(os.environ.get('CITATION_CACHE_TTL_HOURS', '720')) * 3600  # 30 days
+NEGATIVE_TTL = int(os.environ.get('CITATION_CACHE_NEGATIVE_TTL_MINUTES', '60')) * 60
+MAX_ENTRIES = int(os.environ.get('CITATION_CACHE_MAX_ENTRIES', '100000'))
+
+# Bump to invalidate all existing entries (e.g. after routing changes)
+KEY_VERSION = 'v1'
+
+
+def normalize_query(query: str) -> str:
+    """
+    Normalize a citation query into a cache key.
+
+    Case, Unicode form, curly quotes, whitespace runs and trailing
+    punctuation don't change what a query resolves to.
+    """
+    text = unicodedata.normalize('NFKC', query)
+    text = text.replace('‘', "'").replace('’', "'")
+    text = text.replace('“', '"').replace('”', '"')
+    text = re.sub(r'\s+', ' ', text).strip().rstrip('.,;:').strip()
+    return f"{KEY_VERSION}:{text.lower()}"
+
+
+# =============================================================================
+# CACHE
+# =============================================================================
+
+class CitationCache:
+    """
+    SQLite-backed citation cache. All methods are thread-safe and never
+    raise - on any storage error the cache behaves as a miss.
+    """
+
+    DB_NAME = 'citations.db'
+    BUSY_TIMEOUT_MS = 2000
+    PRUNE_EVERY = 200  # Stores between size/expiry pruning passes
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS citations (
+            key TEXT PRIMARY KEY,
+            metadata TEXT,              -- NULL = negative entry
+            expires_at REAL NOT NULL,
+            last_used REAL NOT NULL,
+            hits INTEGER NOT NULL DEFAULT 0
+        );
+        CREATE INDEX IF NOT EXISTS idx_citations_last_used ON citations(last_used);
+    """
+
+    def __init__(self, cache_dir: Path = CACHE_DIR, max_entries: int = MAX_ENTRIES,
+                 positive_ttl: int = POSITIVE_TTL, negative_ttl: int = NEGATIVE_TTL,
+                 enabled: bool = CACHE_ENABLED):
+        self.max_entries = max_entries
+        self.positive_ttl = positive_ttl
+        self.negative_ttl = negative_ttl
+        self._enabled = enabled
+        self._db = SQLiteDB(self.DB_NAME, cache_dir, self.SCHEMA, owner='CitationCache',
+                            busy_timeout_ms=self.BUSY_TIMEOUT_MS)
+
+        self._stats_lock = threading.Lock()
+        self._stats = {'hits': 0, 'negative_hits': 0, 'misses': 0, 'stores': 0, 'errors': 0}
+
+    @property
+    def enabled(self) -> bool:
+        """Switched on and the database is usable (opened on first check)."""
+        return self._enabled and self._db.available
+
+    def _conn(self) -> sqlite3.Connection:
+        """Get this thread's connection (opens the database on first use)."""
+        return self._db.conn()
+
+    def _count(self, name: str) -> None:
+        with self._stats_lock:
+            self._stats[name] += 1
+
+    # =========================================================================
+    # PUBLIC API
+    # =========================================================================
+
+    def get(self, query: str) -> Tuple[bool, Optional[CitationMetadata]]:
+        """
+        Look up a query.
+
+        Returns:
+            (found, metadata): found is False on a miss; on a negative hit
+            it is True with metadata None
+        """
+        if not self.enabled:
+            return False, None
+
+        key = normalize_query(query)
+        now = time.time()
+        try:
+            conn = self._conn()
+            row = conn.execute(
+                'SELECT metadata, expires_at FROM citations WHERE key = ?', (key,)
+            ).fetchone()
+            if row is None or row[1] < now:
+                self._count('misses')
+                return False, None
+
+            conn.execute(
+                'UPDATE citations SET hits = hits + 1, last_used = ? WHERE key = ?', (now, key)
+            )
+        except Exception as e:
+            print(f"[CitationCache] Lookup failed: {e}")
+            self._count('errors')
+            return False, None
+
+        if row[0] is None:
+            self._count('negative_hits')
+            return True, None
+
+        metadata = CitationMetadata.from_dict(json.loads(row[0]))
+        metadata.raw_source = query
+        self._count('hits')
+        return True, metadata
+
+    def put(self, query: str, metadata: Optional[CitationMetadata]) -> None:
+        """
+        Store a resolution result. None records a negative (not found) entry.
+        """
+        if not self.enabled:
+            return
+
+        now = time.time()
+        if metadata is None:
+            payload, ttl = None, self.negative_ttl
+        else:
+            data = metadata.to_dict()
+            data.pop('raw_data', None)  # Raw API responses aren't needed to format
+            payload, ttl = json.dumps(data, default=str), self.positive_ttl
+
+        try:
+            self._conn().execute(
+                """INSERT OR REPLACE INTO citations (key, metadata, expires_at, last_used, hits)
+                   VALUES (?, ?, ?, ?, 0)""",
+                (normalize_query(query), payload, now + ttl, now)
+            )
+        except Exception as e:
+            print(f"[CitationCache] Store failed: {e}")
+            self._count('errors')
+            return
+
+        self._count('stores')
+        if self._stats['stores'] % self.PRUNE_EVERY == 0:
+            self.prune()
+
+    def prune(self) -> int:
+        """
+        Drop expired entries, then least-recently-used ones beyond max_entries.
+
+        Returns:
+            Number of entries removed
+        """
+        if not self.enabled:
+            return 0
+        try:
+            conn = self._conn()
+            removed = conn.execute(
+                'DELETE FROM citations WHERE expires_at < ?', (time.time(),)
+            ).rowcount
+            excess = conn.execute('SELECT COUNT(*) FROM citations').fetchone()[0] - self.max_entries
+            if excess > 0:
+                removed += conn.execute(
+                    """DELETE FROM citations WHERE key IN (
+                           SELECT key FROM citations ORDER BY last_used LIMIT ?)""",
+                    (excess,)
+                ).rowcount
+            return removed
+        except Exception as e:
+            print(f"[CitationCache] Prune failed: {e}")
+            return 0
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss counters for this worker plus the shared entry count."""
+        with self._stats_lock:
+            stats = dict(self._stats)
+        lookups = stats['hits'] + stats['negative_hits'] + stats['misses']
+        stats['hit_rate'] = round((stats['hits'] + stats['negative_hits']) / lookups, 3) if lookups else 0.0
+        stats['enabled'] = self.enabled
+        if self.enabled:
+            try:
+                stats['entries'] = self._conn().execute('SELECT COUNT(*) FROM citations').fetchone()[0]
+            except Exception:
+                pass
+        return stats
+
+
+# Global instance (one per worker process; the database is shared)
+citation_cache = CitationCache()
@@ -4,6 +4,10 @@ citeflex/config.py
 Configuration, constants, and shared settings.
 
 Version History:
+    2026-10-16: Added RATE_LIMITS (per-host request rates, engines/rate_limit.py)
+    2026-10-16: Removed the unused 'cpu' entry from POOL_SIZES
+    2026-10-16: Added POOL_SIZES (scheduler.py worker pools)
+    2026-10-16: Added UPSTREAM_CONCURRENCY (per-upstream in-flight request limits)
     2025-12-10: Added OPENAI_API_KEY and ANTHROPIC_API_KEY with .lstrip('=') fix
     2025-12-07: Added SERPAPI_KEY for Google Scholar integration
     2025-12-05: Added version tracking, fixed get_gov_agency to check specific domains first
@@ -50,6 +54,69 @@ DEFAULT_HEADERS = {
     'Accept': 'application/json'
 }
 
+# Max concurrent in-flight requests per upstream API (per worker process).
+# Keys are SearchEngine.name values or AI provider names; anything not
+# listed gets DEFAULT_UPSTREAM_CONCURRENCY. Override with e.g.
+#   UPSTREAM_CONCURRENCY="Crossref=8,openai=2"
+DEFAULT_UPSTREAM_CONCURRENCY = 8
+UPSTREAM_CONCURRENCY: Dict[str, int] = {
+    'Crossref': 8,
+    'OpenAlex': 8,
+    'Semantic Scholar': 2,   # Strict public rate limit
+    'PubMed': 3,             # 3 req/s without an API key
+    'Google Scholar': 2,     # SerpAPI (paid per search)
+    'gemini': 4,
+    'openai': 4,
+    'claude': 4,
+}
+
+
+def _apply_limit_overrides(env_name: str, limits: Dict[str, int]) -> None:
+    """Apply "name=N,name=N" overrides from an environment variable."""
+    for item in os.environ.get(env_name, '').split(','):
+        name, _, limit = item.partition('=')
+        if name.strip() and limit.strip().isdigit():
+            limits[name.strip()] = max(1, int(limit))
+
+
+_apply_limit_overrides('UPSTREAM_CONCURRENCY', UPSTREAM_CONCURRENCY)
+
+# Process-wide worker pools (scheduler.py), per worker process:
+#   notes   - per-note / per-citation document work (submits to network)
+#   network - engine and API calls
+#   ai      - AI provider calls
+# Override with e.g. POOL_SIZES="network=48,notes=16"
+POOL_SIZES: Dict[str, int] = {
+    'notes': 16,
+    'network': 32,
+    'ai': 12,       # gemini + openai + claude UPSTREAM_CONCURRENCY
+}
+
+_apply_limit_overrides('POOL_SIZES', POOL_SIZES)
+
+# Request rates per upstream host (engines/rate_limit.py), shared by all
+# threads and worker processes: host -> requests per second, with bursts
+# of up to one second's worth. Applied to requests made through
+# SearchEngine._make_request. Hosts not listed aren't throttled until
+# they answer 429. Override with e.g. RATE_LIMITS="api.crossref.org=20"
+RATE_LIMITS: Dict[str, float] = {
+    'api.crossref.org': 10,          # Crossref polite pool (mailto in User-Agent)
+    'api.openalex.org': 10,
+    'eutils.ncbi.nlm.nih.gov': 10 if PUBMED_API_KEY else 3,   # NCBI E-utilities
+    'api.semanticscholar.org': 1,
+    'serpapi.com': 1,
+    'www.courtlistener.com': 1,      # 5,000/hour (CourtListenerEngine._api_request)
+    'export.arxiv.org': 0.33,        # One request every 3 seconds
+}
+
+for _item in os.environ.get('RATE_LIMITS', '').split(','):
+    _host, _, _rate = _item.partition('=')
+    try:
+        if _host.strip() and float(_rate) > 0:
+            RATE_LIMITS[_host.strip()] = float(_rate)
+    except ValueError:
+        pass
+
 # =============================================================================
 # GEMINI SETTINGS
 # =============================================================================
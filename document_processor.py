@@ -8,27 +8,48 @@ Ported from the monolithic citation_manager.py to preserve:
 - Italic formatting via <i> tags
 - Clickable hyperlinks for URLs
 
-This approach extracts the docx as a zip, manipulates the XML directly,
+This approach opens the docx as a zip, manipulates the XML directly,
 and repackages it - giving full control over Word's internal structure.
+Members are read in memory via DocxPackage (docx_package.py); parts that
+aren't edited are copied into the output without recompression.
 
 Version History:
+    2026-10-16: fetch_citations() delegates its windowed submission to
+                scheduler.Pool.map_window(), shared with the other batch lookups
+    2026-10-16: fetch_citations() counts timed-out lookups against its window
+                until they return, so abandoned calls can't pile up on the pool.
+    2026-10-16: fetch_citations() runs on the shared scheduler notes pool instead of
+                a ThreadPoolExecutor per document (at most `workers` in flight)
+    2026-10-16: Within-document deduplication - process_document groups notes by
+                citation_source_key() (normalized text minus page pinpoint) and
+                looks each distinct source up once
+    2026-10-16: Link activation runs as a transform on the in-memory package
+                (LinkActivator.apply) inside the single save - one zip write
+                per upload or note edit
+    2026-10-16: No more temp dirs - WordDocumentProcessor, LinkActivator and
+                update_document_note work on a DocxPackage in memory
     2025-12-05 12:53: Enhanced IBID_PATTERN to recognize "Id." (Bluebook) and "pp." prefixes
                       Switched from router to unified_router import
     2025-12-05 13:15: Verified ibid detection passes 13/13 tests including Id. at X patterns
+    2026-10-16: WordDocumentProcessor parses endnotes.xml/footnotes.xml once, keeps an
+                id -> element index, and serializes each edited part once on save
+    2026-10-16: process_document is two-phase: fetch_citations() resolves all notes
+                concurrently (bounded pool, per-note timeout, global deadline), then
+                the ordered CitationHistory pass applies ibid/short forms
 """
 
 import os
 import re
+import time
 import html
-import zipfile
-import tempfile
-import shutil
 import xml.etree.ElementTree as ET
 from typing import List, Optional, Dict, Any, Tuple
 from dataclasses import dataclass, field
 from io import BytesIO
 
 from models import normalize_doi
+from docx_package import DocxPackage
+from scheduler import get_pool
 
 
 # =============================================================================
@@ -104,6 +125,51 @@ def extract_ibid_page(text: str) -> Optional[str]:
     return None
 
 
+
+# =============================================================================
+# SOURCE GROUPING (within-document deduplication)
+# =============================================================================
+
+# Trailing page pinpoint: ", 45" / ", p. 45" / ", pp. 45-50". Four-digit
+# numbers that look like years are left alone ("Smith, Title, 1999").
+PINPOINT_PATTERN = re.compile(
+    r',\s*(?:pp?\.?\s*)?(?!(?:1[5-9]|20)\d\d\b)\d+(?:\s*[\-–]\s*\d+)?\.?\s*$',
+    re.IGNORECASE
+)
+
+
+def citation_source_key(text: str) -> str:
+    """
+    Key identifying the source a note cites, ignoring its page pinpoint.
+    
+    Examples:
+    - "Smith, The Book, 45." and "smith,  The Book, pp. 112-14" → same key
+    - "Smith, The Book, 1999" keeps its year
+    
+    Args:
+        text: The note text
+        
+    Returns:
+        Normalized key (citation_cache.normalize_query of the text
+        without its trailing pinpoint)
+    """
+    from citation_cache import normalize_query
+    
+    return normalize_query(PINPOINT_PATTERN.sub('', text.strip()))
+
+
+def group_notes_by_source(texts: List[str]) -> Dict[str, List[int]]:
+    """
+    Group note indexes by citation_source_key(), in document order.
+    
+    Each group's first index is its representative: the one note whose
+    text is actually looked up.
+    """
+    groups: Dict[str, List[int]] = {}
+    for index, text in enumerate(texts):
+        groups.setdefault(citation_source_key(text), []).append(index)
+    return groups
+
 def normalize_url(url: str) -> str:
     """
     Normalize a URL for comparison purposes.
@@ -348,8 +414,19 @@ class WordDocumentProcessor:
     Preserves the main document body while allowing citation fixes.
     
     Uses direct XML manipulation for precise control over Word's structure.
+    
+    Notes parts (endnotes.xml, footnotes.xml) are parsed once and kept in
+    memory with an id -> element index; write_endnote()/write_footnote()
+    edit the tree in place and each edited part is serialized once, in
+    save_to_buffer()/save_as().
     """
     
+    # kind -> (part path, note tag, reference run tag, reference style)
+    NOTE_PARTS = {
+        'endnote': ('word/endnotes.xml', 'endnote', 'endnoteRef', 'EndnoteReference'),
+        'footnote': ('word/footnotes.xml', 'footnote', 'footnoteRef', 'FootnoteReference'),
+    }
+    
     NS = {
         'w': 'http://schemas.openxmlformats.org/wordprocessingml/2006/main',
         'xml': 'http://www.w3.org/XML/1998/namespace',
@@ -360,19 +437,16 @@ class WordDocumentProcessor:
         """
         Initialize with a file path or file-like object (BytesIO).
         """
-        self.temp_dir = tempfile.mkdtemp()
         self.original_path = None
         
+        # Parsed notes parts: kind -> (tree, {note_id: element}); see _note_part()
+        self._note_parts: Dict[str, Tuple[ET.ElementTree, Dict[str, ET.Element]]] = {}
+        self._dirty_parts = set()
+        
         # Handle both file paths and file-like objects
-        if hasattr(file_path_or_buffer, 'read'):
-            # It's a file-like object (e.g., from upload)
-            with zipfile.ZipFile(file_path_or_buffer, 'r') as z:
-                z.extractall(self.temp_dir)
-        else:
-            # It's a file path
+        if not hasattr(file_path_or_buffer, 'read'):
             self.original_path = file_path_or_buffer
-            with zipfile.ZipFile(file_path_or_buffer, 'r') as z:
-                z.extractall(self.temp_dir)
+        self.package = DocxPackage(file_path_or_buffer)
     
     def get_endnotes(self) -> List[Dict[str, str]]:
         """
@@ -381,13 +455,11 @@ class WordDocumentProcessor:
         Returns:
             List of dicts: [{'id': '1', 'text': 'citation text'}, ...]
         """
-        endnotes_path = os.path.join(self.temp_dir, 'word', 'endnotes.xml')
-        if not os.path.exists(endnotes_path):
-            return []
-        
         try:
-            tree = ET.parse(endnotes_path)
-            root = tree.getroot()
+            part = self._note_part('endnote')
+            if part is None:
+                return []
+            root = part[0].getroot()
             notes = []
             
             for endnote in root.findall('.//w:endnote', self.NS):
@@ -423,13 +495,11 @@ class WordDocumentProcessor:
         Returns:
             List of dicts: [{'id': '1', 'text': 'citation text'}, ...]
         """
-        footnotes_path = os.path.join(self.temp_dir, 'word', 'footnotes.xml')
-        if not os.path.exists(footnotes_path):
-            return []
-        
         try:
-            tree = ET.parse(footnotes_path)
-            root = tree.getroot()
+            part = self._note_part('footnote')
+            if part is None:
+                return []
+            root = part[0].getroot()
             notes = []
             
             for footnote in root.findall('.//w:footnote', self.NS):
@@ -473,12 +543,10 @@ class WordDocumentProcessor:
         Returns:
             List of dicts with unique author-year combinations for reference generation
         """
-        document_path = os.path.join(self.temp_dir, 'word', 'document.xml')
-        if not os.path.exists(document_path):
-            return []
-        
         try:
-            tree = ET.parse(document_path)
+            tree = self.package.parse_xml('word/document.xml')
+            if tree is None:
+                return []
             root = tree.getroot()
             
             # Extract full document text
@@ -629,13 +697,11 @@ class WordDocumentProcessor:
         Returns:
             bool: True if successful
         """
-        document_path = os.path.join(self.temp_dir, 'word', 'document.xml')
-        if not os.path.exists(document_path):
+        if not self.package.has_part('word/document.xml'):
             return False
         
         try:
-            with open(document_path, 'r', encoding='utf-8') as f:
-                content = f.read()
+            content = self.package.read_text('word/document.xml')
             
             # Escape for regex
             escaped_old = re.escape(old_text)
@@ -644,8 +710,7 @@ class WordDocumentProcessor:
             new_content, count = re.subn(escaped_old, new_text, content, count=1)
             
             if count > 0:
-                with open(document_path, 'w', encoding='utf-8') as f:
-                    f.write(new_content)
+                self.package.write('word/document.xml', new_content)
                 return True
             
             return False
@@ -654,108 +719,139 @@ class WordDocumentProcessor:
             print(f"[WordDocumentProcessor] Error replacing body citation: {e}")
             return False
     
-    def write_endnote(self, note_id: str, new_content: str) -> bool:
+    def _note_part(self, kind: str) -> Optional[Tuple[ET.ElementTree, Dict[str, ET.Element]]]:
         """
-        Replace an endnote's content with new formatted citation.
-        Handles <i> tags for italics using regex (no BeautifulSoup needed).
-        PRESERVES the endnoteRef element for proper numbering and linking.
+        Get the parsed notes part for 'endnote' or 'footnote', parsing it on
+        first use.
         
-        Args:
-            note_id: The endnote ID to update
-            new_content: New citation text (may contain <i> tags for italics)
-            
         Returns:
-            bool: True if successful
+            (tree, {note_id: note element}), or None if the part doesn't exist
         """
-        endnotes_path = os.path.join(self.temp_dir, 'word', 'endnotes.xml')
-        if not os.path.exists(endnotes_path):
+        if kind in self._note_parts:
+            return self._note_parts[kind]
+        
+        part_name, note_tag, _, _ = self.NOTE_PARTS[kind]
+        
+        # Register namespaces so the serialized part keeps the w:/xml: prefixes
+        ET.register_namespace('w', self.NS['w'])
+        ET.register_namespace('xml', self.NS['xml'])
+        
+        tree = self.package.parse_xml(part_name)
+        if tree is None:
+            return None
+        index = {
+            note.get(f"{{{self.NS['w']}}}id"): note
+            for note in tree.getroot().iter(f"{{{self.NS['w']}}}{note_tag}")
+        }
+        self._note_parts[kind] = (tree, index)
+        return self._note_parts[kind]
+    
+    def _flush_note_parts(self) -> None:
+        """Serialize each edited notes part back into the package (once per save)."""
+        for kind in list(self._dirty_parts):
+            tree, _ = self._note_parts[kind]
+            self.package.write_xml(self.NOTE_PARTS[kind][0], tree)
+            self._dirty_parts.discard(kind)
+    
+    def _write_note(self, kind: str, note_id: str, new_content: str) -> bool:
+        """
+        Replace a note's content in the in-memory notes tree.
+        Handles <i> tags for italics using regex (no BeautifulSoup needed).
+        PRESERVES the endnoteRef/footnoteRef element for proper numbering and linking.
+        """
+        _, _, ref_tag, ref_style = self.NOTE_PARTS[kind]
+        
+        part = self._note_part(kind)
+        if part is None:
             return False
         
-        try:
-            # Register namespace to preserve it
-            ET.register_namespace('w', self.NS['w'])
-            ET.register_namespace('xml', self.NS['xml'])
-            
-            tree = ET.parse(endnotes_path)
-            root = tree.getroot()
-            
-            # Find the target endnote
-            target = None
-            for endnote in root.findall('.//w:endnote', self.NS):
-                if endnote.get(f"{{{self.NS['w']}}}id") == str(note_id):
-                    target = endnote
-                    break
-            
-            if target is None:
-                return False
+        target = part[1].get(str(note_id))
+        if target is None:
+            return False
+        
+        para = target.find('.//w:p', self.NS)
+        if para is None:
+            para = ET.SubElement(target, f"{{{self.NS['w']}}}p")
+        else:
+            # FIXED: Preserve paragraph properties AND the note reference run
+            preserved_pPr = None
+            preserved_ref_run = None
             
-            # Find or create paragraph
-            para = target.find('.//w:p', self.NS)
-            if para is None:
-                para = ET.SubElement(target, f"{{{self.NS['w']}}}p")
-            else:
-                # FIXED: Preserve paragraph properties AND endnoteRef run
-                preserved_pPr = None
-                preserved_endnoteRef_run = None
+            for child in list(para):
+                tag = child.tag.replace(f"{{{self.NS['w']}}}", "")
                 
-                for child in list(para):
-                    tag = child.tag.replace(f"{{{self.NS['w']}}}", "")
-                    
-                    # Preserve paragraph properties
-                    if tag == 'pPr':
-                        preserved_pPr = child
+                # Preserve paragraph properties
+                if tag == 'pPr':
+                    preserved_pPr = child
+                    continue
+                
+                # Check if this run contains the endnoteRef/footnoteRef
+                if tag == 'r':
+                    note_ref = child.find(f".//{{{self.NS['w']}}}{ref_tag}")
+                    if note_ref is not None:
+                        preserved_ref_run = child
                         continue
-                    
-                    # Check if this run contains endnoteRef
-                    if tag == 'r':
-                        endnote_ref = child.find(f".//{{{self.NS['w']}}}endnoteRef")
-                        if endnote_ref is not None:
-                            preserved_endnoteRef_run = child
-                            continue
-                    
-                    # Remove all other children
-                    para.remove(child)
                 
-                # If no endnoteRef run was found, create one
-                if preserved_endnoteRef_run is None:
-                    ref_run = ET.Element(f"{{{self.NS['w']}}}r")
-                    rPr = ET.SubElement(ref_run, f"{{{self.NS['w']}}}rPr")
-                    rStyle = ET.SubElement(rPr, f"{{{self.NS['w']}}}rStyle")
-                    rStyle.set(f"{{{self.NS['w']}}}val", "EndnoteReference")
-                    ET.SubElement(ref_run, f"{{{self.NS['w']}}}endnoteRef")
-                    
-                    # Insert after pPr if it exists, otherwise at beginning
-                    if preserved_pPr is not None:
-                        idx = list(para).index(preserved_pPr) + 1
-                        para.insert(idx, ref_run)
-                    else:
-                        para.insert(0, ref_run)
-            
-            # Parse content using regex to handle <i> tags (no BeautifulSoup)
-            parts = re.split(r'(<i>.*?</i>)', html.unescape(new_content))
-            
-            for part in parts:
-                if not part:
-                    continue
-                    
-                run = ET.SubElement(para, f"{{{self.NS['w']}}}r")
+                # Remove all other children
+                para.remove(child)
+            
+            # If no reference run was found, create one
+            if preserved_ref_run is None:
+                ref_run = ET.Element(f"{{{self.NS['w']}}}r")
+                rPr = ET.SubElement(ref_run, f"{{{self.NS['w']}}}rPr")
+                rStyle = ET.SubElement(rPr, f"{{{self.NS['w']}}}rStyle")
+                rStyle.set(f"{{{self.NS['w']}}}val", ref_style)
+                ET.SubElement(ref_run, f"{{{self.NS['w']}}}{ref_tag}")
                 
-                # Check if this is italic text
-                italic_match = re.match(r'<i>(.*?)</i>', part)
-                if italic_match:
-                    rPr = ET.SubElement(run, f"{{{self.NS['w']}}}rPr")
-                    ET.SubElement(rPr, f"{{{self.NS['w']}}}i")
-                    text_content = italic_match.group(1)
+                # Insert after pPr if it exists, otherwise at beginning
+                if preserved_pPr is not None:
+                    idx = list(para).index(preserved_pPr) + 1
+                    para.insert(idx, ref_run)
                 else:
-                    text_content = part
+                    para.insert(0, ref_run)
+        
+        # Parse content using regex to handle <i> tags (no BeautifulSoup)
+        parts = re.split(r'(<i>.*?</i>)', html.unescape(new_content))
+        
+        for part in parts:
+            if not part:
+                continue
                 
-                t = ET.SubElement(run, f"{{{self.NS['w']}}}t")
-                t.text = text_content
-                t.set(f"{{{self.NS['xml']}}}space", "preserve")
+            run = ET.SubElement(para, f"{{{self.NS['w']}}}r")
+            
+            # Check if this is italic text
+            italic_match = re.match(r'<i>(.*?)</i>', part)
+            if italic_match:
+                rPr = ET.SubElement(run, f"{{{self.NS['w']}}}rPr")
+                ET.SubElement(rPr, f"{{{self.NS['w']}}}i")
+                text_content = italic_match.group(1)
+            else:
+                text_content = part
             
-            tree.write(endnotes_path, encoding='UTF-8', xml_declaration=True)
-            return True
+            t = ET.SubElement(run, f"{{{self.NS['w']}}}t")
+            t.text = text_content
+            t.set(f"{{{self.NS['xml']}}}space", "preserve")
+        
+        self._dirty_parts.add(kind)
+        return True
+    
+    def write_endnote(self, note_id: str, new_content: str) -> bool:
+        """
+        Replace an endnote's content with new formatted citation.
+        Handles <i> tags for italics using regex (no BeautifulSoup needed).
+        PRESERVES the endnoteRef element for proper numbering and linking.
+        
+        The change is held in memory until save_to_buffer()/save_as().
+        
+        Args:
+            note_id: The endnote ID to update
+            new_content: New citation text (may contain <i> tags for italics)
             
+        Returns:
+            bool: True if successful
+        """
+        try:
+            return self._write_note('endnote', note_id, new_content)
         except Exception as e:
             print(f"[WordDocumentProcessor] Error writing endnote: {e}")
             return False
@@ -765,113 +861,29 @@ class WordDocumentProcessor:
         Replace a footnote's content with new formatted citation.
         Handles <i> tags for italics using regex (no BeautifulSoup needed).
         PRESERVES the footnoteRef element for proper numbering and linking.
-        """
-        footnotes_path = os.path.join(self.temp_dir, 'word', 'footnotes.xml')
-        if not os.path.exists(footnotes_path):
-            return False
         
+        The change is held in memory until save_to_buffer()/save_as().
+        """
         try:
-            ET.register_namespace('w', self.NS['w'])
-            ET.register_namespace('xml', self.NS['xml'])
-            
-            tree = ET.parse(footnotes_path)
-            root = tree.getroot()
-            
-            target = None
-            for footnote in root.findall('.//w:footnote', self.NS):
-                if footnote.get(f"{{{self.NS['w']}}}id") == str(note_id):
-                    target = footnote
-                    break
-            
-            if target is None:
-                return False
-            
-            para = target.find('.//w:p', self.NS)
-            if para is None:
-                para = ET.SubElement(target, f"{{{self.NS['w']}}}p")
-            else:
-                # FIXED: Preserve paragraph properties AND footnoteRef run
-                preserved_pPr = None
-                preserved_footnoteRef_run = None
-                
-                for child in list(para):
-                    tag = child.tag.replace(f"{{{self.NS['w']}}}", "")
-                    
-                    # Preserve paragraph properties
-                    if tag == 'pPr':
-                        preserved_pPr = child
-                        continue
-                    
-                    # Check if this run contains footnoteRef
-                    if tag == 'r':
-                        footnote_ref = child.find(f".//{{{self.NS['w']}}}footnoteRef")
-                        if footnote_ref is not None:
-                            preserved_footnoteRef_run = child
-                            continue
-                    
-                    # Remove all other children
-                    para.remove(child)
-                
-                # If no footnoteRef run was found, create one
-                if preserved_footnoteRef_run is None:
-                    ref_run = ET.Element(f"{{{self.NS['w']}}}r")
-                    rPr = ET.SubElement(ref_run, f"{{{self.NS['w']}}}rPr")
-                    rStyle = ET.SubElement(rPr, f"{{{self.NS['w']}}}rStyle")
-                    rStyle.set(f"{{{self.NS['w']}}}val", "FootnoteReference")
-                    ET.SubElement(ref_run, f"{{{self.NS['w']}}}footnoteRef")
-                    
-                    # Insert after pPr if it exists, otherwise at beginning
-                    if preserved_pPr is not None:
-                        idx = list(para).index(preserved_pPr) + 1
-                        para.insert(idx, ref_run)
-                    else:
-                        para.insert(0, ref_run)
-            
-            # Parse content using regex to handle <i> tags
-            parts = re.split(r'(<i>.*?</i>)', html.unescape(new_content))
-            
-            for part in parts:
-                if not part:
-                    continue
-                    
-                run = ET.SubElement(para, f"{{{self.NS['w']}}}r")
-                
-                # Check if this is italic text
-                italic_match = re.match(r'<i>(.*?)</i>', part)
-                if italic_match:
-                    rPr = ET.SubElement(run, f"{{{self.NS['w']}}}rPr")
-                    ET.SubElement(rPr, f"{{{self.NS['w']}}}i")
-                    text_content = italic_match.group(1)
-                else:
-                    text_content = part
-                
-                t = ET.SubElement(run, f"{{{self.NS['w']}}}t")
-                t.text = text_content
-                t.set(f"{{{self.NS['xml']}}}space", "preserve")
-            
-            tree.write(footnotes_path, encoding='UTF-8', xml_declaration=True)
-            return True
-            
+            return self._write_note('footnote', note_id, new_content)
         except Exception as e:
             print(f"[WordDocumentProcessor] Error writing footnote: {e}")
             return False
     
-    def save_to_buffer(self) -> BytesIO:
+    def save_to_buffer(self, add_links: bool = False) -> BytesIO:
         """
         Save the modified document to a BytesIO buffer.
         
+        Args:
+            add_links: Make URLs clickable (LinkActivator) in the same pass
+        
         Returns:
             BytesIO buffer containing the .docx file
         """
-        buffer = BytesIO()
-        with zipfile.ZipFile(buffer, 'w', zipfile.ZIP_DEFLATED) as zipf:
-            for root, dirs, files in os.walk(self.temp_dir):
-                for file in files:
-                    file_path = os.path.join(root, file)
-                    arcname = os.path.relpath(file_path, self.temp_dir)
-                    zipf.write(file_path, arcname)
-        buffer.seek(0)
-        return buffer
+        self._flush_note_parts()
+        if add_links:
+            LinkActivator.apply(self.package)
+        return self.package.save()
     
     def save_as(self, output_path: str) -> None:
         """
@@ -880,17 +892,12 @@ class WordDocumentProcessor:
         Args:
             output_path: Path for the output .docx file
         """
-        with zipfile.ZipFile(output_path, 'w', zipfile.ZIP_DEFLATED) as zipf:
-            for root, dirs, files in os.walk(self.temp_dir):
-                for file in files:
-                    file_path = os.path.join(root, file)
-                    arcname = os.path.relpath(file_path, self.temp_dir)
-                    zipf.write(file_path, arcname)
+        self._flush_note_parts()
+        self.package.save(output_path)
     
     def cleanup(self) -> None:
-        """Remove temporary files."""
-        if os.path.exists(self.temp_dir):
-            shutil.rmtree(self.temp_dir)
+        """Release the source package."""
+        self.package.close()
     
     def __del__(self):
         """Cleanup on deletion."""
@@ -915,63 +922,60 @@ class LinkActivator:
     # Pattern to match URLs
     URL_PATTERN = re.compile(r'(https?://[^\s<>"]+)')
     
+    # Parts scanned for URLs
+    TARGET_FILES = [
+        'word/document.xml',
+        'word/endnotes.xml',
+        'word/footnotes.xml'
+    ]
+    
+    @classmethod
+    def apply(cls, package: DocxPackage) -> None:
+        """
+        Make URLs clickable in an in-memory package, as a transform stage
+        before the package's one save() - no extra unzip/rezip.
+        
+        Args:
+            package: DocxPackage to modify in place
+        """
+        for xml_file in cls.TARGET_FILES:
+            if package.has_part(xml_file):
+                content = package.read_text(xml_file)
+                new_content = cls._process_xml(content)
+                if new_content != content:
+                    package.write(xml_file, new_content)
+    
     @classmethod
     def process(cls, docx_buffer: BytesIO) -> BytesIO:
         """
         Process a .docx file to make all URLs clickable.
         
+        Prefer apply() when the document is already open as a DocxPackage.
+        
         Args:
             docx_buffer: BytesIO containing the input .docx file
             
         Returns:
             BytesIO containing the processed .docx file with clickable URLs
         """
-        temp_dir = tempfile.mkdtemp()
-        
         try:
-            # Extract docx to temp directory
-            docx_buffer.seek(0)
-            with zipfile.ZipFile(docx_buffer, 'r') as zf:
-                zf.extractall(temp_dir)
-            
-            # Process each relevant XML file
-            target_files = [
-                'word/document.xml',
-                'word/endnotes.xml',
-                'word/footnotes.xml'
-            ]
-            
-            for xml_file in target_files:
-                full_path = os.path.join(temp_dir, xml_file)
-                if os.path.exists(full_path):
-                    cls._process_xml_file(full_path)
+            package = DocxPackage(docx_buffer)
+            cls.apply(package)
             
-            # Repackage as docx
-            output_buffer = BytesIO()
-            with zipfile.ZipFile(output_buffer, 'w', zipfile.ZIP_DEFLATED) as zf:
-                for root, dirs, files in os.walk(temp_dir):
-                    for file in files:
-                        file_path = os.path.join(root, file)
-                        arcname = os.path.relpath(file_path, temp_dir)
-                        zf.write(file_path, arcname)
+            if not package.is_modified():
+                docx_buffer.seek(0)
+                return docx_buffer
             
-            output_buffer.seek(0)
-            return output_buffer
+            return package.save()
             
         except Exception as e:
             print(f"[LinkActivator] Error: {e}")
             docx_buffer.seek(0)
             return docx_buffer
-            
-        finally:
-            if os.path.exists(temp_dir):
-                shutil.rmtree(temp_dir)
     
     @classmethod
-    def _process_xml_file(cls, file_path: str):
-        """Process a single XML file to convert URLs to hyperlinks."""
-        with open(file_path, 'r', encoding='utf-8') as f:
-            content = f.read()
+    def _process_xml(cls, content: str) -> str:
+        """Convert URLs to hyperlinks in one XML part's content."""
         
         # Pattern to find URLs within w:t elements
         pattern = r'(<w:t[^>]*>)([^<]*?)(https?://[^\s<>"]+)([^<]*?)(</w:t>)'
@@ -1025,11 +1029,7 @@ class LinkActivator:
             return result
         
         # Apply the replacement
-        new_content = re.sub(pattern, replace_url, content)
-        
-        # Write back
-        with open(file_path, 'w', encoding='utf-8') as f:
-            f.write(new_content)
+        return re.sub(pattern, replace_url, content)
     
     @classmethod
     def _build_hyperlink_field(cls, safe_url: str, display_text: str) -> str:
@@ -1063,6 +1063,61 @@ class LinkActivator:
         return field_xml
 
 
+# =============================================================================
+# CONCURRENT METADATA FETCH (Phase 1 of process_document)
+# =============================================================================
+
+# Up to FETCH_WORKERS lookups run at once. Each note gets NOTE_TIMEOUT seconds
+# from when its lookup starts; the whole phase stops at DOCUMENT_DEADLINE
+# (kept under gunicorn's 120s worker timeout). Per-API limits are enforced
+# at the call sites - see config.UPSTREAM_CONCURRENCY.
+FETCH_WORKERS = int(os.environ.get('CITATION_FETCH_WORKERS', '10'))
+NOTE_TIMEOUT = 8  # seconds per note
+DOCUMENT_DEADLINE = int(os.environ.get('CITATION_DOCUMENT_DEADLINE', '90'))  # seconds
+
+
+def fetch_citations(
+    texts: List[str],
+    style: str,
+    workers: int = FETCH_WORKERS,
+    note_timeout: float = NOTE_TIMEOUT,
+    deadline: float = DOCUMENT_DEADLINE
+) -> List[Tuple[Any, Optional[str]]]:
+    """
+    Resolve many citation texts concurrently.
+    
+    Lookups that exceed note_timeout, or that haven't finished when the
+    deadline passes, resolve to (None, None) and aren't waited on. A timed
+    out lookup keeps its pool thread until get_citation returns, so it still
+    counts against `workers` until then - slow upstreams can't make one
+    document hold more than `workers` notes-pool threads.
+    
+    Args:
+        texts: Citation texts, in document order
+        style: Citation style to use
+        workers: Max concurrent lookups
+        note_timeout: Seconds allowed per lookup once it has started
+        deadline: Seconds allowed for the whole batch
+        
+    Returns:
+        List of (metadata, formatted) tuples aligned with texts
+    """
+    from unified_router import get_citation
+    
+    # Lookups run on the shared notes pool; at most `workers` of this
+    # document's are in flight at a time so one large document can't
+    # queue ahead of every other request's notes
+    results = get_pool('notes').map_window(
+        lambda text: get_citation(text, style),
+        texts,
+        window=workers,
+        item_timeout=note_timeout,
+        deadline=deadline,
+        label='process_document'
+    )
+    return [result or (None, None) for result in results]
+
+
 def process_document(
     file_bytes: bytes,
     style: str = "Chicago Manual of Style",
@@ -1080,6 +1135,11 @@ def process_document(
     - Explicit ibid references (user typed "ibid" or "ibid., 45")
     - Repetitive URLs (same URL as previous note → ibid)
     
+    Two phases:
+    1. fetch_citations() looks up every non-ibid note concurrently
+    2. Notes are written in document order, with CitationHistory deciding
+       full / short / ibid form
+    
     Args:
         file_bytes: The document as bytes
         style: Citation style to use
@@ -1089,12 +1149,7 @@ def process_document(
         Tuple of (processed_document_bytes, results_list)
     """
     # Import here to avoid circular imports
-    from unified_router import get_citation
     from formatters.base import BaseFormatter, get_formatter
-    from concurrent.futures import ThreadPoolExecutor, TimeoutError as FuturesTimeout
-    
-    # Per-note timeout to prevent indefinite hanging
-    NOTE_TIMEOUT = 8  # seconds per note
     
     results = []
     
@@ -1111,23 +1166,15 @@ def process_document(
     endnotes = processor.get_endnotes()
     footnotes = processor.get_footnotes()
     
-    # Helper to call get_citation with timeout
-    def get_citation_with_timeout(text: str, style: str, timeout: int = NOTE_TIMEOUT):
-        """Call get_citation with a timeout wrapper."""
-        with ThreadPoolExecutor(max_workers=1) as executor:
-            future = executor.submit(get_citation, text, style)
-            try:
-                return future.result(timeout=timeout)
-            except FuturesTimeout:
-                print(f"[process_document] Timeout after {timeout}s for: {text[:50]}...")
-                return None, None
-            except Exception as e:
-                print(f"[process_document] Error in get_citation: {e}")
-                return None, None
-    
-    def process_single_note(note: Dict[str, str], note_type: str) -> ProcessedCitation:
+    def process_single_note(
+        note: Dict[str, str],
+        note_type: str,
+        fetched: Tuple[Any, Optional[str]]
+    ) -> ProcessedCitation:
         """
-        Process a single endnote or footnote.
+        Process a single endnote or footnote (Phase 2 - must run in order).
+        
+        fetched is the (metadata, formatted) pair from Phase 1.
         """
         note_id = note['id']
         original_text = note['text']
@@ -1166,8 +1213,8 @@ def process_document(
                     citation_form="ibid"
                 )
             
-            # Case 2+: Process citation to get metadata (with timeout)
-            metadata, full_formatted = get_citation_with_timeout(original_text, style)
+            # Case 2+: Use the metadata fetched in Phase 1
+            metadata, full_formatted = fetched
             
             if not metadata or not full_formatted:
                 return ProcessedCitation(
@@ -1270,29 +1317,35 @@ def process_document(
                 citation_form="full"
             )
     
-    # Process endnotes
-    total_notes = len(endnotes) + len(footnotes)
-    print(f"[process_document] Processing {len(endnotes)} endnotes, {len(footnotes)} footnotes ({total_notes} total)")
+    # Combine all notes with their types, maintaining document order
+    all_notes = [(note, 'endnote') for note in endnotes]
+    all_notes += [(note, 'footnote') for note in footnotes]
     
-    for idx, note in enumerate(endnotes):
-        print(f"[process_document] Processing endnote {idx+1}/{len(endnotes)}: {note.get('text', '')[:40]}...")
-        result = process_single_note(note, 'endnote')
-        results.append(result)
-        print(f"[process_document] Endnote {idx+1} {'✔' if result.success else '✗'}")
+    total_notes = len(all_notes)
+    print(f"[process_document] Processing {len(endnotes)} endnotes, {len(footnotes)} footnotes ({total_notes} total)")
     
-    # Process footnotes
-    for idx, note in enumerate(footnotes):
-        print(f"[process_document] Processing footnote {idx+1}/{len(footnotes)}: {note.get('text', '')[:40]}...")
-        result = process_single_note(note, 'footnote')
+    # --- PHASE 1: Concurrent metadata fetching ---
+    # Explicit ibids need no lookup; notes citing the same source (differing
+    # only in page pinpoint) are looked up once and the result shared
+    lookup_indexes = [i for i, (note, _) in enumerate(all_notes) if not is_ibid(note['text'])]
+    groups = list(group_notes_by_source([all_notes[i][0]['text'] for i in lookup_indexes]).values())
+    phase_start = time.monotonic()
+    fetched_list = fetch_citations([all_notes[lookup_indexes[group[0]]][0]['text'] for group in groups], style)
+    fetched = {}
+    for group, result in zip(groups, fetched_list):
+        for position in group:
+            fetched[lookup_indexes[position]] = result
+    print(f"[process_document] Phase 1 complete: {len(groups)} lookups for {len(lookup_indexes)} notes "
+          f"in {time.monotonic() - phase_start:.1f}s")
+    
+    # --- PHASE 2: Ordered ibid/short form pass ---
+    for idx, (note, note_type) in enumerate(all_notes):
+        result = process_single_note(note, note_type, fetched.get(idx, (None, None)))
         results.append(result)
-        print(f"[process_document] Footnote {idx+1} {'✔' if result.success else '✗'}")
+        print(f"[process_document] {note_type.capitalize()} {note['id']} {'✔' if result.success else '✗'}")
     
-    # Save to buffer
-    doc_buffer = processor.save_to_buffer()
-    
-    # Make URLs clickable if requested
-    if add_links:
-        doc_buffer = LinkActivator.process(doc_buffer)
+    # Save to buffer, making URLs clickable in the same pass if requested
+    doc_buffer = processor.save_to_buffer(add_links=add_links)
     
     # Cleanup
     processor.cleanup()
@@ -1320,34 +1373,19 @@ def update_document_note(doc_bytes: bytes, note_id: int, new_html: str) -> bytes
     Returns:
         Updated document as bytes
     """
-    import io
-    import zipfile
-    import tempfile
-    import shutil
-    import re
-    
     try:
-        # Extract the docx
-        temp_dir = tempfile.mkdtemp()
-        
-        with zipfile.ZipFile(io.BytesIO(doc_bytes), 'r') as zf:
-            zf.extractall(temp_dir)
-        
-        # Find and update the endnote
-        endnotes_path = os.path.join(temp_dir, 'word', 'endnotes.xml')
-        footnotes_path = os.path.join(temp_dir, 'word', 'footnotes.xml')
+        package = DocxPackage(doc_bytes)
         
         updated = False
         
-        for xml_path, note_tag in [(endnotes_path, 'w:endnote'), (footnotes_path, 'w:footnote')]:
-            if not os.path.exists(xml_path):
+        for xml_path, note_tag in [('word/endnotes.xml', 'w:endnote'), ('word/footnotes.xml', 'w:footnote')]:
+            if not package.has_part(xml_path):
                 continue
             
             # Determine note type for styling
             note_type = 'footnote' if 'footnote' in xml_path else 'endnote'
-                
-            with open(xml_path, 'r', encoding='utf-8') as f:
-                content = f.read()
+            
+            content = package.read_text(xml_path)
             
             # Find the note with matching ID
             # Pattern: <w:endnote w:id="N">...</w:endnote>
@@ -1365,29 +1403,15 @@ def update_document_note(doc_bytes: bytes, note_id: int, new_html: str) -> bytes
             new_content, count = re.subn(pattern, replace_note_content, content, flags=re.DOTALL)
             
             if count > 0:
-                with open(xml_path, 'w', encoding='utf-8') as f:
-                    f.write(new_content)
+                package.write(xml_path, new_content)
                 updated = True
                 break
         
-        # Repackage the docx
-        output_buffer = io.BytesIO()
-        with zipfile.ZipFile(output_buffer, 'w', zipfile.ZIP_DEFLATED) as zf:
-            for root, dirs, files in os.walk(temp_dir):
-                for file in files:
-                    file_path = os.path.join(root, file)
-                    arcname = os.path.relpath(file_path, temp_dir)
-                    zf.write(file_path, arcname)
-        
-        # Cleanup
-        shutil.rmtree(temp_dir)
-        
-        output_buffer.seek(0)
-        
-        # Activate any URLs as clickable hyperlinks (use internal LinkActivator)
-        output_buffer = LinkActivator.process(output_buffer)
+        # Activate any URLs as clickable hyperlinks, then write the zip once
+        # (unchanged members are copied verbatim)
+        LinkActivator.apply(package)
         
-        return output_buffer.read()
+        return package.save().read()
         
     except Exception as e:
         print(f"[update_document_note] Error: {e}")
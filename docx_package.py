@@ -0,0 +1,222 @@
+"""
+citeflex/docx_package.py
+
+In-memory access to the parts of a .docx (OOXML zip) package.
+
+The document processors only edit a handful of XML parts (document.xml,
+endnotes.xml, footnotes.xml). Extracting the whole package to a temp dir
+and re-deflating every file - including multi-MB images and fonts - made
+disk I/O and CPU scale with embedded media rather than with the edits.
+
+DocxPackage reads individual members on demand and, on save(), copies
+every untouched member's compressed bytes straight from the source zip.
+Only modified parts are re-compressed.
+
+Usage:
+    package = DocxPackage(doc_bytes)
+    tree = package.parse_xml('word/endnotes.xml')
+    ...edit tree...
+    package.write_xml('word/endnotes.xml', tree)
+    new_bytes = package.save().getvalue()
+
+Version History:
+    2026-10-16: _copy_raw checks for the zipfile internals it uses and falls
+                back to writestr() (rolling back any partial raw write)
+    2026-10-16: Initial implementation - replaces extractall()/os.walk()
+                repackaging in document_processor.py, app.py and
+                processors/author_date.py
+"""
+
+import copy
+import struct
+import zipfile
+import xml.etree.ElementTree as ET
+from io import BytesIO
+from typing import Dict, List, Optional, Union
+
+
+# Local file header: signature + fixed fields; name/extra lengths at 26..30
+_LOCAL_HEADER_SIZE = 30
+_LOCAL_HEADER_SIGNATURE = b'PK\x03\x04'
+
+
+class DocxPackage:
+    """
+    A .docx package whose members are read lazily and written back with
+    untouched members copied verbatim.
+    """
+
+    def __init__(self, source: Union[bytes, str, BytesIO]):
+        """
+        Open a package.
+
+        Args:
+            source: .docx bytes, a file path, or a file-like object
+        """
+        if isinstance(source, (bytes, bytearray)):
+            source = BytesIO(source)
+        elif hasattr(source, 'seek'):
+            source.seek(0)
+        self._zip = zipfile.ZipFile(source, 'r')
+        self._modified: Dict[str, bytes] = {}
+
+    # =========================================================================
+    # READING
+    # =========================================================================
+
+    def names(self) -> List[str]:
+        """List member names, in package order (new members last)."""
+        names = self._zip.namelist()
+        return names + [name for name in self._modified if name not in self._zip.NameToInfo]
+
+    def has_part(self, name: str) -> bool:
+        return name in self._modified or name in self._zip.NameToInfo
+
+    def read(self, name: str) -> bytes:
+        """Read a member's (possibly modified) bytes. Raises KeyError if absent."""
+        if name in self._modified:
+            return self._modified[name]
+        return self._zip.read(name)
+
+    def read_text(self, name: str) -> str:
+        return self.read(name).decode('utf-8')
+
+    def parse_xml(self, name: str) -> Optional[ET.ElementTree]:
+        """Parse an XML member, or return None if it doesn't exist."""
+        if not self.has_part(name):
+            return None
+        return ET.parse(BytesIO(self.read(name)))
+
+    # =========================================================================
+    # WRITING
+    # =========================================================================
+
+    def write(self, name: str, data: Union[bytes, str]) -> None:
+        """Replace (or add) a member. Nothing is compressed until save()."""
+        if isinstance(data, str):
+            data = data.encode('utf-8')
+        self._modified[name] = data
+
+    def write_xml(self, name: str, tree: ET.ElementTree) -> None:
+        """Serialize an ElementTree into a member."""
+        buffer = BytesIO()
+        tree.write(buffer, encoding='UTF-8', xml_declaration=True)
+        self.write(name, buffer.getvalue())
+
+    def is_modified(self) -> bool:
+        return bool(self._modified)
+
+    def save(self, target: Union[str, BytesIO, None] = None) -> BytesIO:
+        """
+        Write the package.
+
+        Modified members are deflated; all others are copied as raw
+        compressed bytes without being decompressed.
+
+        Args:
+            target: File path or writable buffer (default: new BytesIO)
+
+        Returns:
+            The output buffer, rewound (or an empty BytesIO when target is a path)
+        """
+        output = BytesIO() if target is None else target
+
+        with zipfile.ZipFile(output, 'w', zipfile.ZIP_DEFLATED) as out:
+            for info in self._zip.infolist():
+                if info.filename in self._modified:
+                    self._write_member(out, info.filename, self._modified[info.filename], info)
+                else:
+                    self._copy_raw(out, info)
+
+            for name, data in self._modified.items():
+                if name not in self._zip.NameToInfo:
+                    self._write_member(out, name, data)
+
+        if isinstance(output, BytesIO):
+            output.seek(0)
+            return output
+        return BytesIO()
+
+    @staticmethod
+    def _write_member(out: zipfile.ZipFile, name: str, data: bytes,
+                      original: Optional[zipfile.ZipInfo] = None) -> None:
+        info = zipfile.ZipInfo(name, date_time=original.date_time if original else (1980, 1, 1, 0, 0, 0))
+        info.compress_type = zipfile.ZIP_DEFLATED
+        if original is not None:
+            info.external_attr = original.external_attr
+        out.writestr(info, data)
+
+    # ZipFile internals _copy_raw depends on (CPython 3.8 - 3.13 zipfile.py):
+    #   fp          - positioned at start_dir while no member is open for writing
+    #   start_dir   - where close() writes the central directory
+    #   filelist / NameToInfo - the entries close() writes there
+    #   _didModify  - close() only writes the directory when this is set
+    # writestr() seeks to start_dir before each member, so raw copies and
+    # normal writes can be interleaved.
+    _RAW_COPY_ATTRS = ('fp', 'start_dir', 'filelist', 'NameToInfo', '_didModify')
+
+    def _copy_raw(self, out: zipfile.ZipFile, info: zipfile.ZipInfo) -> None:
+        """
+        Append a member's compressed bytes to out without recompressing.
+
+        Falls back to a normal writestr() of the decompressed member if the
+        member can't be read raw or the ZipFile internals above don't behave
+        as expected; a partially written raw copy is rolled back first.
+        """
+        try:
+            raw = self._read_raw(info)
+        except Exception:
+            raw = None
+
+        if (raw is not None and not info.flag_bits & 0x1  # Not encrypted
+                and all(hasattr(out, attr) for attr in self._RAW_COPY_ATTRS)):
+            zinfo = copy.copy(info)
+            zinfo.flag_bits &= ~0x08  # Sizes/CRC go in the local header, no data descriptor
+            zinfo.extra = b''
+            start = None
+            try:
+                start = zinfo.header_offset = out.fp.tell()
+                zip64 = zinfo.file_size > zipfile.ZIP64_LIMIT or zinfo.compress_size > zipfile.ZIP64_LIMIT
+
+                out.fp.write(zinfo.FileHeader(zip64))
+                out.fp.write(raw)
+                out.filelist.append(zinfo)
+                out.NameToInfo[zinfo.filename] = zinfo
+                out.start_dir = out.fp.tell()
+                out._didModify = True
+                return
+            except Exception as e:
+                print(f"[DocxPackage] Raw copy of {info.filename} failed ({e}); recompressing")
+                self._undo_raw_copy(out, zinfo, start)
+
+        self._write_member(out, info.filename, self._zip.read(info.filename), info)
+
+    @staticmethod
+    def _undo_raw_copy(out: zipfile.ZipFile, zinfo: zipfile.ZipInfo, start: Optional[int]) -> None:
+        """Remove whatever a failed _copy_raw wrote to out."""
+        try:
+            if zinfo in out.filelist:
+                out.filelist.remove(zinfo)
+            if out.NameToInfo.get(zinfo.filename) is zinfo:
+                del out.NameToInfo[zinfo.filename]
+            if start is not None:
+                out.fp.seek(start)
+                out.fp.truncate()
+                out.start_dir = start
+        except Exception as e:
+            print(f"[DocxPackage] Could not roll back raw copy of {zinfo.filename}: {e}")
+
+    def _read_raw(self, info: zipfile.ZipInfo) -> Optional[bytes]:
+        """Read a member's compressed bytes from the source zip."""
+        fp = self._zip.fp
+        fp.seek(info.header_offset)
+        header = fp.read(_LOCAL_HEADER_SIZE)
+        if len(header) != _LOCAL_HEADER_SIZE or header[:4] != _LOCAL_HEADER_SIGNATURE:
+            return None
+        name_length, extra_length = struct.unpack('<HH', header[26:30])
+        fp.seek(info.header_offset + _LOCAL_HEADER_SIZE + name_length + extra_length)
+        raw = fp.read(info.compress_size)
+        return raw if len(raw) == info.compress_size else None
+
+    def close(self) -> None:
+        self._zip.close()
@@ -8,7 +8,8 @@ Modules:
     google_cse.py       - Google Custom Search Engine
     google_scholar.py   - Google Scholar via SERPAPI
     doi.py              - DOI extraction from publisher URLs
-    famous_papers.py    - 51K famous papers cache for fast lookup
+    famous_papers.py    - Memory-mapped famous papers index (find_famous_paper, lazy-loaded)
+    snapshot.py         - SnapshotEngine: local Crossref/OpenAlex snapshot (SQLite FTS5) + ingest command
     author_year_search.py - Multi-engine search by author+year (for APA/Harvard)
     base.py             - SearchEngine ABC, MultiAttemptEngine base class
 """
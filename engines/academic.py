@@ -15,6 +15,7 @@ from typing import Optional, List
 from engines.base import SearchEngine
 from models import CitationMetadata, CitationType
 from config import PUBMED_API_KEY, SEMANTIC_SCHOLAR_API_KEY
+from lookup_status import mark_incomplete
 
 # Shorter timeout for faster failures
 ENGINE_TIMEOUT = 5  # seconds
@@ -32,6 +33,7 @@ class CrossrefEngine(SearchEngine):
     
     name = "Crossref"
     base_url = "https://api.crossref.org/works"
+    CACHE_TTL = 7 * 24 * 3600  # DOI records rarely change
     
     def search(self, query: str) -> Optional[CitationMetadata]:
         params = {
@@ -85,8 +87,9 @@ class CrossrefEngine(SearchEngine):
             item = data.get('message', {})
             if item:
                 return self._normalize(item, doi)
-        except:
-            pass
+        except Exception as e:
+            # Unreadable response - not a definitive "no such DOI"
+            mark_incomplete(f"{self.name}: {e}")
         return None
     
     def _normalize(self, item: dict, raw_source: str) -> CitationMetadata:
@@ -158,6 +161,7 @@ class OpenAlexEngine(SearchEngine):
     
     name = "OpenAlex"
     base_url = "https://api.openalex.org/works"
+    CACHE_TTL = 3 * 24 * 3600
     
     def search(self, query: str) -> Optional[CitationMetadata]:
         params = {
@@ -252,6 +256,7 @@ class SemanticScholarEngine(SearchEngine):
     name = "Semantic Scholar"
     base_url = "https://api.semanticscholar.org/graph/v1/paper/search"
     details_url = "https://api.semanticscholar.org/graph/v1/paper/"
+    CACHE_TTL = 3 * 24 * 3600
     
     def __init__(self, api_key: Optional[str] = None, **kwargs):
         super().__init__(api_key=api_key or SEMANTIC_SCHOLAR_API_KEY, **kwargs)
@@ -408,6 +413,7 @@ class PubMedEngine(SearchEngine):
     
     name = "PubMed"
     base_url = "https://eutils.ncbi.nlm.nih.gov/entrez/eutils/"
+    CACHE_TTL = 7 * 24 * 3600
     
     def __init__(self, api_key: Optional[str] = None, **kwargs):
         super().__init__(api_key=api_key or PUBMED_API_KEY, **kwargs)
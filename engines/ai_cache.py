@@ -0,0 +1,246 @@
+"""
+citeflex/engines/ai_cache.py
+
+Persistent cache of AI provider responses.
+
+The same prompts reach the AI providers over and over - "(Bandura, 1977)"
+with a psychology context turns up in hundreds of student papers, and
+classification / fragment lookups repeat across documents. Each repeat
+costs money and a few seconds. Responses are cached by:
+
+    (provider, model, hash of system prompt, max_tokens, normalized prompt)
+
+Normalization is limited to Unicode form and whitespace runs - case and
+punctuation are left alone, since they can change what the model answers.
+
+Entries live in a SQLite table shared by all workers (WAL mode). When the
+table grows past AI_CACHE_MAX_ENTRIES, the entries that have saved the
+least money so far (hits x cost of the original call, from
+cost_tracker.calculate_cost) are evicted first, oldest use first among
+equals - a $0.02 Claude answer that is reused stays longer than a
+$0.0001 Gemini classification that never is.
+
+Storage errors never propagate: they behave like a miss.
+
+Usage:
+    from engines.ai_cache import ai_cache
+
+    text = ai_cache.get('openai', model, system, prompt, max_tokens)
+    if text is None:
+        text, cost = call_provider(...)
+        ai_cache.put('openai', model, system, prompt, max_tokens, text, cost)
+
+Version History:
+    2026-10-16: Database handling moved to sqlite_db.SQLiteDB (opened on first use)
+    2026-10-16: Initial implementation
+"""
+
+import os
+import re
+import time
+import hashlib
+import sqlite3
+import threading
+import unicodedata
+from pathlib import Path
+from typing import Optional, Dict, Any
+
+from sqlite_db import SQLiteDB
+
+
+# =============================================================================
+# CONFIGURATION
+# =============================================================================
+
+CACHE_DIR = Path(os.environ.get('AI_CACHE_DIR', os.environ.get('CITATION_CACHE_DIR', '/data/cache')))
+CACHE_ENABLED = os.environ.get('AI_CACHE_ENABLED', 'true').lower() == 'true'
+CACHE_TTL = int(os.environ.get('AI_CACHE_TTL_DAYS', '90')) * 86400
+MAX_ENTRIES = int(os.environ.get('AI_CACHE_MAX_ENTRIES', '50000'))
+
+# Bump when prompts or response handling change incompatibly
+KEY_VERSION = 'v1'
+
+# Stores between size checks
+EVICT_CHECK_INTERVAL = 200
+# Eviction trims the table to this share of MAX_ENTRIES
+EVICT_TARGET = 0.9
+
+
+def normalize_prompt(prompt: str) -> str:
+    """Unicode-normalize and collapse whitespace."""
+    return re.sub(r'\s+', ' ', unicodedata.normalize('NFKC', prompt)).strip()
+
+
+def cache_key(provider: str, model: str, system: str, prompt: str, max_tokens: int) -> str:
+    system_hash = hashlib.sha256(normalize_prompt(system).encode('utf-8')).hexdigest()
+    parts = [KEY_VERSION, provider.lower(), model, system_hash, str(max_tokens), normalize_prompt(prompt)]
+    return hashlib.sha256('\x1f'.join(parts).encode('utf-8')).hexdigest()
+
+
+# =============================================================================
+# CACHE
+# =============================================================================
+
+class AIResponseCache:
+    """
+    SQLite-backed AI response cache with cost-weighted eviction.
+
+    Thread-safe; one instance per worker process, database shared.
+    """
+
+    DB_NAME = 'ai_responses.db'
+    BUSY_TIMEOUT_MS = 2000
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS responses (
+            key TEXT PRIMARY KEY,
+            provider TEXT NOT NULL,
+            model TEXT NOT NULL,
+            response TEXT NOT NULL,
+            cost_usd REAL NOT NULL,         -- cost of the original call
+            hits INTEGER NOT NULL DEFAULT 0,
+            created_at REAL NOT NULL,
+            last_used REAL NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS idx_responses_value
+            ON responses (hits * cost_usd, last_used);
+    """
+
+    def __init__(self, cache_dir: Path = CACHE_DIR, ttl: int = CACHE_TTL,
+                 max_entries: int = MAX_ENTRIES, enabled: bool = CACHE_ENABLED):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._enabled = enabled
+        self._db = SQLiteDB(self.DB_NAME, cache_dir, self.SCHEMA, owner='AIResponseCache',
+                            busy_timeout_ms=self.BUSY_TIMEOUT_MS)
+
+        self._lock = threading.Lock()
+        self._stores_since_check = 0
+        self._stats = {'hits': 0, 'misses': 0, 'stores': 0, 'evictions': 0, 'saved_usd': 0.0}
+
+    @property
+    def enabled(self) -> bool:
+        """Switched on and the database is usable (opened on first check)."""
+        return self._enabled and self._db.available
+
+    def _conn(self) -> sqlite3.Connection:
+        """Get this thread's connection (opens the database on first use)."""
+        return self._db.conn()
+
+    # =========================================================================
+    # PUBLIC API
+    # =========================================================================
+
+    def get(self, provider: str, model: str, system: str, prompt: str, max_tokens: int) -> Optional[str]:
+        """
+        Cached response for a prompt, or None.
+
+        Args:
+            provider: 'gemini', 'openai' or 'claude'
+            model: Model the response came from
+            system: System prompt
+            prompt: User prompt
+            max_tokens: Output limit of the call
+        """
+        if not self.enabled:
+            return None
+        key = cache_key(provider, model, system, prompt, max_tokens)
+        now = time.time()
+        try:
+            conn = self._conn()
+            row = conn.execute(
+                'SELECT response, cost_usd, created_at FROM responses WHERE key = ?', (key,)
+            ).fetchone()
+            if row is not None and row[2] + self.ttl > now:
+                conn.execute(
+                    'UPDATE responses SET hits = hits + 1, last_used = ? WHERE key = ?', (now, key)
+                )
+        except Exception as e:
+            print(f"[AIResponseCache] Lookup failed: {e}")
+            row = None
+
+        with self._lock:
+            if row is None or row[2] + self.ttl <= now:
+                self._stats['misses'] += 1
+                return None
+            self._stats['hits'] += 1
+            self._stats['saved_usd'] += row[1]
+        return row[0]
+
+    def put(self, provider: str, model: str, system: str, prompt: str, max_tokens: int,
+            response: str, cost_usd: float = 0.0) -> None:
+        """
+        Store a provider response (empty responses aren't cached).
+
+        Args:
+            cost_usd: What the call cost (cost_tracker.calculate_cost)
+        """
+        if not self.enabled or not response:
+            return
+        key = cache_key(provider, model, system, prompt, max_tokens)
+        now = time.time()
+        try:
+            self._conn().execute(
+                """INSERT OR REPLACE INTO responses
+                   (key, provider, model, response, cost_usd, hits, created_at, last_used)
+                   VALUES (?, ?, ?, ?, ?, 0, ?, ?)""",
+                (key, provider.lower(), model, response, float(cost_usd or 0.0), now, now)
+            )
+        except Exception as e:
+            print(f"[AIResponseCache] Store failed: {e}")
+            return
+
+        with self._lock:
+            self._stats['stores'] += 1
+            self._stores_since_check += 1
+            check = self._stores_since_check >= EVICT_CHECK_INTERVAL
+            if check:
+                self._stores_since_check = 0
+        if check:
+            self.evict()
+
+    def evict(self) -> int:
+        """
+        Drop expired entries, then the lowest-value entries over max_entries.
+
+        Returns:
+            Number of entries removed
+        """
+        if not self.enabled:
+            return 0
+        try:
+            conn = self._conn()
+            removed = conn.execute(
+                'DELETE FROM responses WHERE created_at < ?', (time.time() - self.ttl,)
+            ).rowcount
+            count = conn.execute('SELECT COUNT(*) FROM responses').fetchone()[0]
+            if count > self.max_entries:
+                excess = count - int(self.max_entries * EVICT_TARGET)
+                removed += conn.execute(
+                    """DELETE FROM responses WHERE key IN (
+                           SELECT key FROM responses
+                           ORDER BY hits * cost_usd ASC, last_used ASC LIMIT ?)""",
+                    (excess,)
+                ).rowcount
+        except Exception as e:
+            print(f"[AIResponseCache] Eviction failed: {e}")
+            return 0
+
+        if removed:
+            with self._lock:
+                self._stats['evictions'] += removed
+            print(f"[AIResponseCache] Evicted {removed} entries")
+        return removed
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self._stats)
+        stats['saved_usd'] = round(stats['saved_usd'], 6)
+        lookups = stats['hits'] + stats['misses']
+        stats['hit_rate'] = round(stats['hits'] / lookups, 3) if lookups else 0.0
+        stats['enabled'] = self.enabled
+        return stats
+
+
+# Global instance (one per worker process; the database is shared)
+ai_cache = AIResponseCache()
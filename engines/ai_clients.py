@@ -0,0 +1,138 @@
+"""
+citeflex/engines/ai_clients.py
+
+Shared, keep-alive HTTP clients for the AI providers.
+
+_call_gemini / _call_openai / _call_claude used bare requests.post(), so
+every AI call opened a new TCP connection and did a full TLS handshake
+with the provider - a few hundred ms per call, and AI-heavy author-date
+documents make hundreds of calls. routers/claude built a new
+anthropic.Anthropic client (with its own connection pool) per call.
+
+This module keeps, per worker process:
+    - One pooled client per provider (gemini, openai, claude), with as many
+      keep-alive connections as UPSTREAM_CONCURRENCY allows in flight
+    - One anthropic.Anthropic SDK client per API key
+
+Provider clients use HTTP/2 (httpx with h2 installed: pip install
+'httpx[http2]') and otherwise a requests.Session with a sized
+HTTPAdapter. Either way post() takes the same arguments as
+requests.post() and returns a response with status_code, json() and
+raise_for_status().
+
+Usage:
+    from engines.ai_clients import ai_post, get_anthropic_client
+
+    response = ai_post('openai', url, headers=..., json=..., timeout=30)
+    client = get_anthropic_client()
+
+Version History:
+    2026-10-16: Initial implementation
+"""
+
+import threading
+from typing import Any, Dict, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from config import UPSTREAM_CONCURRENCY, DEFAULT_UPSTREAM_CONCURRENCY, ANTHROPIC_API_KEY
+
+try:
+    import httpx
+    import h2  # noqa: F401 - httpx needs it for http2=True
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+
+# =============================================================================
+# PROVIDER CLIENTS
+# =============================================================================
+
+_clients: Dict[str, Any] = {}
+_clients_lock = threading.Lock()
+
+
+def _pool_size(provider: str) -> int:
+    """Connections kept per provider: enough for every allowed in-flight call."""
+    return UPSTREAM_CONCURRENCY.get(provider, DEFAULT_UPSTREAM_CONCURRENCY)
+
+
+def _build_client(provider: str):
+    size = _pool_size(provider)
+    if HTTP2_AVAILABLE:
+        return httpx.Client(
+            http2=True,
+            limits=httpx.Limits(max_connections=size, max_keepalive_connections=size),
+        )
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=size)
+    session.mount('https://', adapter)
+    return session
+
+
+def get_provider_client(provider: str):
+    """
+    The shared client for an AI provider (created on first use).
+
+    Args:
+        provider: 'gemini', 'openai' or 'claude'
+
+    Returns:
+        httpx.Client (HTTP/2) or requests.Session; both are thread-safe
+        for concurrent requests
+    """
+    client = _clients.get(provider)
+    if client is None:
+        with _clients_lock:
+            client = _clients.get(provider)
+            if client is None:
+                client = _clients[provider] = _build_client(provider)
+                print(f"[AIClients] {provider}: {'HTTP/2' if HTTP2_AVAILABLE else 'HTTP/1.1'} "
+                      f"pool of {_pool_size(provider)} connections")
+    return client
+
+
+def ai_post(provider: str, url: str, **kwargs):
+    """
+    POST to an AI provider over its pooled connections.
+
+    Takes the same keyword arguments as requests.post() (headers, json,
+    timeout).
+    """
+    return get_provider_client(provider).post(url, **kwargs)
+
+
+# =============================================================================
+# ANTHROPIC SDK CLIENT
+# =============================================================================
+
+_anthropic_clients: Dict[str, Any] = {}
+
+
+def get_anthropic_client(api_key: Optional[str] = None):
+    """
+    The process-wide anthropic.Anthropic client for an API key.
+
+    The SDK client is thread-safe and keeps its own connection pool, so
+    one instance per key serves every request.
+
+    Args:
+        api_key: Defaults to config.ANTHROPIC_API_KEY
+
+    Returns:
+        anthropic.Anthropic, or None without an API key
+    """
+    key = api_key or ANTHROPIC_API_KEY
+    if not key:
+        return None
+
+    client = _anthropic_clients.get(key)
+    if client is None:
+        import anthropic
+        with _clients_lock:
+            client = _anthropic_clients.get(key)
+            if client is None:
+                client = _anthropic_clients[key] = anthropic.Anthropic(api_key=key)
+    return client
@@ -21,6 +21,17 @@ HALLUCINATION SAFEGUARD:
 - If no database confirms the AI's guess, result is rejected
 
 Version History:
+    2026-10-16:      Failed provider calls are reported to lookup_status
+    2026-10-16:      Provider calls go through per-provider circuit breakers
+                     (circuit_breaker.py); an open circuit falls through immediately
+    2026-10-16:      _call_ai hedges: a provider slower than its p95 latency gets the
+                     next provider racing it (budget-capped); first valid response wins
+    2026-10-16:      _call_ai serves repeated prompts from the persistent AI response
+                     cache (engines/ai_cache.py); provider calls return their cost
+    2026-10-16:      Provider calls reuse pooled keep-alive connections (engines/ai_clients.py)
+    2026-10-16:      _verify_against_databases looks DOIs up through engines.doi_store
+    2026-10-16:      _call_ai holds an upstream_slot() per provider so document
+                     processing can't exceed UPSTREAM_CONCURRENCY
     2025-12-12 V2.0: MAJOR CONSOLIDATION
                      - Merged routers/claude.py (classification, batch)
                      - Merged routers/gemini.py (classification)
@@ -35,13 +46,20 @@ import os
 import re
 import json
 import time
-import requests
-from typing import Optional, List, Tuple, Dict, Any
-from concurrent.futures import ThreadPoolExecutor, as_completed
+import threading
+from collections import defaultdict, deque
+from typing import Optional, List, Tuple, Dict, Any, Callable
+from concurrent.futures import wait, FIRST_COMPLETED
 
 from models import CitationMetadata, CitationType
 from config import DEFAULT_TIMEOUT
 from cost_tracker import log_api_call
+from engines.base import upstream_slot
+from engines.ai_clients import ai_post
+from engines.ai_cache import ai_cache
+from scheduler import submit
+from circuit_breaker import breakers, CircuitOpenError
+from lookup_status import mark_incomplete
 
 # =============================================================================
 # API KEYS (from config.py - centralized key management)
@@ -68,6 +86,12 @@ GEMINI_MODEL = os.environ.get('GEMINI_MODEL', 'gemini-2.0-flash')
 OPENAI_MODEL = os.environ.get('OPENAI_MODEL', 'gpt-4o')
 CLAUDE_MODEL = os.environ.get('CLAUDE_MODEL', 'claude-3-5-sonnet-20241022')
 
+PROVIDER_MODELS = {
+    'gemini': GEMINI_MODEL,
+    'openai': OPENAI_MODEL,
+    'claude': CLAUDE_MODEL,
+}
+
 # Check which providers are available
 AVAILABLE_PROVIDERS = []
 if GEMINI_API_KEY:
@@ -86,46 +110,196 @@ else:
     print("[AI_Lookup] WARNING: No AI providers configured")
 
 
+# =============================================================================
+# HEDGING
+# =============================================================================
+# If the provider being waited on hasn't answered within its p95 latency
+# (AI_HEDGE_DELAY until enough calls have been timed), the next provider in
+# the chain is started in parallel and the first valid response wins.
+# Hedges are capped at AI_HEDGE_BUDGET of all calls, so a slow spell at one
+# provider can't multiply the AI bill.
+
+HEDGE_ENABLED = os.environ.get('AI_HEDGE_ENABLED', 'true').lower() == 'true'
+HEDGE_DEFAULT_DELAY = float(os.environ.get('AI_HEDGE_DELAY', '6'))
+HEDGE_BUDGET = float(os.environ.get('AI_HEDGE_BUDGET', '0.1'))
+HEDGE_MIN_DELAY = 1.0
+# Hedges allowed beyond the budget (so a quiet process can still hedge)
+HEDGE_BURST = 2
+# Successful calls timed per provider before its own p95 is used
+HEDGE_MIN_SAMPLES = 20
+
+
+class _HedgePolicy:
+    """Per-provider latency percentiles and the process-wide hedge budget."""
+    
+    def __init__(self, budget: float = HEDGE_BUDGET, samples: int = 200):
+        self.budget = budget
+        self._lock = threading.Lock()
+        self._latencies: Dict[str, deque] = defaultdict(lambda: deque(maxlen=samples))
+        self._calls = 0
+        self._hedges = 0
+    
+    def record(self, provider: str, seconds: float) -> None:
+        with self._lock:
+            self._latencies[provider].append(seconds)
+    
+    def delay(self, provider: str) -> float:
+        """Seconds to wait for provider before hedging."""
+        with self._lock:
+            samples = sorted(self._latencies[provider])
+        if len(samples) < HEDGE_MIN_SAMPLES:
+            return HEDGE_DEFAULT_DELAY
+        return max(HEDGE_MIN_DELAY, samples[int(len(samples) * 0.95) - 1])
+    
+    def start_call(self) -> None:
+        with self._lock:
+            self._calls += 1
+    
+    def try_hedge(self) -> bool:
+        """Take a hedge from the budget; False when it's used up."""
+        with self._lock:
+            if self._hedges >= self.budget * self._calls + HEDGE_BURST:
+                return False
+            self._hedges += 1
+            return True
+    
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = {'calls': self._calls, 'hedges': self._hedges}
+        stats['delays'] = {provider: round(self.delay(provider), 2) for provider in ACTIVE_CHAIN}
+        return stats
+
+
+_hedging = _HedgePolicy()
+
+
 # =============================================================================
 # UNIFIED AI CALLER
 # =============================================================================
 
-def _call_ai(prompt: str, system: str, max_tokens: int = 1000) -> Optional[str]:
+def _call_ai(prompt: str, system: str, max_tokens: int = 1000,
+             validate: Optional[Callable[[str], Any]] = None) -> Optional[str]:
     """
     Call AI using the configured provider chain.
     
-    Tries each provider in order until one succeeds.
-    Returns raw text response or None if all fail.
+    A cached response from any provider in the chain is used first
+    (engines/ai_cache.py). Otherwise the chain is tried in order; a
+    provider that fails or returns an unusable response falls through to
+    the next, and one that is slower than its hedge delay gets the next
+    provider racing it (see HEDGING). Returns the first valid raw text
+    response, or None if all fail.
+    
+    Args:
+        validate: Returns a truthy value for a usable response
+                  (default: the response parses as JSON)
     """
-    for provider in ACTIVE_CHAIN:
-        try:
-            if provider == 'gemini':
-                result = _call_gemini(prompt, system, max_tokens)
-            elif provider == 'openai':
-                result = _call_openai(prompt, system, max_tokens)
-            elif provider == 'claude':
-                result = _call_claude(prompt, system, max_tokens)
-            else:
+    validate = validate or _parse_json_response
+    chain = [p for p in ACTIVE_CHAIN if p in PROVIDER_MODELS]
+    
+    for provider in chain:
+        cached = ai_cache.get(provider, PROVIDER_MODELS[provider], system, prompt, max_tokens)
+        if cached and validate(cached):
+            return cached
+    
+    if not chain:
+        return None
+    
+    _hedging.start_call()
+    remaining = iter(chain)
+    futures = {}  # future -> provider
+    launched_at = {}  # provider -> monotonic time
+    pending = set()
+    newest = None
+    hedging = HEDGE_ENABLED
+    
+    def launch() -> bool:
+        nonlocal newest
+        provider = next(remaining, None)
+        if provider is None:
+            return False
+        future = submit('ai', _call_provider, provider, prompt, system, max_tokens)
+        futures[future] = newest = provider
+        launched_at[provider] = time.monotonic()
+        pending.add(future)
+        return True
+    
+    launch()
+    try:
+        while pending:
+            timeout = None
+            if hedging and len(futures) < len(chain):
+                elapsed = time.monotonic() - launched_at[newest]
+                timeout = max(0.0, _hedging.delay(newest) - elapsed)
+            
+            done, _ = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+            
+            if not done:
+                if _hedging.try_hedge():
+                    print(f"[AI_Lookup] {newest} slow after {time.monotonic() - launched_at[newest]:.1f}s - hedging")
+                    launch()
+                else:
+                    hedging = False
                 continue
             
-            if result:
-                return result
+            for future in done:
+                pending.discard(future)
+                provider = futures[future]
+                try:
+                    result, cost = future.result()
+                except Exception as e:
+                    print(f"[AI_Lookup] {provider} failed: {e}")
+                    mark_incomplete(f"{provider}: {e}")
+                    continue
                 
-        except Exception as e:
-            print(f"[AI_Lookup] {provider} failed: {e}")
-            continue
+                if result and validate(result):
+                    ai_cache.put(provider, PROVIDER_MODELS[provider], system, prompt, max_tokens, result, cost)
+                    return result
+                if result:
+                    print(f"[AI_Lookup] {provider} returned an unusable response")
+            
+            # Fall through to the next provider once nothing is left in flight
+            if not pending:
+                launch()
+    finally:
+        for future in pending:
+            future.cancel()  # Losers that already started finish in the background
     
     return None
 
 
-def _call_gemini(prompt: str, system: str, max_tokens: int) -> Optional[str]:
-    """Call Gemini API."""
+def _call_provider(provider: str, prompt: str, system: str, max_tokens: int) -> Tuple[Optional[str], float]:
+    """
+    One provider call under its upstream_slot(), through the provider's
+    circuit breaker (raises CircuitOpenError while it's open, so _call_ai
+    moves straight on to the next provider). Times successful calls for
+    hedging.
+    """
+    call = {'gemini': _call_gemini, 'openai': _call_openai, 'claude': _call_claude}[provider]
+    breaker = breakers.get(provider)
+    if not breaker.allow():
+        raise CircuitOpenError("circuit open")
+    
+    healthy = False
+    with upstream_slot(provider):
+        start = time.monotonic()
+        try:
+            result, cost = call(prompt, system, max_tokens)
+            healthy = True
+        finally:
+            breaker.record(healthy, time.monotonic() - start)
+        _hedging.record(provider, time.monotonic() - start)
+    return result, cost
+
+
+def _call_gemini(prompt: str, system: str, max_tokens: int) -> Tuple[Optional[str], float]:
+    """Call Gemini API. Returns (text, cost in USD)."""
     if not GEMINI_API_KEY:
-        return None
+        return None, 0.0
     
     url = f"https://generativelanguage.googleapis.com/v1beta/models/{GEMINI_MODEL}:generateContent"
     
-    response = requests.post(
+    response = ai_post(
+        'gemini',
         url,
         headers={
             'Content-Type': 'application/json',
@@ -148,21 +322,22 @@ def _call_gemini(prompt: str, system: str, max_tokens: int) -> Optional[str]:
     usage = data.get('usageMetadata', {})
     input_tokens = usage.get('promptTokenCount', 0)
     output_tokens = usage.get('candidatesTokenCount', 0)
-    log_api_call('gemini', input_tokens, output_tokens, prompt[:100], 'ai_lookup')
+    cost = log_api_call('gemini', input_tokens, output_tokens, prompt[:100], 'ai_lookup')
     
     candidates = data.get('candidates', [])
     if not candidates:
-        return None
+        return None, cost
     
-    return candidates[0].get('content', {}).get('parts', [{}])[0].get('text', '')
+    return candidates[0].get('content', {}).get('parts', [{}])[0].get('text', ''), cost
 
 
-def _call_openai(prompt: str, system: str, max_tokens: int) -> Optional[str]:
-    """Call OpenAI API."""
+def _call_openai(prompt: str, system: str, max_tokens: int) -> Tuple[Optional[str], float]:
+    """Call OpenAI API. Returns (text, cost in USD)."""
     if not OPENAI_API_KEY:
-        return None
+        return None, 0.0
     
-    response = requests.post(
+    response = ai_post(
+        'openai',
         "https://api.openai.com/v1/chat/completions",
         headers={
             "Authorization": f"Bearer {OPENAI_API_KEY}",
@@ -190,17 +365,18 @@ def _call_openai(prompt: str, system: str, max_tokens: int) -> Optional[str]:
     usage = result.get('usage', {})
     input_tokens = usage.get('prompt_tokens', 0)
     output_tokens = usage.get('completion_tokens', 0)
-    log_api_call('openai', input_tokens, output_tokens, prompt[:100], 'ai_lookup')
+    cost = log_api_call('openai', input_tokens, output_tokens, prompt[:100], 'ai_lookup')
     
-    return result['choices'][0]['message']['content']
+    return result['choices'][0]['message']['content'], cost
 
 
-def _call_claude(prompt: str, system: str, max_tokens: int) -> Optional[str]:
-    """Call Claude API."""
+def _call_claude(prompt: str, system: str, max_tokens: int) -> Tuple[Optional[str], float]:
+    """Call Claude API. Returns (text, cost in USD)."""
     if not ANTHROPIC_API_KEY:
-        return None
+        return None, 0.0
     
-    response = requests.post(
+    response = ai_post(
+        'claude',
         "https://api.anthropic.com/v1/messages",
         headers={
             "x-api-key": ANTHROPIC_API_KEY,
@@ -226,9 +402,9 @@ def _call_claude(prompt: str, system: str, max_tokens: int) -> Optional[str]:
     usage = result.get('usage', {})
     input_tokens = usage.get('input_tokens', 0)
     output_tokens = usage.get('output_tokens', 0)
-    log_api_call('claude', input_tokens, output_tokens, prompt[:100], 'ai_lookup')
+    cost = log_api_call('claude', input_tokens, output_tokens, prompt[:100], 'ai_lookup')
     
-    return result['content'][0]['text']
+    return result['content'][0]['text'], cost
 
 
 def _parse_json_response(text: str) -> Optional[dict]:
@@ -724,6 +900,7 @@ def _verify_against_databases(guess: dict, original_fragment: str) -> Optional[C
     we have enough metadata for a precise match.
     """
     from engines.academic import CrossrefEngine, OpenAlexEngine, PubMedEngine
+    from engines.doi_store import get_by_doi
     
     title = guess.get('title', '')
     authors = guess.get('authors', [])
@@ -735,7 +912,7 @@ def _verify_against_databases(guess: dict, original_fragment: str) -> Optional[C
     # Try direct ID lookups first (most reliable)
     if doi:
         try:
-            result = CrossrefEngine().get_by_id(doi)
+            result = get_by_doi(doi)
             if result and _result_matches_fragment(result, original_fragment):
                 print(f"[AI_Lookup] Verified via DOI: {doi}")
                 result.source_engine = "AI + Crossref (DOI verified)"
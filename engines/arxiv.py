@@ -34,6 +34,7 @@ class ArxivEngine(SearchEngine):
     
     name = "arXiv"
     base_url = "http://export.arxiv.org/api/query"
+    CACHE_TTL = 7 * 24 * 3600
     
     # XML namespaces used by arXiv API
     NAMESPACES = {
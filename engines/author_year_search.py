@@ -13,15 +13,19 @@ Integrates with existing CiteFlex engines:
 - Google Scholar via SERPAPI (fallback)
 
 Created: 2025-12-10
+Updated: 2026-10-16 - engine searches run on the shared scheduler network pool
+Updated: 2026-10-16 - GPT-4o fallback uses the pooled OpenAI client (engines/ai_clients.py)
+Updated: 2026-10-16 - GPT-4o answers are cached (engines/ai_cache.py)
 """
 
 import re
 import time
 from typing import Optional, List, Tuple, Dict, Any
 from dataclasses import dataclass
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from concurrent.futures import as_completed, TimeoutError as FuturesTimeout
 
 from models import CitationMetadata, CitationType
+from scheduler import submit
 
 
 @dataclass
@@ -134,32 +138,33 @@ class AuthorDateEngine:
         query_simple = f"{author} {year}"
         query_with_authors = f"{' '.join(authors_list)} {year}"
         
-        # Run searches in parallel (free/cheap engines only)
-        with ThreadPoolExecutor(max_workers=3) as executor:
-            futures = {}
-            
-            # Crossref (free)
-            cr = self._get_crossref()
-            if cr:
-                futures[executor.submit(
-                    self._search_crossref, author, year, second_author, third_author
-                )] = "crossref"
-            
-            # OpenAlex (free)
-            oa = self._get_openalex()
-            if oa:
-                futures[executor.submit(
-                    self._search_openalex, author, year, second_author, third_author
-                )] = "openalex"
-            
-            # Google Scholar via SerpAPI (paid but cheaper than Claude)
-            gs = self._get_google_scholar()
-            if gs:
-                futures[executor.submit(
-                    self._search_google_scholar, author, year, second_author, third_author
-                )] = "google_scholar"
-            
-            # Collect results
+        # Run searches in parallel (free/cheap engines only) on the shared
+        # network pool; engines still running at the timeout are abandoned
+        futures = {}
+        
+        # Crossref (free)
+        cr = self._get_crossref()
+        if cr:
+            futures[submit(
+                'network', self._search_crossref, author, year, second_author, third_author
+            )] = "crossref"
+        
+        # OpenAlex (free)
+        oa = self._get_openalex()
+        if oa:
+            futures[submit(
+                'network', self._search_openalex, author, year, second_author, third_author
+            )] = "openalex"
+        
+        # Google Scholar via SerpAPI (paid but cheaper than Claude)
+        gs = self._get_google_scholar()
+        if gs:
+            futures[submit(
+                'network', self._search_google_scholar, author, year, second_author, third_author
+            )] = "google_scholar"
+        
+        # Collect results
+        try:
             for future in as_completed(futures, timeout=timeout):
                 try:
                     result = future.result()
@@ -168,6 +173,9 @@ class AuthorDateEngine:
                 except Exception as e:
                     source = futures.get(future, "unknown")
                     print(f"[AuthorDateEngine] {source} error: {e}")
+        except FuturesTimeout:
+            slow = [source for future, source in futures.items() if not future.done()]
+            print(f"[AuthorDateEngine] Timed out waiting for {', '.join(slow)}")
         
         # Check if we have a good result
         if results:
@@ -478,7 +486,9 @@ class AuthorDateEngine:
             return results
         
         try:
-            import requests
+            from engines.ai_clients import ai_post
+            from engines.ai_cache import ai_cache
+            from cost_tracker import calculate_cost
             
             # Build query with all available authors
             authors_str = author
@@ -511,35 +521,43 @@ Only respond with valid JSON, no other text."""
 
             print(f"[AuthorDateEngine] Trying GPT-4o for: {authors_str} ({year})")
             
-            response = requests.post(
-                "https://api.openai.com/v1/chat/completions",
-                headers={
-                    "Authorization": f"Bearer {api_key}",
-                    "Content-Type": "application/json"
-                },
-                json={
-                    "model": "gpt-4o",
-                    "messages": [
-                        {"role": "system", "content": "You are a scholarly citation expert. Always respond with valid JSON only."},
-                        {"role": "user", "content": prompt}
-                    ],
-                    "temperature": 0.3,
-                    "max_tokens": 500
-                },
-                timeout=10
-            )
-            
-            if response.status_code != 200:
-                print(f"[AuthorDateEngine] GPT-4o API error: {response.status_code}")
-                return results
-            
-            data = response.json()
-            content = data.get('choices', [{}])[0].get('message', {}).get('content', '')
+            system = "You are a scholarly citation expert. Always respond with valid JSON only."
+            raw_content = ai_cache.get('openai', 'gpt-4o', system, prompt, 500)
+            cost = None  # Set for fresh (uncached) responses
+            
+            if raw_content is None:
+                response = ai_post(
+                    'openai',
+                    "https://api.openai.com/v1/chat/completions",
+                    headers={
+                        "Authorization": f"Bearer {api_key}",
+                        "Content-Type": "application/json"
+                    },
+                    json={
+                        "model": "gpt-4o",
+                        "messages": [
+                            {"role": "system", "content": system},
+                            {"role": "user", "content": prompt}
+                        ],
+                        "temperature": 0.3,
+                        "max_tokens": 500
+                    },
+                    timeout=10
+                )
+                
+                if response.status_code != 200:
+                    print(f"[AuthorDateEngine] GPT-4o API error: {response.status_code}")
+                    return results
+                
+                data = response.json()
+                raw_content = data.get('choices', [{}])[0].get('message', {}).get('content', '')
+                usage = data.get('usage', {})
+                cost = calculate_cost('openai', usage.get('prompt_tokens', 0), usage.get('completion_tokens', 0))
             
             # Parse JSON from response
             import json
             # Clean up response (remove markdown code blocks if present)
-            content = content.strip()
+            content = raw_content.strip()
             if content.startswith('```'):
                 content = content.split('\n', 1)[1] if '\n' in content else content
             if content.endswith('```'):
@@ -550,6 +568,10 @@ Only respond with valid JSON, no other text."""
             
             guess = json.loads(content)
             
+            # Only answers that parse are worth keeping
+            if cost is not None:
+                ai_cache.put('openai', 'gpt-4o', system, prompt, 500, raw_content, cost)
+            
             if guess.get('confidence', 0) < 0.5:
                 print(f"[AuthorDateEngine] GPT-4o low confidence: {guess.get('confidence', 0)}")
                 return results
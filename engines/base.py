@@ -3,15 +3,79 @@ citeflex/engines/base.py
 
 Abstract base class for all search engines.
 Each engine must implement the search() method.
+
+Version History:
+    2026-10-16: Circuit breaker is checked before a rate-limit slot is taken; a 429
+                holds the host and returns None (no in-thread retry, MAX_RETRIES
+                and RETRY_DELAY_BASE replaced by RATE_LIMIT_HOLD)
+    2026-10-16: _make_request reports failed or skipped requests to lookup_status so
+                negative caches don't store them; a 4xx other than 429 is an answer
+    2026-10-16: Per-host token-bucket rate limits (engines/rate_limit.py) shared by all
+                workers; a 429 holds the host instead of time.sleep() in the thread
+    2026-10-16: _make_request goes through a per-engine circuit breaker (circuit_breaker.py):
+                a failing upstream is skipped instantly instead of costing its timeout
+    2026-10-16: Subclass search()/get_by_id() calls are single-flight coalesced -
+                concurrent identical lookups share one upstream call (singleflight.py)
+    2026-10-16: Opt-in HTTP response cache in _make_request (CACHE_TTL per engine,
+                ETag/Last-Modified revalidation) - see engines/http_cache.py
+    2026-10-16: Added upstream_slot() - per-upstream concurrency limits
+                (config.UPSTREAM_CONCURRENCY) applied in _make_request
 """
 
 import time
+import threading
+from urllib.parse import urlsplit
 from abc import ABC, abstractmethod
-from typing import Optional, List
+from typing import Optional, List, Dict
 import requests
 
 from models import CitationMetadata, CitationType
-from config import DEFAULT_HEADERS, DEFAULT_TIMEOUT
+from config import DEFAULT_HEADERS, DEFAULT_TIMEOUT, UPSTREAM_CONCURRENCY, DEFAULT_UPSTREAM_CONCURRENCY
+from engines.http_cache import http_cache
+from singleflight import coalesced, normalize_key
+from circuit_breaker import breakers
+from engines.rate_limit import rate_limiter
+from lookup_status import mark_incomplete
+
+
+# =============================================================================
+# UPSTREAM CONCURRENCY LIMITS
+# =============================================================================
+
+_upstream_semaphores: Dict[str, threading.BoundedSemaphore] = {}
+_upstream_lock = threading.Lock()
+
+
+def upstream_slot(name: str) -> threading.BoundedSemaphore:
+    """
+    Get the semaphore bounding concurrent requests to one upstream API.
+    
+    Use as a context manager around the network call only (not around
+    retry sleeps):
+    
+        with upstream_slot('Crossref'):
+            response = session.get(...)
+    
+    Args:
+        name: Engine name (SearchEngine.name) or AI provider name
+    """
+    semaphore = _upstream_semaphores.get(name)
+    if semaphore is None:
+        with _upstream_lock:
+            semaphore = _upstream_semaphores.get(name)
+            if semaphore is None:
+                limit = UPSTREAM_CONCURRENCY.get(name, DEFAULT_UPSTREAM_CONCURRENCY)
+                semaphore = _upstream_semaphores[name] = threading.BoundedSemaphore(limit)
+    return semaphore
+
+
+def _engine_call_key(engine, *args, **kwargs):
+    """Single-flight key for an engine lookup: engine class + normalized arguments."""
+    return (
+        f"{type(engine).__module__}.{type(engine).__qualname__}",
+        tuple(normalize_key(a) for a in args),
+        tuple(sorted((k, normalize_key(v)) for k, v in kwargs.items())),
+    )
 
 
 class SearchEngine(ABC):
@@ -30,9 +94,28 @@ class SearchEngine(ABC):
     name: str = "Base Engine"
     base_url: str = ""
     
-    # Rate limit retry settings
-    MAX_RETRIES = 2
-    RETRY_DELAY_BASE = 2  # Base delay in seconds for exponential backoff
+    # Seconds to hold a host after a 429 that has no usable Retry-After
+    RATE_LIMIT_HOLD = 2
+    
+    # Seconds to cache successful GET responses (0 = no caching). Engines
+    # whose responses are stable for a given URL + params opt in.
+    CACHE_TTL = 0
+    
+    # Lookups wrapped with single-flight coalescing in every subclass that
+    # defines them: concurrent calls on the same engine class with the same
+    # (normalized) arguments wait on one in-flight call
+    COALESCED_METHODS = ('search', 'get_by_id')
+    
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        for method_name in cls.COALESCED_METHODS:
+            method = cls.__dict__.get(method_name)
+            if not callable(method) or isinstance(method, (staticmethod, classmethod)):
+                continue
+            if getattr(method, '__coalesced__', False):
+                continue
+            namespace = f"{cls.__module__}.{cls.__qualname__}.{method_name}"
+            setattr(cls, method_name, coalesced(namespace, key=_engine_call_key)(method))
     
     def __init__(self, api_key: Optional[str] = None, timeout: int = DEFAULT_TIMEOUT):
         self.api_key = api_key
@@ -93,13 +176,21 @@ class SearchEngine(ABC):
         url: str,
         params: Optional[dict] = None,
         headers: Optional[dict] = None,
-        method: str = "GET",
-        retry_count: int = 0
+        method: str = "GET"
     ) -> Optional[requests.Response]:
         """
-        Make an HTTP request with error handling and rate limit retry.
+        Make an HTTP request with error handling and rate limiting.
         
-        Implements exponential backoff for 429 (Too Many Requests) responses.
+        Requests to hosts in config.RATE_LIMITS are spaced by a shared
+        token bucket (engines/rate_limit.py). A 429 isn't retried: it holds
+        the host for its Retry-After (or RATE_LIMIT_HOLD seconds) for every
+        thread and worker, and the request returns None.
+        
+        GET responses are cached for CACHE_TTL seconds when the engine opts
+        in; stale entries are revalidated with If-None-Match/If-Modified-Since.
+        
+        Requests are skipped (None) while the engine's circuit breaker is
+        open (circuit_breaker.py).
         
         Returns:
             Response object if successful, None on error
@@ -109,49 +200,87 @@ class SearchEngine(ABC):
             if headers:
                 merged_headers.update(headers)
             
-            if method.upper() == "GET":
-                response = self.session.get(
-                    url,
-                    params=params,
-                    headers=merged_headers,
-                    timeout=self.timeout
-                )
-            else:
-                response = self.session.post(
-                    url,
-                    json=params,
-                    headers=merged_headers,
-                    timeout=self.timeout
-                )
+            cache_key = None
+            cached = None
+            if self.CACHE_TTL and method.upper() == "GET":
+                cache_key = http_cache.make_key(method, url, params)
+                cached = http_cache.get(cache_key)
+                if cached is not None:
+                    if cached.is_fresh:
+                        return cached.to_response()
+                    merged_headers.update(cached.validators())
             
-            # Handle rate limiting with exponential backoff
-            if response.status_code == 429:
-                if retry_count < self.MAX_RETRIES:
-                    # Get retry delay from header or use exponential backoff
-                    retry_after = response.headers.get('Retry-After')
-                    if retry_after:
-                        try:
-                            delay = int(retry_after)
-                        except ValueError:
-                            delay = self.RETRY_DELAY_BASE * (2 ** retry_count)
+            # Skip an upstream that keeps failing instead of paying its timeout
+            breaker = breakers.get(self.name)
+            if not breaker.allow():
+                print(f"[{self.name}] Circuit open - skipping request")
+                mark_incomplete(f"{self.name}: circuit open")
+                return None
+            
+            # Wait for this host's rate-limit slot (shared across workers)
+            host = urlsplit(url).hostname
+            if not rate_limiter.acquire(host):
+                print(f"[{self.name}] Rate limit for {host} saturated - skipping request")
+                breaker.cancel()
+                mark_incomplete(f"{self.name}: rate limited")
+                return None
+            
+            start = time.monotonic()
+            healthy = False
+            try:
+                with upstream_slot(self.name):
+                    if method.upper() == "GET":
+                        response = self.session.get(
+                            url,
+                            params=params,
+                            headers=merged_headers,
+                            timeout=self.timeout
+                        )
                     else:
-                        delay = self.RETRY_DELAY_BASE * (2 ** retry_count)
-                    
-                    print(f"[{self.name}] Rate limited. Retrying in {delay}s (attempt {retry_count + 1}/{self.MAX_RETRIES})...")
-                    time.sleep(delay)
-                    return self._make_request(url, params, headers, method, retry_count + 1)
-                else:
-                    print(f"[{self.name}] Rate limit exceeded after {self.MAX_RETRIES} retries")
-                    return None
+                        response = self.session.post(
+                            url,
+                            json=params,
+                            headers=merged_headers,
+                            timeout=self.timeout
+                        )
+                # 4xx other than 429 is about the request, not the upstream
+                healthy = response.status_code < 500 and response.status_code != 429
+            finally:
+                breaker.record(healthy, time.monotonic() - start)
+            
+            # Rate limited: hold the whole host (every thread and worker)
+            # for Retry-After instead of retrying from this thread
+            if response.status_code == 429:
+                try:
+                    delay = int(response.headers.get('Retry-After', ''))
+                except ValueError:
+                    delay = self.RATE_LIMIT_HOLD
+                rate_limiter.penalize(host, delay)
+                print(f"[{self.name}] Rate limited. Holding {host} for {delay}s")
+                mark_incomplete(f"{self.name}: HTTP 429")
+                return None
+            
+            # Stale entry confirmed unchanged - no body transferred
+            if response.status_code == 304 and cached is not None:
+                http_cache.refresh(cache_key, self.CACHE_TTL)
+                return cached.to_response()
             
             response.raise_for_status()
+            
+            if cache_key:
+                http_cache.put(cache_key, response, self.CACHE_TTL)
             return response
             
         except requests.Timeout:
             print(f"[{self.name}] Request timeout after {self.timeout}s")
+            mark_incomplete(f"{self.name}: timeout")
             return None
         except requests.RequestException as e:
             print(f"[{self.name}] Request error: {e}")
+            # A 4xx (e.g. 404) is the upstream's answer; anything else isn't
+            status = e.response.status_code if e.response is not None else None
+            if status is None or status >= 500 or status == 429:
+                mark_incomplete(f"{self.name}: {status or type(e).__name__}")
             return None
     
     def _create_metadata(
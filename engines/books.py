@@ -12,6 +12,10 @@ Engines (in priority order):
 6. Open Library Search - fallback
 
 Version History:
+    2026-10-16: Failed API calls (errors, 5xx, 429) are reported to lookup_status so an
+                empty result caused by an outage isn't negatively cached
+    2026-10-16: API lookups are single-flight coalesced (@coalesced) so concurrent
+                identical searches from document processing share one request
     2025-12-06 11:55: Expanded PUBLISHER_PLACE_MAP to 300+ publishers with abbreviations
                       (e.g., 'Univ of California Press', 'UC Press' → Berkeley)
     2025-12-05 12:53: Expanded PUBLISHER_PLACE_MAP with 40+ publishers including
@@ -25,9 +29,19 @@ import requests
 import re
 import os
 
+from singleflight import coalesced
+from lookup_status import mark_incomplete
+
 # WorldCat API key (optional - get from https://www.worldcat.org/webservices/)
 WORLDCAT_API_KEY = os.environ.get('WORLDCAT_API_KEY', '')
 
+
+def _check_answered(engine, response):
+    """Report a 5xx/429 to lookup_status - an empty result, but not a definitive one."""
+    if response.status_code >= 500 or response.status_code == 429:
+        mark_incomplete(f"{engine}: HTTP {response.status_code}")
+
+
 # ==================== DATA: PUBLISHER MAPPING ====================
 # Preserved from original citation.py to ensure city data is filled
 # even when APIs omit it.
@@ -482,6 +496,7 @@ class OpenLibraryAPI:
     SEARCH_URL = "https://openlibrary.org/search.json"
 
     @staticmethod
+    @coalesced('books.OpenLibrary.get_by_isbn')
     def get_by_isbn(isbn):
         try:
             # Strip non-digits (keep X for ISBN-10)
@@ -495,6 +510,7 @@ class OpenLibraryAPI:
             }
             
             response = requests.get(OpenLibraryAPI.BASE_URL, params=params, timeout=5)
+            _check_answered('Open Library', response)
             data = response.json()
             
             if key in data:
@@ -533,10 +549,12 @@ class OpenLibraryAPI:
                 }]
         except Exception as e:
             print(f"OpenLibrary ISBN Error: {e}")
+            mark_incomplete(f"Open Library: {e}")
             pass
         return []
     
     @staticmethod
+    @coalesced('books.OpenLibrary.search')
     def search(query):
         """
         Search Open Library by title/author.
@@ -550,6 +568,7 @@ class OpenLibraryAPI:
             }
             
             response = requests.get(OpenLibraryAPI.SEARCH_URL, params=params, timeout=5)
+            _check_answered('Open Library', response)
             data = response.json()
             
             candidates = []
@@ -582,6 +601,7 @@ class OpenLibraryAPI:
             return candidates
         except Exception as e:
             print(f"OpenLibrary Search Error: {e}")
+            mark_incomplete(f"Open Library: {e}")
             return []
 
 # ==================== ENGINE 2: GOOGLE BOOKS (Legacy / Robust) ====================
@@ -603,6 +623,7 @@ class GoogleBooksAPI:
         return text.strip()
 
     @staticmethod
+    @coalesced('books.GoogleBooks.search')
     def search(query):
         if not query: return []
         candidates = []
@@ -631,6 +652,7 @@ class GoogleBooksAPI:
             for q in queries_to_try:
                 params = {'q': q, 'maxResults': 3, 'printType': 'books', 'orderBy': 'relevance'}
                 response = requests.get(GoogleBooksAPI.BASE_URL, params=params, timeout=5)
+                _check_answered('Google Books', response)
                 
                 if response.status_code == 200:
                     items = response.json().get('items', [])
@@ -673,6 +695,7 @@ class GoogleBooksAPI:
                     print(f"[GoogleBooks] HTTP {response.status_code} for query: {q[:30]}...")
         except Exception as e:
             print(f"[GoogleBooks] Error: {e}")
+            mark_incomplete(f"Google Books: {e}")
         return candidates
 
 
@@ -688,6 +711,7 @@ class LibraryOfCongressAPI:
     SEARCH_URL = "https://www.loc.gov/books/"
     
     @staticmethod
+    @coalesced('books.LibraryOfCongress.search')
     def search(query):
         """Search LOC catalog by keyword."""
         if not query:
@@ -702,6 +726,7 @@ class LibraryOfCongressAPI:
             }
             
             response = requests.get(LibraryOfCongressAPI.SEARCH_URL, params=params, timeout=8)
+            _check_answered('Library of Congress', response)
             
             if response.status_code == 200:
                 data = response.json()
@@ -763,6 +788,7 @@ class LibraryOfCongressAPI:
                 
         except Exception as e:
             print(f"[LOC] Error: {e}")
+            mark_incomplete(f"Library of Congress: {e}")
         
         return candidates
 
@@ -781,6 +807,7 @@ class WorldCatAPI:
     SEARCH_URL = "https://www.worldcat.org/webservices/catalog/search/worldcat/opensearch"
     
     @staticmethod
+    @coalesced('books.WorldCat.search')
     def search(query):
         """Search WorldCat by keyword."""
         if not query or not WORLDCAT_API_KEY:
@@ -798,6 +825,7 @@ class WorldCatAPI:
             }
             
             response = requests.get(WorldCatAPI.SEARCH_URL, params=params, timeout=8)
+            _check_answered('WorldCat', response)
             
             if response.status_code == 200:
                 data = response.json()
@@ -851,6 +879,7 @@ class WorldCatAPI:
                 
         except Exception as e:
             print(f"[WorldCat] Error: {e}")
+            mark_incomplete(f"WorldCat: {e}")
         
         return candidates
 
@@ -867,6 +896,7 @@ class InternetArchiveAPI:
     SEARCH_URL = "https://archive.org/advancedsearch.php"
     
     @staticmethod
+    @coalesced('books.InternetArchive.search')
     def search(query):
         """Search Internet Archive by keyword."""
         if not query:
@@ -884,6 +914,7 @@ class InternetArchiveAPI:
             }
             
             response = requests.get(InternetArchiveAPI.SEARCH_URL, params=params, timeout=8)
+            _check_answered('Internet Archive', response)
             
             if response.status_code == 200:
                 data = response.json()
@@ -934,6 +965,7 @@ class InternetArchiveAPI:
                 
         except Exception as e:
             print(f"[InternetArchive] Error: {e}")
+            mark_incomplete(f"Internet Archive: {e}")
         
         return candidates
 
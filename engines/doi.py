@@ -120,8 +120,8 @@ def fetch_crossref_by_doi(doi: str) -> Optional[CitationMetadata]:
     """
     Fetch citation metadata from Crossref using DOI.
     
-    This is a convenience function that imports CrossrefEngine
-    to avoid circular imports at module level.
+    Goes through the canonical DOI store (memory + disk, with concurrent
+    lookups of the same DOI coalesced into one Crossref request).
     
     Args:
         doi: The DOI to look up
@@ -129,10 +129,9 @@ def fetch_crossref_by_doi(doi: str) -> Optional[CitationMetadata]:
     Returns:
         CitationMetadata if found, None otherwise
     """
-    from engines.academic import CrossrefEngine
+    from engines.doi_store import get_by_doi
     
-    engine = CrossrefEngine()
-    return engine.get_by_id(doi)
+    return get_by_doi(doi)
 
 
 def extract_arxiv_id(url: str) -> Optional[str]:
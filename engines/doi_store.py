@@ -0,0 +1,252 @@
+"""
+citeflex/engines/doi_store.py
+
+Canonical DOI -> CitationMetadata store.
+
+Every DOI lookup (unified_router, engines/doi.fetch_crossref_by_doi,
+routers/claude, engines/ai_lookup) goes through get_by_doi(), so the same
+Crossref record is fetched and normalized once and then served from:
+
+    1. An in-process LRU (per gunicorn worker)
+    2. A SQLite table shared by all workers (WAL mode)
+    3. Crossref, via CrossrefEngine.get_by_id()
+
+Concurrent lookups of the same DOI are coalesced through singleflight.flights:
+the first caller fetches, the others wait (bounded) for its result, so N
+simultaneous requests for one DOI (e.g. the same article cited throughout
+a document) cost one upstream call.
+
+DOIs that Crossref definitively doesn't know (a 404 or an empty record)
+are remembered for a short negative TTL. A None caused by a timeout, 5xx,
+429 or a request skipped by the rate limiter or circuit breaker
+(lookup_status) isn't remembered.
+Callers always receive their own copy and may modify it freely.
+
+Usage:
+    from engines.doi_store import doi_store
+
+    metadata = doi_store.get_by_doi("10.1037/0003-066X.59.1.29")
+
+Version History:
+    2026-10-16: Coalescing goes through singleflight.flights instead of a private _InFlight
+    2026-10-16: Only definitive not-found answers are negatively cached
+    2026-10-16: Database handling moved to sqlite_db.SQLiteDB (opened on first use)
+    2026-10-16: Initial implementation
+"""
+
+import os
+import json
+import time
+import sqlite3
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Optional, Dict, Any
+
+from models import CitationMetadata, normalize_doi
+from sqlite_db import SQLiteDB
+from lookup_status import track, mark_incomplete
+from singleflight import flights
+
+
+# =============================================================================
+# CONFIGURATION
+# =============================================================================
+
+STORE_DIR = Path(os.environ.get('DOI_STORE_DIR', os.environ.get('CITATION_CACHE_DIR', '/data/cache')))
+STORE_ENABLED = os.environ.get('DOI_STORE_ENABLED', 'true').lower() == 'true'
+POSITIVE_TTL = int(os.environ.get('DOI_STORE_TTL_DAYS', '30')) * 86400
+NEGATIVE_TTL = int(os.environ.get('DOI_STORE_NEGATIVE_TTL_MINUTES', '60')) * 60
+MEMORY_ENTRIES = int(os.environ.get('DOI_STORE_MEMORY_ENTRIES', '2000'))
+
+
+# =============================================================================
+# STORE
+# =============================================================================
+
+class DOIStore:
+    """
+    Two-level DOI metadata store with request coalescing.
+
+    Thread-safe; storage errors never propagate - they behave like a miss
+    and the DOI is fetched from Crossref.
+    """
+
+    DB_NAME = 'dois.db'
+    BUSY_TIMEOUT_MS = 2000
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS dois (
+            doi TEXT PRIMARY KEY,
+            metadata TEXT,              -- NULL = not found upstream
+            expires_at REAL NOT NULL
+        );
+    """
+
+    def __init__(self, store_dir: Path = STORE_DIR, memory_entries: int = MEMORY_ENTRIES,
+                 positive_ttl: int = POSITIVE_TTL, negative_ttl: int = NEGATIVE_TTL,
+                 enabled: bool = STORE_ENABLED):
+        self.memory_entries = memory_entries
+        self.positive_ttl = positive_ttl
+        self.negative_ttl = negative_ttl
+        self.enabled = enabled
+        self._db = SQLiteDB(self.DB_NAME, store_dir, self.SCHEMA, owner='DOIStore',
+                            busy_timeout_ms=self.BUSY_TIMEOUT_MS) if enabled else None
+
+        self._engine = None
+        self._lock = threading.Lock()
+        self._memory: 'OrderedDict[str, tuple]' = OrderedDict()  # doi -> (data|None, expires_at)
+        self._stats = {'memory_hits': 0, 'disk_hits': 0, 'fetches': 0}
+
+    @property
+    def _persistent(self) -> bool:
+        """Whether the shared database is usable (opened on first check)."""
+        return self._db is not None and self._db.available
+
+    def _conn(self) -> sqlite3.Connection:
+        """Get this thread's connection (opens the database on first use)."""
+        return self._db.conn()
+
+    def _crossref(self):
+        # Imported lazily - engines.academic imports engines.doi, which imports us
+        if self._engine is None:
+            from engines.academic import CrossrefEngine
+            self._engine = CrossrefEngine()
+        return self._engine
+
+    # =========================================================================
+    # PUBLIC API
+    # =========================================================================
+
+    def get_by_doi(self, doi: str) -> Optional[CitationMetadata]:
+        """
+        Get metadata for a DOI.
+
+        Args:
+            doi: DOI in any common form (bare, doi.org URL, "doi:" prefix)
+
+        Returns:
+            A fresh CitationMetadata copy, or None if Crossref has no record
+        """
+        key = normalize_doi(doi)
+        if not key:
+            return None
+
+        if not self.enabled:
+            return self._fetch(key)
+
+        found, data = self._lookup(key)
+        if found:
+            return self._build(data, doi)
+
+        data = flights.do(('doi_store', key), self._fetch_and_remember, key)
+        return self._build(data, doi)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self._stats)
+            stats['memory_entries'] = len(self._memory)
+        stats['enabled'] = self.enabled
+        return stats
+
+    # =========================================================================
+    # INTERNALS
+    # =========================================================================
+
+    def _fetch_and_remember(self, key: str) -> Optional[dict]:
+        """Fetch a DOI (one caller per DOI at a time) and store the answer."""
+        found, data = self._lookup(key)
+        if found:
+            return data  # Stored by the previous flight just before this one started
+
+        with track() as status:
+            metadata = self._fetch(key)
+        data = self._serialize(metadata)
+        if data is not None or status.complete:
+            self._remember(key, data)
+        else:
+            print(f"[DOIStore] No answer from Crossref for {key} - not caching the miss")
+        return data
+
+    def _fetch(self, key: str) -> Optional[CitationMetadata]:
+        with self._lock:
+            self._stats['fetches'] += 1
+        try:
+            return self._crossref().get_by_id(key)
+        except Exception as e:
+            print(f"[DOIStore] Crossref lookup failed for {key}: {e}")
+            mark_incomplete(f"Crossref: {e}")
+            return None
+
+    def _lookup(self, key: str) -> tuple:
+        """Check memory, then disk. Returns (found, data)."""
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None and entry[1] > now:
+                self._memory.move_to_end(key)
+                self._stats['memory_hits'] += 1
+                return True, entry[0]
+
+        if not self._persistent:
+            return False, None
+        try:
+            row = self._conn().execute(
+                'SELECT metadata, expires_at FROM dois WHERE doi = ?', (key,)
+            ).fetchone()
+        except Exception as e:
+            print(f"[DOIStore] Lookup failed: {e}")
+            return False, None
+        if row is None or row[1] < now:
+            return False, None
+
+        data = json.loads(row[0]) if row[0] is not None else None
+        self._remember_memory(key, data, row[1])
+        with self._lock:
+            self._stats['disk_hits'] += 1
+        return True, data
+
+    def _remember(self, key: str, data: Optional[dict]) -> None:
+        expires_at = time.time() + (self.positive_ttl if data is not None else self.negative_ttl)
+        self._remember_memory(key, data, expires_at)
+        if not self._persistent:
+            return
+        try:
+            self._conn().execute(
+                'INSERT OR REPLACE INTO dois (doi, metadata, expires_at) VALUES (?, ?, ?)',
+                (key, json.dumps(data, default=str) if data is not None else None, expires_at)
+            )
+        except Exception as e:
+            print(f"[DOIStore] Store failed: {e}")
+
+    def _remember_memory(self, key: str, data: Optional[dict], expires_at: float) -> None:
+        with self._lock:
+            self._memory[key] = (data, expires_at)
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.memory_entries:
+                self._memory.popitem(last=False)
+
+    @staticmethod
+    def _serialize(metadata: Optional[CitationMetadata]) -> Optional[dict]:
+        if metadata is None:
+            return None
+        data = metadata.to_dict()
+        data.pop('raw_data', None)  # Raw API responses aren't needed to format
+        return data
+
+    @staticmethod
+    def _build(data: Optional[dict], raw_source: str) -> Optional[CitationMetadata]:
+        if data is None:
+            return None
+        metadata = CitationMetadata.from_dict(data)
+        metadata.raw_source = raw_source
+        return metadata
+
+
+# Global instance (one per worker process; the database is shared)
+doi_store = DOIStore()
+
+
+def get_by_doi(doi: str) -> Optional[CitationMetadata]:
+    """Module-level shortcut for doi_store.get_by_doi()."""
+    return doi_store.get_by_doi(doi)
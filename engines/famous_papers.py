@@ -0,0 +1,484 @@
+"""
+citeflex/engines/famous_papers.py
+
+Local index of highly-cited papers for instant lookup without an API call.
+
+unified_router calls find_famous_paper(query) before any journal search.
+The records live in one read-only index file that is memory-mapped on
+first use (not at import), so:
+
+    - Startup stays fast and workers that never see a journal query never
+      touch it
+    - The pages are shared by every gunicorn worker through the OS page
+      cache - a multi-million-record index (e.g. an OpenAlex top-cited
+      dump) costs almost no private RSS per worker
+    - Nothing is parsed up front: a lookup binary-searches the term table
+      and decodes only the handful of records it scores
+
+Index terms are title words, the first author's surname ("@surname") and
+the year ("#1999"). A lookup collects candidates through the posting
+lists of the query's terms (weighted by rarity), then re-scores the best
+ones on title coverage (with per-word fuzzy matching, so typos still
+hit), first author and year.
+
+File layout (little-endian):
+    header   magic, version, record count, term count, section offsets
+    offsets  (records + 1) x u64 - record i is records[off[i]:off[i+1]]
+    records  one compact JSON object per record
+    terms    term count x (u64 term hash, u64 postings offset, u32 count),
+             sorted by hash
+    postings u32 record ids
+
+Building an index (JSONL, optionally gzipped; one paper per line, either
+{"title", "authors", "year", "journal", "volume", "issue", "pages", "doi"}
+or an OpenAlex work object):
+
+    python -m engines.famous_papers build top_cited.jsonl.gz engines/data/famous_papers.idx
+
+Usage:
+    from engines.famous_papers import find_famous_paper, search_famous_papers
+
+    famous = find_famous_paper("Watson Crick molecular structure of nucleic acids 1953")
+    if famous:
+        metadata = CitationMetadata(citation_type=CitationType.JOURNAL, **famous)
+
+Version History:
+    2026-10-16: Memory-mapped on-disk index (lazy load, token inverted index,
+                fuzzy re-scoring, top-k search_famous_papers())
+"""
+
+import os
+import re
+import sys
+import copy
+import gzip
+import json
+import math
+import mmap
+import struct
+import hashlib
+import difflib
+import tempfile
+import threading
+import unicodedata
+from array import array
+from collections import defaultdict
+from functools import lru_cache
+from pathlib import Path
+from typing import Optional, List, Dict, Tuple, Iterable, Any
+
+
+# =============================================================================
+# CONFIGURATION
+# =============================================================================
+
+INDEX_PATH = Path(os.environ.get(
+    'FAMOUS_PAPERS_INDEX',
+    str(Path(__file__).parent / 'data' / 'famous_papers.idx')
+))
+
+MAGIC = b'CFPAPERS'
+FORMAT_VERSION = 1
+HEADER = struct.Struct('<8sIIIQQQQ')  # magic, version, records, terms, offsets/records/terms/postings offsets
+TERM_ENTRY = struct.Struct('<QQI')    # term hash, postings offset, posting count
+
+# Record fields returned to callers (CitationMetadata keyword arguments)
+RECORD_FIELDS = ('title', 'authors', 'year', 'journal', 'volume', 'issue', 'pages', 'doi')
+
+STOPWORDS = {
+    'the', 'and', 'for', 'with', 'from', 'into', 'onto', 'its', 'are', 'was',
+    'were', 'has', 'have', 'not', 'but', 'via', 'about', 'between', 'over',
+    'under', 'their', 'this', 'that', 'these', 'those', 'using', 'use',
+    'new', 'study', 'journal', 'vol', 'pp', 'ed', 'eds', 'doi', 'http', 'https',
+}
+
+# Terms whose posting list is longer than this don't generate candidates
+MAX_POSTINGS = 50000
+# Candidates decoded and re-scored per lookup
+MAX_CANDIDATES = 40
+# Minimum score for find_famous_paper() to trust a match
+MIN_SCORE = 0.8
+# Per-word fuzzy match threshold (SequenceMatcher ratio)
+WORD_SIMILARITY = 0.85
+
+YEAR_PATTERN = re.compile(r'\b(1[5-9]\d\d|20\d\d)\b')
+
+
+# =============================================================================
+# TOKENIZATION
+# =============================================================================
+
+def _fold(text: str) -> str:
+    """Lowercase and strip accents."""
+    text = unicodedata.normalize('NFKD', text or '')
+    return ''.join(c for c in text if not unicodedata.combining(c)).lower()
+
+
+def _stem(word: str) -> str:
+    """Crude plural folding ("acids" -> "acid") so number doesn't block a match."""
+    if len(word) > 4 and word.endswith('s') and not word.endswith('ss'):
+        return word[:-1]
+    return word
+
+
+def tokenize(text: str) -> List[str]:
+    """Content words of text: 3+ characters (or numbers), no stopwords."""
+    return [
+        _stem(word) for word in re.findall(r'[a-z0-9]+', _fold(text))
+        if word not in STOPWORDS and (len(word) >= 3 or word.isdigit())
+        and not YEAR_PATTERN.fullmatch(word)
+    ]
+
+
+def _surname(author: str) -> str:
+    """Normalized surname of "Given Family" or "Family, Given"."""
+    if ',' in author:
+        author = author.split(',')[0]
+    words = re.findall(r'[a-z]+', _fold(author))
+    return words[-1] if words else ''
+
+
+def _term_hash(term: str) -> int:
+    return int.from_bytes(hashlib.blake2b(term.encode('utf-8'), digest_size=8).digest(), 'little')
+
+
+def record_terms(record: Dict[str, Any]) -> set:
+    """Index terms for one record."""
+    terms = set(tokenize(record.get('title', '')))
+    authors = record.get('authors') or []
+    if authors and _surname(authors[0]):
+        terms.add('@' + _surname(authors[0]))
+    if record.get('year'):
+        terms.add('#' + str(record['year']))
+    return terms
+
+
+# =============================================================================
+# INDEX (read side)
+# =============================================================================
+
+class FamousPapersIndex:
+    """Read-only view of a memory-mapped index file."""
+
+    def __init__(self, path: Path):
+        self.path = path
+        self._file = open(path, 'rb')
+        self._mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, version, self.size, self.term_count, self._offsets_at, self._records_at, \
+            self._terms_at, _ = HEADER.unpack_from(self._mm, 0)
+        if magic != MAGIC or version != FORMAT_VERSION:
+            self.close()
+            raise ValueError(f"{path} is not a famous papers index (version {FORMAT_VERSION})")
+
+    def close(self) -> None:
+        self._mm.close()
+        self._file.close()
+
+    def __len__(self) -> int:
+        return self.size
+
+    def record(self, record_id: int) -> Dict[str, Any]:
+        start, end = struct.unpack_from('<QQ', self._mm, self._offsets_at + 8 * record_id)
+        return json.loads(self._mm[self._records_at + start:self._records_at + end])
+
+    def postings(self, term: str) -> Tuple[int, Optional[array]]:
+        """
+        Look up a term. Returns (document frequency, record ids); ids are
+        None when the list is longer than MAX_POSTINGS.
+        """
+        target = _term_hash(term)
+        low, high = 0, self.term_count
+        while low < high:
+            mid = (low + high) // 2
+            term_hash, offset, count = TERM_ENTRY.unpack_from(self._mm, self._terms_at + mid * TERM_ENTRY.size)
+            if term_hash < target:
+                low = mid + 1
+            elif term_hash > target:
+                high = mid
+            else:
+                if count > MAX_POSTINGS:
+                    return count, None
+                ids = array('I')
+                ids.frombytes(self._mm[offset:offset + 4 * count])
+                if sys.byteorder != 'little':
+                    ids.byteswap()
+                return count, ids
+        return 0, None
+
+    def search(self, query: str, k: int = 5) -> List[Tuple[float, Dict[str, Any]]]:
+        """
+        Best-scoring records for a free-text citation query.
+
+        Args:
+            query: Citation text (title words, authors, year - any order)
+            k: Maximum results
+
+        Returns:
+            List of (score, record) pairs, best first; score is 0..1
+        """
+        words = tokenize(query)
+        years = set(YEAR_PATTERN.findall(query))
+        if not words:
+            return []
+
+        query_terms = set(words) | {'@' + w for w in words if w.isalpha()} | {'#' + y for y in years}
+        weights: Dict[int, float] = defaultdict(float)
+        for term in query_terms:
+            count, ids = self.postings(term)
+            if ids is None:
+                continue
+            idf = math.log(1 + self.size / count)
+            for record_id in ids:
+                weights[record_id] += idf
+
+        best = sorted(weights, key=weights.get, reverse=True)[:MAX_CANDIDATES]
+        query_words = set(words)
+        scored = []
+        for record_id in best:
+            record = self.record(record_id)
+            score = score_record(record, query_words, years)
+            if score > 0:
+                scored.append((score, record))
+
+        scored.sort(key=lambda pair: pair[0], reverse=True)
+        return scored[:k]
+
+
+def _word_in(word: str, words: set) -> bool:
+    if word in words:
+        return True
+    if len(word) < 5:
+        return False
+    return any(
+        abs(len(word) - len(other)) <= 2 and
+        difflib.SequenceMatcher(None, word, other).ratio() >= WORD_SIMILARITY
+        for other in words
+    )
+
+
+def score_record(record: Dict[str, Any], query_words: set, query_years: set) -> float:
+    """
+    Score how well a record matches a query (0 = not a match).
+
+    70% title coverage (share of the title's - or main title's - words
+    found in the query),
+    20% first author surname present, 10% year present. A year in the
+    query that contradicts the record's year rules the record out, as do
+    queries that are mostly about something other than this paper.
+    """
+    title = record.get('title', '')
+    title_words = list(dict.fromkeys(tokenize(title)))
+    if not title_words:
+        return 0.0
+
+    matched = {word for word in title_words if _word_in(word, query_words)}
+    coverage = len(matched) / len(title_words)
+
+    # Citations often give only the main title ("Molecular Structure of
+    # Nucleic Acids" for "...: A Structure for Deoxyribose Nucleic Acid")
+    if ':' in title:
+        main_words = list(dict.fromkeys(tokenize(title.split(':')[0])))
+        if len(main_words) >= 3:
+            coverage = max(coverage, sum(w in matched for w in main_words) / len(main_words))
+
+    authors = record.get('authors') or []
+    surname = _surname(authors[0]) if authors else ''
+    author_hit = bool(surname) and _word_in(surname, query_words)
+
+    year = str(record.get('year') or '')
+    if query_years and year and year not in query_years:
+        return 0.0
+    year_hit = bool(year) and year in query_years
+
+    # Words in the query that this record doesn't account for
+    known = set(title_words) | matched | set(tokenize(record.get('journal', '')))
+    known |= {_surname(a) for a in authors}
+    extra = [w for w in query_words if w not in known and not w.isdigit()]
+    if len(extra) > max(2, len(query_words) // 2):
+        return 0.0
+
+    # Short titles need corroboration from the author
+    if not author_hit and (coverage < 1.0 or len(title_words) < 3):
+        return 0.0
+
+    return round(0.7 * coverage + 0.2 * author_hit + 0.1 * year_hit, 3)
+
+
+# =============================================================================
+# LAZY LOADING
+# =============================================================================
+
+_index: Optional[FamousPapersIndex] = None
+_index_loaded = False
+_index_lock = threading.Lock()
+
+
+def get_index() -> Optional[FamousPapersIndex]:
+    """Open the index on first use (None if there isn't one)."""
+    global _index, _index_loaded
+    if not _index_loaded:
+        with _index_lock:
+            if not _index_loaded:
+                try:
+                    if INDEX_PATH.exists():
+                        _index = FamousPapersIndex(INDEX_PATH)
+                        print(f"[FamousPapers] Mapped {len(_index)} papers from {INDEX_PATH}")
+                    else:
+                        print(f"[FamousPapers] No index at {INDEX_PATH} - cache disabled")
+                except Exception as e:
+                    print(f"[FamousPapers] Cannot open {INDEX_PATH}: {e}")
+                _index_loaded = True
+    return _index
+
+
+def search_famous_papers(query: str, k: int = 5) -> List[Tuple[float, Dict[str, Any]]]:
+    """Top-k (score, record) matches for query; empty without an index."""
+    index = get_index()
+    if index is None or not query:
+        return []
+    return index.search(query, k)
+
+
+@lru_cache(maxsize=512)
+def _best_match(query: str) -> Optional[Dict[str, Any]]:
+    matches = search_famous_papers(query, k=1)
+    if matches and matches[0][0] >= MIN_SCORE:
+        return matches[0][1]
+    return None
+
+
+def find_famous_paper(query: str) -> Optional[Dict[str, Any]]:
+    """
+    Find a famous paper matching a citation query.
+
+    Returns:
+        Dict of CitationMetadata fields (title, authors, year, journal,
+        volume, issue, pages, doi), or None
+    """
+    match = _best_match(query) if query else None
+    return copy.deepcopy(match) if match else None
+
+
+# =============================================================================
+# INDEX (build side)
+# =============================================================================
+
+def _normalize_record(data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """Accept our own record format or an OpenAlex work object."""
+    if 'authorships' in data or 'display_name' in data:
+        biblio = data.get('biblio') or {}
+        source = ((data.get('primary_location') or {}).get('source') or {})
+        first, last = biblio.get('first_page'), biblio.get('last_page')
+        data = {
+            'title': data.get('title') or data.get('display_name'),
+            'authors': [
+                (a.get('author') or {}).get('display_name', '')
+                for a in data.get('authorships') or []
+            ],
+            'year': data.get('publication_year'),
+            'journal': source.get('display_name'),
+            'volume': biblio.get('volume'),
+            'issue': biblio.get('issue'),
+            'pages': f"{first}-{last}" if first and last and first != last else first,
+            'doi': (data.get('doi') or '').replace('https://doi.org/', ''),
+        }
+
+    if not data.get('title'):
+        return None
+    record = {}
+    for field in RECORD_FIELDS:
+        value = data.get(field)
+        if field == 'authors':
+            value = [a for a in (value or []) if a]
+        elif value is not None:
+            value = str(value).strip()
+        if value:
+            record[field] = value
+    return record
+
+
+def _read_records(source: Path) -> Iterable[Dict[str, Any]]:
+    opener = gzip.open if source.suffix == '.gz' else open
+    with opener(source, 'rt', encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                record = _normalize_record(json.loads(line))
+            except ValueError:
+                continue
+            if record:
+                yield record
+
+
+def build_index(source: Path, target: Path) -> int:
+    """
+    Build an index file from a JSONL dump.
+
+    Records are streamed to a temp file; only the postings are held in
+    memory. The result is written next to target and renamed into place.
+
+    Returns:
+        Number of records indexed
+    """
+    postings: Dict[int, array] = defaultdict(lambda: array('I'))
+    offsets = array('Q', [0])
+
+    with tempfile.TemporaryFile() as records:
+        for record_id, record in enumerate(_read_records(source)):
+            for term in record_terms(record):
+                postings[_term_hash(term)].append(record_id)
+            records.write(json.dumps(record, ensure_ascii=False, separators=(',', ':')).encode('utf-8'))
+            offsets.append(records.tell())
+
+        count = len(offsets) - 1
+        terms = sorted(postings)
+        offsets_at = HEADER.size
+        records_at = offsets_at + 8 * len(offsets)
+        terms_at = records_at + offsets[-1]
+        postings_at = terms_at + TERM_ENTRY.size * len(terms)
+
+        partial = target.with_suffix(target.suffix + '.tmp')
+        target.parent.mkdir(parents=True, exist_ok=True)
+        with open(partial, 'wb') as out:
+            out.write(HEADER.pack(MAGIC, FORMAT_VERSION, count, len(terms),
+                                  offsets_at, records_at, terms_at, postings_at))
+            _write_array(out, offsets)
+
+            records.seek(0)
+            while True:
+                chunk = records.read(1 << 20)
+                if not chunk:
+                    break
+                out.write(chunk)
+
+            position = postings_at
+            for term_hash in terms:
+                out.write(TERM_ENTRY.pack(term_hash, position, len(postings[term_hash])))
+                position += 4 * len(postings[term_hash])
+            for term_hash in terms:
+                _write_array(out, postings[term_hash])
+
+        os.replace(partial, target)
+    return count
+
+
+def _write_array(out, values: array) -> None:
+    if sys.byteorder != 'little':
+        values = array(values.typecode, values)
+        values.byteswap()
+    values.tofile(out)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) == 4 and sys.argv[1] == 'build':
+        total = build_index(Path(sys.argv[2]), Path(sys.argv[3]))
+        print(f"[FamousPapers] Indexed {total} papers into {sys.argv[3]}")
+    elif len(sys.argv) >= 3 and sys.argv[1] == 'search':
+        for score, paper in search_famous_papers(' '.join(sys.argv[2:]), k=5):
+            print(f"{score:.3f}  {paper.get('title')} ({paper.get('year', '')}) {paper.get('doi', '')}")
+    else:
+        print("Usage: python -m engines.famous_papers build SOURCE.jsonl[.gz] TARGET.idx")
+        print("       python -m engines.famous_papers search QUERY...")
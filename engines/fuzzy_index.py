@@ -0,0 +1,116 @@
+"""
+citeflex/engines/fuzzy_index.py
+
+Character-trigram index for fuzzy key lookup.
+
+Drop-in replacement for difflib.get_close_matches() over a fixed set of
+keys. difflib scores the query against every key, which is fine for a
+90-entry cache but makes every lookup linear in cache size - and
+is_legal_citation() runs one for every note of every document.
+
+TrigramIndex is built once (at import time, by the module that owns the
+keys) and keeps an inverted index trigram -> key ids. A lookup:
+
+    1. Counts shared trigrams through the posting lists of the query's
+       trigrams ("stop" trigrams found in a large share of keys, e.g. " v "
+       in case names, aren't indexed once the index is big)
+    2. Keeps the best max_candidates keys by trigram Dice similarity
+    3. Re-ranks those with difflib.SequenceMatcher, so scores and the
+       cutoff mean exactly what they did with get_close_matches()
+
+Usage:
+    index = TrigramIndex(FAMOUS_CASES.keys())
+    index.get_close_matches('brown v bord of education', n=1, cutoff=0.7)
+
+Version History:
+    2026-10-16: Initial implementation (FAMOUS_CASES lookup in superlegal.py / legal.py)
+"""
+
+import difflib
+import heapq
+from collections import defaultdict
+from typing import Dict, Iterable, List, Set
+
+
+def trigrams(text: str) -> Set[str]:
+    """Character trigrams of text, padded so short words still produce some."""
+    padded = f"  {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class TrigramIndex:
+    """Immutable trigram inverted index over a set of string keys."""
+
+    # Trigrams found in more than this share of keys are dropped from the
+    # index - they say little about which key is meant
+    STOP_FRACTION = 0.2
+    # ...but only once the index has this many keys; small indexes use all
+    STOP_MIN_KEYS = 500
+    # Keys re-ranked with SequenceMatcher per lookup
+    MAX_CANDIDATES = 32
+
+    def __init__(self, keys: Iterable[str]):
+        self.keys: List[str] = list(dict.fromkeys(keys))
+        grams_per_key = [trigrams(key) for key in self.keys]
+        self._sizes: List[int] = [len(grams) for grams in grams_per_key]
+
+        postings: Dict[str, List[int]] = defaultdict(list)
+        for key_id, grams in enumerate(grams_per_key):
+            for gram in grams:
+                postings[gram].append(key_id)
+
+        stop_limit = max(1, int(len(self.keys) * self.STOP_FRACTION))
+        use_stop = len(self.keys) >= self.STOP_MIN_KEYS
+        self._postings: Dict[str, List[int]] = {
+            gram: ids for gram, ids in postings.items()
+            if not (use_stop and len(ids) > stop_limit)
+        }
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    def candidates(self, word: str, limit: int = MAX_CANDIDATES) -> List[int]:
+        """
+        Key ids most similar to word by trigram Dice coefficient, best first.
+        """
+        query_grams = trigrams(word)
+        shared: Dict[int, int] = defaultdict(int)
+        for gram in query_grams:
+            for key_id in self._postings.get(gram, ()):
+                shared[key_id] += 1
+        if not shared:
+            return []
+
+        size = len(query_grams)
+        scored = (
+            (2 * count / (size + self._sizes[key_id]), key_id)
+            for key_id, count in shared.items()
+        )
+        return [key_id for _, key_id in heapq.nlargest(limit, scored)]
+
+    def get_close_matches(self, word: str, n: int = 3, cutoff: float = 0.6,
+                          max_candidates: int = MAX_CANDIDATES) -> List[str]:
+        """
+        Same contract as difflib.get_close_matches(word, keys, n, cutoff),
+        restricted to the max_candidates keys that share most trigrams.
+
+        Returns:
+            Up to n keys with SequenceMatcher ratio >= cutoff, best first
+        """
+        if not n > 0:
+            raise ValueError("n must be > 0: %r" % (n,))
+        if not 0.0 <= cutoff <= 1.0:
+            raise ValueError("cutoff must be in [0.0, 1.0]: %r" % (cutoff,))
+
+        matcher = difflib.SequenceMatcher()
+        matcher.set_seq2(word)
+        results = []
+        for key_id in self.candidates(word, max(max_candidates, n)):
+            key = self.keys[key_id]
+            matcher.set_seq1(key)
+            if (matcher.real_quick_ratio() >= cutoff and
+                    matcher.quick_ratio() >= cutoff and
+                    matcher.ratio() >= cutoff):
+                results.append((matcher.ratio(), key))
+
+        return [key for _, key in heapq.nlargest(n, results)]
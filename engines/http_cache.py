@@ -0,0 +1,222 @@
+"""
+citeflex/engines/http_cache.py
+
+On-disk HTTP response cache for SearchEngine._make_request.
+
+Engines opt in by setting a CACHE_TTL (seconds) class attribute. Responses
+are keyed by method + URL + params and stored in one SQLite database
+(WAL mode, shared by all gunicorn workers) with LRU eviction once the
+total body size exceeds HTTP_CACHE_MAX_MB.
+
+When a stored response has gone stale but carried an ETag or
+Last-Modified header, the next request is sent as a conditional request
+(If-None-Match / If-Modified-Since); a 304 refreshes the entry without
+transferring the body again.
+
+Version History:
+    2026-10-16: Database handling moved to sqlite_db.SQLiteDB (opened on first use)
+    2026-10-16: Initial implementation
+"""
+
+import os
+import json
+import time
+import sqlite3
+import hashlib
+from pathlib import Path
+from typing import Optional, Dict
+
+import requests
+from requests.structures import CaseInsensitiveDict
+from requests.utils import get_encoding_from_headers
+
+from sqlite_db import SQLiteDB
+
+
+# =============================================================================
+# CONFIGURATION
+# =============================================================================
+
+CACHE_DIR = Path(os.environ.get('HTTP_CACHE_DIR', '/data/cache'))
+CACHE_ENABLED = os.environ.get('HTTP_CACHE_ENABLED', 'true').lower() == 'true'
+MAX_BYTES = int(os.environ.get('HTTP_CACHE_MAX_MB', '256')) * 1024 * 1024
+
+# Only these response headers are stored - enough to rebuild the response
+STORED_HEADERS = ('Content-Type', 'ETag', 'Last-Modified', 'Cache-Control')
+
+
+class CachedResponse:
+    """A stored response plus its freshness/validator metadata."""
+
+    def __init__(self, url: str, status: int, headers: Dict[str, str], body: bytes, expires_at: float):
+        self.url = url
+        self.status = status
+        self.headers = headers
+        self.body = body
+        self.expires_at = expires_at
+
+    @property
+    def is_fresh(self) -> bool:
+        return time.time() < self.expires_at
+
+    def validators(self) -> Dict[str, str]:
+        """Conditional request headers for revalidating this entry."""
+        headers = {}
+        if self.headers.get('ETag'):
+            headers['If-None-Match'] = self.headers['ETag']
+        if self.headers.get('Last-Modified'):
+            headers['If-Modified-Since'] = self.headers['Last-Modified']
+        return headers
+
+    def to_response(self) -> requests.Response:
+        """Rebuild a requests.Response that engines can use as usual."""
+        response = requests.Response()
+        response.status_code = self.status
+        response.url = self.url
+        response.headers = CaseInsensitiveDict(self.headers)
+        response.encoding = get_encoding_from_headers(response.headers)
+        response._content = self.body
+        return response
+
+
+class HTTPCache:
+    """
+    SQLite-backed response cache. Thread-safe; never raises - storage
+    errors behave like a cache miss.
+    """
+
+    DB_NAME = 'http_cache.db'
+    BUSY_TIMEOUT_MS = 2000
+    EVICT_EVERY = 100  # Stores between size checks
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS responses (
+            key TEXT PRIMARY KEY,
+            url TEXT NOT NULL,
+            status INTEGER NOT NULL,
+            headers TEXT NOT NULL,
+            body BLOB NOT NULL,
+            size INTEGER NOT NULL,
+            expires_at REAL NOT NULL,
+            last_used REAL NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS idx_responses_last_used ON responses(last_used);
+    """
+
+    def __init__(self, cache_dir: Path = CACHE_DIR, max_bytes: int = MAX_BYTES,
+                 enabled: bool = CACHE_ENABLED):
+        self.max_bytes = max_bytes
+        self._enabled = enabled
+        self._db = SQLiteDB(self.DB_NAME, cache_dir, self.SCHEMA, owner='HTTPCache',
+                            busy_timeout_ms=self.BUSY_TIMEOUT_MS)
+        self._stores = 0
+
+    @property
+    def enabled(self) -> bool:
+        """Switched on and the database is usable (opened on first check)."""
+        return self._enabled and self._db.available
+
+    def _conn(self) -> sqlite3.Connection:
+        """Get this thread's connection (opens the database on first use)."""
+        return self._db.conn()
+
+    @staticmethod
+    def make_key(method: str, url: str, params: Optional[dict] = None) -> str:
+        """
+        Build a cache key from method + URL + params.
+
+        Hashed, so API keys passed as params aren't stored in clear text.
+        """
+        raw = json.dumps([method.upper(), url, params or {}], sort_keys=True, default=str)
+        return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+    def get(self, key: str) -> Optional[CachedResponse]:
+        """Get a stored response (fresh or stale), or None."""
+        if not self.enabled:
+            return None
+        try:
+            conn = self._conn()
+            row = conn.execute(
+                'SELECT url, status, headers, body, expires_at FROM responses WHERE key = ?', (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            conn.execute('UPDATE responses SET last_used = ? WHERE key = ?', (time.time(), key))
+            return CachedResponse(row[0], row[1], json.loads(row[2]), row[3], row[4])
+        except Exception as e:
+            print(f"[HTTPCache] Lookup failed: {e}")
+            return None
+
+    def put(self, key: str, response: requests.Response, ttl: int) -> None:
+        """Store a successful response for ttl seconds (skips Cache-Control: no-store)."""
+        if not self.enabled or response.status_code != 200:
+            return
+        if 'no-store' in response.headers.get('Cache-Control', ''):
+            return
+
+        headers = {name: response.headers[name] for name in STORED_HEADERS if name in response.headers}
+        body = response.content
+        now = time.time()
+        try:
+            self._conn().execute(
+                """INSERT OR REPLACE INTO responses
+                   (key, url, status, headers, body, size, expires_at, last_used)
+                   VALUES (?, ?, ?, ?, ?, ?, ?, ?)""",
+                (key, response.url or '', response.status_code, json.dumps(headers),
+                 body, len(body), now + ttl, now)
+            )
+        except Exception as e:
+            print(f"[HTTPCache] Store failed: {e}")
+            return
+
+        self._stores += 1
+        if self._stores % self.EVICT_EVERY == 0:
+            self.evict()
+
+    def refresh(self, key: str, ttl: int) -> None:
+        """Extend a revalidated (304 Not Modified) entry."""
+        if not self.enabled:
+            return
+        now = time.time()
+        try:
+            self._conn().execute(
+                'UPDATE responses SET expires_at = ?, last_used = ? WHERE key = ?',
+                (now + ttl, now, key)
+            )
+        except Exception as e:
+            print(f"[HTTPCache] Refresh failed: {e}")
+
+    def evict(self) -> int:
+        """
+        Remove least-recently-used entries until the total body size is
+        under max_bytes. Stale entries with validators are kept as long as
+        there's room - they can still be revalidated cheaply.
+
+        Returns:
+            Number of entries removed
+        """
+        if not self.enabled:
+            return 0
+        try:
+            conn = self._conn()
+            total = conn.execute('SELECT COALESCE(SUM(size), 0) FROM responses').fetchone()[0]
+            if total <= self.max_bytes:
+                return 0
+
+            excess = total - self.max_bytes
+            rows = conn.execute('SELECT key, size FROM responses ORDER BY last_used').fetchall()
+            doomed = []
+            for key, size in rows:
+                if excess <= 0:
+                    break
+                doomed.append((key,))
+                excess -= size
+            conn.executemany('DELETE FROM responses WHERE key = ?', doomed)
+            return len(doomed)
+        except Exception as e:
+            print(f"[HTTPCache] Eviction failed: {e}")
+            return 0
+
+
+# Global instance (one per worker process; the database is shared)
+http_cache = HTTPCache()
@@ -0,0 +1,242 @@
+"""
+citeflex/engines/rate_limit.py
+
+Per-host request rate limiting shared by all threads and workers.
+
+SearchEngine._make_request used to find out about rate limits the hard
+way: send, get a 429, time.sleep() for up to Retry-After seconds inside
+the worker thread and try again - while the other note workers (and the
+other gunicorn worker) kept hitting the same API. Now every request to a
+limited host first takes a slot from that host's token bucket
+(config.RATE_LIMITS), so requests are spaced to stay under the limit
+instead of being rejected.
+
+The buckets are GCRA-style: each host has a "theoretical arrival time"
+(TAT). A request's slot is max(now, TAT - burst tolerance) and TAT moves
+one interval (1 / rate) forward. State lives in a small SQLite table
+next to the other caches, so all worker processes share one budget per
+host; without storage the buckets are per process.
+
+A request whose slot is more than RATE_LIMIT_MAX_WAIT seconds away isn't
+queued - acquire() returns False and the caller treats it like a failed
+lookup. A 429 from any host pushes that host's TAT past its Retry-After
+(penalize()), so every thread and worker backs off together. Hosts that
+aren't in RATE_LIMITS get a bucket row only when penalized, and are
+limited only while that row's TAT is in the future. Each process
+remembers what it last saw for such a host, so the table is read at most
+once per PENALTY_RECHECK_SECONDS per host rather than on every request.
+
+Usage:
+    from engines.rate_limit import rate_limiter
+
+    if not rate_limiter.acquire(host):
+        return None          # Over budget - skip
+    response = session.get(...)
+    if response.status_code == 429:
+        rate_limiter.penalize(host, retry_after)
+
+Version History:
+    2026-10-16: Penalties for hosts outside RATE_LIMITS are kept in the shared table
+                too (were per process), with per-process memos in front of the table
+    2026-10-16: Database handling moved to sqlite_db.SQLiteDB (opened on first use)
+    2026-10-16: Initial implementation
+"""
+
+import os
+import time
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Dict, Optional, Any
+
+from config import RATE_LIMITS
+from sqlite_db import SQLiteDB
+
+
+# =============================================================================
+# CONFIGURATION
+# =============================================================================
+
+STATE_DIR = Path(os.environ.get('RATE_LIMIT_DIR', os.environ.get('CITATION_CACHE_DIR', '/data/cache')))
+RATE_LIMIT_ENABLED = os.environ.get('RATE_LIMIT_ENABLED', 'true').lower() == 'true'
+# Longest a request will wait for its slot before giving up
+RATE_LIMIT_MAX_WAIT = float(os.environ.get('RATE_LIMIT_MAX_WAIT', '5'))
+# How long an unlisted host found unpenalized is trusted before the shared
+# table is checked again (i.e. how late this process notices another
+# worker's penalty)
+PENALTY_RECHECK_SECONDS = float(os.environ.get('RATE_LIMIT_PENALTY_RECHECK', '2'))
+# Memo size that triggers dropping expired entries
+MEMO_PRUNE_SIZE = 1024
+
+
+class RateLimiter:
+    """
+    Token buckets keyed by host.
+
+    Thread-safe; storage errors never propagate - the limiter falls back
+    to per-process state.
+    """
+
+    DB_NAME = 'rate_limits.db'
+    BUSY_TIMEOUT_MS = 2000
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS buckets (
+            host TEXT PRIMARY KEY,
+            tat REAL NOT NULL           -- theoretical arrival time (epoch seconds)
+        );
+    """
+
+    def __init__(self, limits: Dict[str, float] = RATE_LIMITS, state_dir: Path = STATE_DIR,
+                 max_wait: float = RATE_LIMIT_MAX_WAIT, enabled: bool = RATE_LIMIT_ENABLED):
+        self.limits = dict(limits)
+        self.max_wait = max_wait
+        self.enabled = enabled
+        self._db = SQLiteDB(self.DB_NAME, state_dir, self.SCHEMA, owner='RateLimiter',
+                            busy_timeout_ms=self.BUSY_TIMEOUT_MS) if enabled else None
+
+        self._lock = threading.Lock()
+        self._tat: Dict[str, float] = {}  # Per-process state when there's no database
+        # Unlisted hosts: penalty end last seen, and "not held" until this time
+        self._held: Dict[str, float] = {}
+        self._clear_until: Dict[str, float] = {}
+        self._stats = {'acquired': 0, 'delayed': 0, 'rejected': 0, 'penalties': 0, 'wait_seconds': 0.0}
+
+    @property
+    def _persistent(self) -> bool:
+        """Whether the shared database is usable (opened on first check)."""
+        return self._db is not None and self._db.available
+
+    def _conn(self) -> sqlite3.Connection:
+        """Get this thread's connection (opens the database on first use)."""
+        return self._db.conn()
+
+    # =========================================================================
+    # PUBLIC API
+    # =========================================================================
+
+    def acquire(self, host: Optional[str]) -> bool:
+        """
+        Take a request slot for host, sleeping until it comes up.
+
+        Returns:
+            True to go ahead; False if the slot is more than max_wait away
+            (nothing is reserved)
+        """
+        if not self.enabled or not host or not self._is_limited(host):
+            return True
+
+        rate = self.limits.get(host)
+        interval = 1.0 / rate if rate else 0.0
+        tolerance = max(0.0, (rate or 0) - 1) * interval  # Burst of one second's worth
+
+        def reserve(tat: float, now: float):
+            start = max(now, tat - tolerance)
+            if start - now > self.max_wait:
+                return None, tat
+            return start - now, max(tat, now) + interval
+
+        wait = self._update(host, reserve)
+        with self._lock:
+            if wait is None:
+                self._stats['rejected'] += 1
+            else:
+                self._stats['acquired'] += 1
+                if wait > 0:
+                    self._stats['delayed'] += 1
+                    self._stats['wait_seconds'] += wait
+        if wait is None:
+            return False
+        if wait > 0:
+            time.sleep(wait)
+        return True
+
+    def penalize(self, host: Optional[str], seconds: float) -> None:
+        """Hold all requests to host for `seconds` (e.g. its Retry-After)."""
+        if not self.enabled or not host or seconds <= 0:
+            return
+        rate = self.limits.get(host)
+        tolerance = max(0.0, (rate or 0) - 1) / rate if rate else 0.0
+        with self._lock:
+            self._stats['penalties'] += 1
+            if rate is None:
+                self._held[host] = max(self._held.get(host, 0.0), time.time() + seconds)
+                self._clear_until.pop(host, None)
+        self._update(host, lambda tat, now: (None, max(tat, now + seconds + tolerance)))
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self._stats)
+        stats['wait_seconds'] = round(stats['wait_seconds'], 2)
+        stats['shared'] = self._persistent
+        return stats
+
+    # =========================================================================
+    # INTERNALS
+    # =========================================================================
+
+    def _is_limited(self, host: str) -> bool:
+        """Listed in RATE_LIMITS, or held by a penalty that hasn't run out."""
+        if host in self.limits:
+            return True
+        now = time.time()
+        with self._lock:
+            if self._held.get(host, 0.0) > now:
+                return True
+            if self._clear_until.get(host, 0.0) > now:
+                return False
+
+        tat = self._tat_of(host)
+        with self._lock:
+            if tat > now:
+                self._held[host] = tat
+            else:
+                self._clear_until[host] = now + PENALTY_RECHECK_SECONDS
+            if len(self._held) + len(self._clear_until) > MEMO_PRUNE_SIZE:
+                self._held = {h: t for h, t in self._held.items() if t > now}
+                self._clear_until = {h: t for h, t in self._clear_until.items() if t > now}
+        return tat > now
+
+    def _tat_of(self, host: str) -> float:
+        """Host's stored TAT (0 if it has no bucket)."""
+        if self._persistent:
+            try:
+                row = self._conn().execute('SELECT tat FROM buckets WHERE host = ?', (host,)).fetchone()
+                return row[0] if row else 0.0
+            except Exception as e:
+                print(f"[RateLimiter] Shared state unavailable ({e}) - using per-process state")
+        with self._lock:
+            return self._tat.get(host, 0.0)
+
+    def _update(self, host: str, fn) -> Any:
+        """
+        Atomically apply fn(tat, now) -> (result, new_tat) to host's bucket.
+
+        Returns:
+            fn's result
+        """
+        if self._persistent:
+            try:
+                conn = self._conn()
+                conn.execute('BEGIN IMMEDIATE')
+                try:
+                    row = conn.execute('SELECT tat FROM buckets WHERE host = ?', (host,)).fetchone()
+                    now = time.time()
+                    result, tat = fn(row[0] if row else now, now)
+                    conn.execute('INSERT OR REPLACE INTO buckets (host, tat) VALUES (?, ?)', (host, tat))
+                    conn.execute('COMMIT')
+                    return result
+                except Exception:
+                    conn.execute('ROLLBACK')
+                    raise
+            except Exception as e:
+                print(f"[RateLimiter] Shared state unavailable ({e}) - using per-process state")
+
+        with self._lock:
+            now = time.time()
+            result, self._tat[host] = fn(self._tat.get(host, now), now)
+        return result
+
+
+# Global instance (one per worker process; bucket state is shared)
+rate_limiter = RateLimiter()
@@ -0,0 +1,307 @@
+"""
+citeflex/engines/snapshot.py
+
+Offline academic search over a local Crossref/OpenAlex snapshot.
+
+Most academic lookups in a busy deployment are for works that appear in
+the public Crossref / OpenAlex data dumps. SnapshotEngine answers them
+from a local SQLite database with an FTS5 full-text index, so
+_route_journal only goes to the network on a miss or a low-confidence
+match.
+
+Records are normalized at ingestion time by the network engines' own
+_normalize() (CrossrefEngine / OpenAlexEngine), so a snapshot hit is
+indistinguishable from an API hit apart from source_engine.
+
+Ranking: FTS5 bm25 over title/authors/journal picks candidates; each is
+then scored with famous_papers.score_record() (title coverage, first
+author, year), and search() only trusts matches >= SNAPSHOT_MIN_SCORE.
+
+Building / updating the database (streaming; files may be .jsonl,
+.json or gzipped, one work per line, or Crossref {"items": [...]} files):
+
+    python -m engines.snapshot ingest crossref/*.json.gz openalex/*.jsonl.gz
+    python -m engines.snapshot ingest --db /data/snapshot/works.db part_000.jsonl.gz
+
+Without a database file the engine is simply unavailable (every lookup
+is a miss).
+
+Version History:
+    2026-10-16: Initial implementation
+"""
+
+import os
+import re
+import sys
+import gzip
+import json
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Optional, List, Dict, Any, Iterable, Tuple
+
+from engines.base import SearchEngine
+from engines.famous_papers import tokenize, score_record
+from models import CitationMetadata, normalize_doi
+
+
+# =============================================================================
+# CONFIGURATION
+# =============================================================================
+
+SNAPSHOT_DB = Path(os.environ.get('SNAPSHOT_DB', '/data/snapshot/works.db'))
+SNAPSHOT_MIN_SCORE = float(os.environ.get('SNAPSHOT_MIN_SCORE', '0.7'))
+
+# FTS candidates re-scored per query
+CANDIDATES = 25
+# Query words used in the FTS expression
+MAX_QUERY_WORDS = 12
+# Rows per ingestion transaction
+INGEST_BATCH = 2000
+
+SCHEMA = """
+    CREATE TABLE IF NOT EXISTS works (
+        id INTEGER PRIMARY KEY,
+        doi TEXT UNIQUE,                -- normalized (lowercase); NULL if none
+        title TEXT NOT NULL,
+        authors TEXT NOT NULL,          -- space-joined, for FTS
+        journal TEXT NOT NULL,
+        year TEXT,
+        metadata TEXT NOT NULL          -- CitationMetadata.to_dict() JSON
+    );
+    CREATE VIRTUAL TABLE IF NOT EXISTS works_fts USING fts5(
+        title, authors, journal,
+        content='works', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2'
+    );
+"""
+
+
+# =============================================================================
+# ENGINE
+# =============================================================================
+
+class SnapshotEngine(SearchEngine):
+    """
+    Local Crossref/OpenAlex snapshot search (read-only SQLite + FTS5).
+    """
+
+    name = "Snapshot"
+
+    def __init__(self, db_path: Path = SNAPSHOT_DB, min_score: float = SNAPSHOT_MIN_SCORE, **kwargs):
+        super().__init__(**kwargs)
+        self.db_path = Path(db_path)
+        self.min_score = min_score
+        self._local = threading.local()
+
+    @property
+    def available(self) -> bool:
+        return self.db_path.exists()
+
+    def _conn(self) -> Optional[sqlite3.Connection]:
+        """This thread's read-only connection, or None without a database."""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            if not self.available:
+                return None
+            try:
+                conn = sqlite3.connect(f"file:{self.db_path}?mode=ro", uri=True, check_same_thread=False)
+            except sqlite3.Error as e:
+                print(f"[{self.name}] Cannot open {self.db_path}: {e}")
+                return None
+            self._local.conn = conn
+        return conn
+
+    def search(self, query: str) -> Optional[CitationMetadata]:
+        """Best match scoring at least min_score, or None."""
+        matches = self.search_scored(query, limit=1)
+        if matches and matches[0][0] >= self.min_score:
+            return matches[0][1]
+        return None
+
+    def search_multiple(self, query: str, limit: int = 5) -> List[CitationMetadata]:
+        return [metadata for _, metadata in self.search_scored(query, limit)]
+
+    def search_scored(self, query: str, limit: int = 5) -> List[Tuple[float, CitationMetadata]]:
+        """
+        Ranked matches for a citation query.
+
+        Returns:
+            (score, metadata) pairs, best first; score is 0..1
+        """
+        conn = self._conn()
+        words = list(dict.fromkeys(re.findall(r'\w{3,}', query.lower())))[:MAX_QUERY_WORDS]
+        if conn is None or not words:
+            return []
+
+        expression = ' OR '.join(f'"{word}"*' for word in words)
+        try:
+            rows = conn.execute(
+                """SELECT works.metadata FROM works_fts
+                   JOIN works ON works.id = works_fts.rowid
+                   WHERE works_fts MATCH ? ORDER BY bm25(works_fts, 10.0, 3.0, 1.0) LIMIT ?""",
+                (expression, CANDIDATES)
+            ).fetchall()
+        except sqlite3.Error as e:
+            print(f"[{self.name}] Query failed: {e}")
+            return []
+
+        query_words = set(tokenize(query))
+        years = set(re.findall(r'\b(1[5-9]\d\d|20\d\d)\b', query))
+        scored = []
+        for (data,) in rows:
+            record = json.loads(data)
+            score = score_record(record, query_words, years)
+            if score > 0:
+                scored.append((score, self._to_metadata(record, query)))
+
+        scored.sort(key=lambda pair: pair[0], reverse=True)
+        return scored[:limit]
+
+    def get_by_id(self, doi: str) -> Optional[CitationMetadata]:
+        """Look up by DOI."""
+        conn = self._conn()
+        key = normalize_doi(doi)
+        if conn is None or not key:
+            return None
+        try:
+            row = conn.execute('SELECT metadata FROM works WHERE doi = ?', (key,)).fetchone()
+        except sqlite3.Error as e:
+            print(f"[{self.name}] Lookup failed: {e}")
+            return None
+        return self._to_metadata(json.loads(row[0]), doi) if row else None
+
+    def _to_metadata(self, record: Dict[str, Any], raw_source: str) -> CitationMetadata:
+        metadata = CitationMetadata.from_dict(record)
+        metadata.raw_source = raw_source
+        metadata.source_engine = f"{self.name} ({record.get('source_engine') or 'Crossref'})"
+        return metadata
+
+
+# =============================================================================
+# INGESTION
+# =============================================================================
+
+def _iter_items(path: Path) -> Iterable[dict]:
+    """
+    Yield work objects from a snapshot file: JSON lines, or one JSON
+    document (Crossref data files are {"items": [...]}).
+    """
+    opener = gzip.open if path.suffix == '.gz' else open
+    with opener(path, 'rt', encoding='utf-8') as f:
+        first = f.readline()
+        try:
+            json.loads(first) if first.strip() else None
+            line_delimited = True
+        except ValueError:
+            line_delimited = False
+
+        if not line_delimited:
+            f.seek(0)
+            documents = [json.load(f)]
+        else:
+            documents = (json.loads(line) for line in _chain([first], f) if line.strip())
+
+        for document in documents:
+            if isinstance(document.get('message'), dict):
+                document = document['message']
+            if isinstance(document.get('items'), list):
+                yield from document['items']
+            else:
+                yield document
+
+
+def _chain(head: List[str], rest: Iterable[str]) -> Iterable[str]:
+    yield from head
+    yield from rest
+
+
+def _normalize_item(item: dict, crossref, openalex) -> Optional[Dict[str, Any]]:
+    """Normalize a Crossref or OpenAlex work with the network engines' own code."""
+    if 'DOI' in item:
+        metadata = crossref._normalize(item, '')
+    elif 'authorships' in item or str(item.get('id', '')).startswith('https://openalex.org/'):
+        metadata = openalex._normalize(item, '')
+    else:
+        return None
+    if not metadata.title:
+        return None
+    record = metadata.to_dict()
+    record.pop('raw_data', None)
+    return record
+
+
+def ingest(paths: List[Path], db_path: Path = SNAPSHOT_DB) -> int:
+    """
+    Stream snapshot files into the database (insert or replace by DOI),
+    then rebuild the full-text index.
+
+    Returns:
+        Number of works ingested
+    """
+    from engines.academic import CrossrefEngine, OpenAlexEngine
+
+    crossref, openalex = CrossrefEngine(), OpenAlexEngine()
+    db_path.parent.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(str(db_path), isolation_level=None)
+    conn.execute('PRAGMA journal_mode=WAL')
+    conn.execute('PRAGMA synchronous=OFF')
+    conn.executescript(SCHEMA)
+
+    total = 0
+    batch = []
+
+    def flush():
+        conn.execute('BEGIN')
+        conn.executemany(
+            """INSERT OR REPLACE INTO works (doi, title, authors, journal, year, metadata)
+               VALUES (?, ?, ?, ?, ?, ?)""",
+            batch
+        )
+        conn.execute('COMMIT')
+        batch.clear()
+
+    for path in paths:
+        print(f"[Snapshot] Ingesting {path}")
+        for item in _iter_items(path):
+            try:
+                record = _normalize_item(item, crossref, openalex)
+            except Exception as e:
+                print(f"[Snapshot] Skipping malformed work: {e}")
+                continue
+            if record is None:
+                continue
+            batch.append((
+                normalize_doi(record.get('doi', '')) or None,
+                record['title'],
+                ' '.join(record.get('authors') or []),
+                record.get('journal') or '',
+                record.get('year'),
+                json.dumps(record, ensure_ascii=False, separators=(',', ':'))
+            ))
+            total += 1
+            if len(batch) >= INGEST_BATCH:
+                flush()
+            if total % 100000 == 0:
+                print(f"[Snapshot] {total} works...")
+    if batch:
+        flush()
+
+    print("[Snapshot] Rebuilding full-text index...")
+    conn.execute("INSERT INTO works_fts(works_fts) VALUES('rebuild')")
+    conn.execute("INSERT INTO works_fts(works_fts) VALUES('optimize')")
+    conn.close()
+    return total
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    if not args or args[0] != 'ingest':
+        print("Usage: python -m engines.snapshot ingest [--db PATH] FILE...")
+        sys.exit(1)
+    args = args[1:]
+    db = SNAPSHOT_DB
+    if len(args) >= 2 and args[0] == '--db':
+        db, args = Path(args[1]), args[2:]
+    count = ingest([Path(p) for p in args], db)
+    print(f"[Snapshot] Ingested {count} works into {db}")
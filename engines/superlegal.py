@@ -4,6 +4,14 @@ citeflex/engines/superlegal.py
 Unified Legal Citation Engine - Merged from court.py + legal.py
 
 Version History:
+    2026-10-16: Dropped the 0.1s sleeps between CourtListener attempts - requests
+                are spaced by the shared www.courtlistener.com rate limit
+    2026-10-16: CourtListener requests go through SearchEngine._make_request
+                (circuit breaker, upstream_slot, rate limit) instead of requests.get
+    2026-10-16: CourtListener errors, 5xx and 429 are reported to lookup_status
+    2026-10-16: Fuzzy cache lookups (_find_best_cache_match, FamousCasesCache.search_multiple)
+                use a trigram index over FAMOUS_CASES built at import (engines/fuzzy_index.py)
+                instead of scanning every key with difflib
     2025-12-06 16:00: Added _extract_case_name() to fix cache lookup bug.
                       Now extracts "Loving v Virginia" from "Loving v. Virginia, 388 U.S. 1 (1967)"
                       before cache lookup, ensuring famous cases are found even when
@@ -24,13 +32,12 @@ Features:
 """
 
 import re
-import difflib
-import requests
-import time
 from typing import Optional, List, Dict
 from urllib.parse import urlparse, unquote
 
 from engines.base import SearchEngine
+from lookup_status import mark_incomplete
+from engines.fuzzy_index import TrigramIndex
 from models import CitationMetadata, CitationType
 from config import COURTLISTENER_API_KEY
 
@@ -230,6 +237,10 @@ def _extract_case_name(text: str) -> str:
     return text  # Fallback to original
 
 
+# Fuzzy index over the cache keys - built once, so lookups don't scan every case
+_CASE_INDEX = TrigramIndex(FAMOUS_CASES.keys())
+
+
 def _find_best_cache_match(text: str) -> Optional[str]:
     """Find the best matching key in FAMOUS_CASES using fuzzy matching."""
     # First, extract just the case name (strips citation details like "388 U.S. 1 (1967)")
@@ -241,7 +252,7 @@ def _find_best_cache_match(text: str) -> Optional[str]:
         return clean_key
     
     # Fuzzy match
-    matches = difflib.get_close_matches(clean_key, FAMOUS_CASES.keys(), n=1, cutoff=0.7)
+    matches = _CASE_INDEX.get_close_matches(clean_key, n=1, cutoff=0.7)
     if matches:
         return matches[0]
     return None
@@ -417,7 +428,7 @@ class FamousCasesCache(SearchEngine):
             seen.add(data['case_name'])
         
         # Fuzzy matches
-        matches = difflib.get_close_matches(clean_key, FAMOUS_CASES.keys(), n=limit, cutoff=0.5)
+        matches = _CASE_INDEX.get_close_matches(clean_key, n=limit, cutoff=0.5)
         for match_key in matches:
             data = FAMOUS_CASES[match_key]
             if data['case_name'] not in seen:
@@ -456,6 +467,7 @@ class CourtListenerEngine(SearchEngine):
     base_url = "https://www.courtlistener.com/api/rest/v4/search/"
     
     def __init__(self, api_key: Optional[str] = None, **kwargs):
+        kwargs.setdefault('timeout', 8)
         super().__init__(api_key=api_key or COURTLISTENER_API_KEY, **kwargs)
         self.headers = {
             'Authorization': f'Token {self.api_key}',
@@ -501,7 +513,6 @@ class CourtListenerEngine(SearchEngine):
         # 3. Fuzzy search
         fuzzy_query = self._make_fuzzy(smart_query)
         if fuzzy_query != smart_query:
-            time.sleep(0.1)
             result = self._try_search(fuzzy_query)
             if result:
                 return result
@@ -511,7 +522,6 @@ class CourtListenerEngine(SearchEngine):
         if plaintiff and len(plaintiff) > 4:
             common = ['state', 'people', 'united', 'states', 'board', 'city', 'county']
             if plaintiff.lower() not in common:
-                time.sleep(0.1)
                 results = self._api_request(query, plaintiff)
                 for r in results[:5]:
                     if plaintiff.lower() in (r.get('caseName', '') or '').lower():
@@ -528,25 +538,27 @@ class CourtListenerEngine(SearchEngine):
         return None
     
     def _api_request(self, original_query: str, search_query: str) -> List[dict]:
-        """Make API request to CourtListener."""
+        """
+        Make API request to CourtListener.
+        
+        Goes through _make_request, so CourtListener gets the circuit
+        breaker, upstream concurrency limit and shared rate limit.
+        """
+        params = {
+            'q': search_query,
+            'type': 'o',
+            'order_by': 'score desc',
+            'format': 'json'
+        }
+        response = self._make_request(self.base_url, params=params, headers=self.headers)
+        if response is None:
+            return []
         try:
-            params = {
-                'q': search_query,
-                'type': 'o',
-                'order_by': 'score desc',
-                'format': 'json'
-            }
-            response = requests.get(
-                self.base_url,
-                params=params,
-                headers=self.headers,
-                timeout=8
-            )
-            if response.status_code == 200:
-                return response.json().get('results', [])
-        except Exception as e:
-            print(f"[CourtListener] Error: {e}")
-        return []
+            return response.json().get('results', [])
+        except ValueError as e:
+            print(f"[CourtListener] Unreadable response: {e}")
+            mark_incomplete(f"CourtListener: {e}")
+            return []
     
     def _to_metadata(self, item: dict, query: str) -> Optional[CitationMetadata]:
         """Convert API result to CitationMetadata."""
@@ -34,6 +34,7 @@ class WikipediaEngine(SearchEngine):
     
     name = "Wikipedia"
     base_url = "https://en.wikipedia.org/w/api.php"
+    CACHE_TTL = 24 * 3600
     
     def __init__(self, language: str = "en", **kwargs):
         """
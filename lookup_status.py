@@ -0,0 +1,76 @@
+"""
+citeflex/lookup_status.py
+
+Whether a lookup got a real answer from every upstream it asked.
+
+Engines return None both for "not found" and for "couldn't ask" - a
+timeout, a 5xx, a 429, a request skipped by the rate limiter or an open
+circuit breaker. Negative caches (citation_cache, engines.doi_store) must
+only remember the first kind; caching the second turns a brief outage
+into hours of missing citations.
+
+Code that fails or skips an upstream call reports it with
+mark_incomplete(); the negative cache wraps its lookup in track() and
+only stores a miss if nothing was reported. Tracking follows the lookup
+into scheduler pools (tasks run in a copy of the submitter's context) and
+into single-flight followers, and nested track() blocks report to the
+enclosing one too.
+
+Usage:
+    from lookup_status import track, mark_incomplete
+
+    with track() as status:
+        metadata = resolve(query)
+    if metadata is not None or status.complete:
+        cache.put(query, metadata)
+
+    # in an engine, where a request failed or was skipped
+    mark_incomplete(f"{self.name}: timeout")
+
+Version History:
+    2026-10-16: Initial implementation
+"""
+
+import contextvars
+from contextlib import contextmanager
+from typing import Iterator, List, Optional
+
+
+class LookupStatus:
+    """Upstream failures reported during one tracked lookup."""
+
+    def __init__(self, parent: Optional['LookupStatus'] = None):
+        self.parent = parent
+        self.failures: List[str] = []  # list.append is atomic - safe from pool threads
+
+    @property
+    def complete(self) -> bool:
+        """True if every upstream asked gave a definitive answer."""
+        return not self.failures
+
+    def mark(self, reason: str) -> None:
+        status = self
+        while status is not None:
+            status.failures.append(reason)
+            status = status.parent
+
+
+_current: contextvars.ContextVar = contextvars.ContextVar('lookup_status', default=None)
+
+
+@contextmanager
+def track() -> Iterator[LookupStatus]:
+    """Track upstream failures for the enclosed lookup."""
+    status = LookupStatus(_current.get())
+    token = _current.set(status)
+    try:
+        yield status
+    finally:
+        _current.reset(token)
+
+
+def mark_incomplete(reason: str) -> None:
+    """Report that an upstream call failed or was skipped (no-op when untracked)."""
+    status = _current.get()
+    if status is not None:
+        status.mark(reason)
@@ -12,6 +12,11 @@ This approach extracts the docx as a zip, manipulates the XML directly,
 and repackages it - giving full control over Word's internal structure.
 
 Version History:
+    2026-10-16: Phase 1 submits at most PARALLEL_WORKERS lookups at a time with a
+                per-note timeout and document deadline (Pool.map_window)
+    2026-10-16: Phase 1 runs on the shared scheduler notes pool
+    2026-10-16: Phase 1 looks up each distinct source once (group_notes_by_source
+                from document_processor) and fans the result out to its notes
     2025-12-05 12:53: Enhanced IBID_PATTERN to recognize "Id." (Bluebook) and "pp." prefixes
                       Switched from router to unified_router import
     2025-12-05 13:15: Verified ibid detection passes 13/13 tests including Id. at X patterns
@@ -913,11 +918,13 @@ def process_document(
     """
     # Import here to avoid circular imports
     from routers.unified import get_citation
+    from document_processor import group_notes_by_source, DOCUMENT_DEADLINE
     from formatters.base import BaseFormatter, get_formatter
-    from concurrent.futures import ThreadPoolExecutor, TimeoutError as FuturesTimeout
+    from scheduler import get_pool
     
     # Per-note timeout to prevent indefinite hanging
     NOTE_TIMEOUT = 8  # seconds per note
+    PARALLEL_WORKERS = 10  # This document's lookups in flight at a time
     
     results = []
     
@@ -1016,17 +1023,56 @@ def process_document(
     
     # --- PHASE 1: Parallel metadata fetching ---
     print(f"[process_document] Phase 1: Fetching metadata in parallel...")
-    PARALLEL_WORKERS = 10
     
     def fetch_wrapper(args):
         note, note_type = args
         print(f"[process_document] Fetching: {note.get('text', '')[:40]}...")
         return fetch_metadata_for_note(note, note_type)
     
-    with ThreadPoolExecutor(max_workers=PARALLEL_WORKERS) as executor:
-        fetched_data = list(executor.map(fetch_wrapper, all_notes))
+    # Notes citing the same source (differing only in page pinpoint) are
+    # fetched once; explicit ibids need no API call and are handled inline
+    lookup_indexes = [idx for idx, (note, _) in enumerate(all_notes) if not is_ibid(note['text'])]
+    groups = list(group_notes_by_source([all_notes[idx][0]['text'] for idx in lookup_indexes]).values())
+    representatives = [all_notes[lookup_indexes[group[0]]] for group in groups]
+    
+    fetched_sources = get_pool('notes').map_window(
+        fetch_wrapper,
+        representatives,
+        window=PARALLEL_WORKERS,
+        item_timeout=NOTE_TIMEOUT,
+        deadline=DOCUMENT_DEADLINE,
+        label='process_document'
+    )
+    for position, (note, note_type) in enumerate(representatives):
+        if fetched_sources[position] is None:  # Timed out
+            fetched_sources[position] = {
+                'note_id': note['id'],
+                'note_type': note_type,
+                'original_text': note['text'],
+                'is_explicit_ibid': False,
+                'ibid_page': None,
+                'metadata': None,
+                'formatted': None,
+                'current_url': None,
+                'error': f"Lookup timed out after {NOTE_TIMEOUT}s"
+            }
     
-    print(f"[process_document] Phase 1 complete: {len(fetched_data)} notes fetched")
+    fetched_data = [
+        fetch_metadata_for_note(note, note_type) if is_ibid(note['text']) else None
+        for note, note_type in all_notes
+    ]
+    for group, source_data in zip(groups, fetched_sources):
+        for position in group:
+            note, note_type = all_notes[lookup_indexes[position]]
+            fetched_data[lookup_indexes[position]] = dict(
+                source_data,
+                note_id=note['id'],
+                note_type=note_type,
+                original_text=note['text']
+            )
+    
+    print(f"[process_document] Phase 1 complete: {len(fetched_data)} notes fetched "
+          f"({len(representatives)} distinct sources)")
     
     # --- PHASE 2: Sequential citation form determination ---
     print(f"[process_document] Phase 2: Applying ibid/short form logic sequentially...")
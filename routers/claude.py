@@ -5,8 +5,16 @@ Claude AI-powered citation type detection and classification.
 Used as the primary AI router for ambiguous citation queries.
 
 Version History:
+    2026-10-16: _create_message() only caches responses that pass a validator
+                (JSON object by default; classification needs a 'type')
+    2026-10-16: Classification, guess_citation and _identify_with_claude go through
+                _create_message(), which answers repeated prompts from engines/ai_cache.py
+    2026-10-16: _get_client() and ClaudeRouter reuse one Anthropic client per process
+    2026-10-16: get_citation_options searches run on the shared scheduler network pool
     2025-12-06: Initial production version with multi-option support
     2025-12-07: Added guess_citation() and guess_and_search() for Claude-first lookup
+    2026-10-16: DOI lookups (guess_and_search, get_citation_options) go through
+                engines.doi_store instead of direct Crossref requests
     
 Usage:
     from claude_router import classify_with_claude, get_citation_options, guess_and_search
@@ -25,13 +33,17 @@ import os
 import re
 import json
 import requests
-from typing import Optional, Tuple, List
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Any, Callable, Optional, Tuple, List
+from concurrent.futures import as_completed, TimeoutError as FuturesTimeout
 
 import anthropic
 
 from models import CitationType, CitationMetadata
 from config import DEFAULT_TIMEOUT
+from scheduler import submit
+from engines.ai_clients import get_anthropic_client
+from engines.ai_cache import ai_cache
+from cost_tracker import calculate_cost
 
 # =============================================================================
 # CONFIGURATION
@@ -46,10 +58,67 @@ CLAUDE_MODEL = "claude-opus-4-20250514"
 # =============================================================================
 
 def _get_client():
-    """Get Anthropic client (lazy initialization)."""
-    if not ANTHROPIC_API_KEY:
+    """Get the shared Anthropic client (one per process, created on first use)."""
+    return get_anthropic_client(ANTHROPIC_API_KEY)
+
+
+def _create_message(client, system: str, content: str, max_tokens: int,
+                    validate: Optional[Callable[[str], Any]] = None) -> str:
+    """
+    Send one user message to Claude and return the response text.
+    
+    Repeated prompts are answered from the AI response cache
+    (engines/ai_cache.py). Only responses that pass validate are cached
+    or served from it, so a truncated or off-format answer is retried
+    next time rather than replayed for the life of the cache entry.
+    API errors propagate as before.
+    
+    Args:
+        validate: Returns a truthy value for a usable response
+                  (default: the response contains a JSON object)
+    """
+    validate = validate or _json_object
+    cached = ai_cache.get('claude', CLAUDE_MODEL, system, content, max_tokens)
+    if cached is not None and validate(cached):
+        return cached
+    
+    response = client.messages.create(
+        model=CLAUDE_MODEL,
+        max_tokens=max_tokens,
+        system=system,
+        messages=[{"role": "user", "content": content}]
+    )
+    text = response.content[0].text
+    
+    if validate(text):
+        usage = getattr(response, 'usage', None)
+        cost = calculate_cost(
+            'claude',
+            getattr(usage, 'input_tokens', 0) or 0,
+            getattr(usage, 'output_tokens', 0) or 0
+        )
+        ai_cache.put('claude', CLAUDE_MODEL, system, content, max_tokens, text, cost)
+    else:
+        print("[ClaudeRouter] Unusable response - not cached")
+    return text
+
+
+def _json_object(text: str) -> Optional[dict]:
+    """The first {...} block in a response, parsed, or None."""
+    json_match = re.search(r'\{[\s\S]*\}', text or '')
+    if not json_match:
         return None
-    return anthropic.Anthropic(api_key=ANTHROPIC_API_KEY)
+    try:
+        data = json.loads(json_match.group())
+    except (json.JSONDecodeError, ValueError):
+        return None
+    return data if isinstance(data, dict) else None
+
+
+def _is_classification(text: str) -> bool:
+    """Whether a CLASSIFY_PROMPT response names a type."""
+    data = _json_object(text)
+    return bool(data and isinstance(data.get('type'), str))
 
 # =============================================================================
 # SINGLE CLASSIFICATION (for unified_router.py compatibility)
@@ -80,7 +149,7 @@ class ClaudeRouter:
         self.timeout = timeout or DEFAULT_TIMEOUT
         self.client = None
         if self.api_key:
-            self.client = anthropic.Anthropic(api_key=self.api_key)
+            self.client = get_anthropic_client(self.api_key)
     
     def classify(self, text: str) -> Tuple[CitationType, Optional[CitationMetadata]]:
         """Classify a citation query and return type + metadata."""
@@ -88,14 +157,10 @@ class ClaudeRouter:
             return CitationType.UNKNOWN, None
         
         try:
-            response = self.client.messages.create(
-                model=CLAUDE_MODEL,
-                max_tokens=500,
-                system=CLASSIFY_PROMPT,
-                messages=[{"role": "user", "content": f"Classify this citation:\n\n{text}"}]
+            response_text = _create_message(
+                self.client, CLASSIFY_PROMPT, f"Classify this citation:\n\n{text}", 500,
+                validate=_is_classification
             )
-            
-            response_text = response.content[0].text
             return self._parse_response(response_text, text)
             
         except anthropic.RateLimitError:
@@ -349,13 +414,9 @@ def guess_citation(fragment: str) -> dict:
         return {"confidence": 0.0, "type": "unknown"}
     
     try:
-        response = client.messages.create(
-            model=CLAUDE_MODEL,
-            max_tokens=600,
-            system=GUESS_PROMPT,
-            messages=[{"role": "user", "content": f"What published work is this referencing?\n\n{fragment}"}]
-        )
-        text = response.content[0].text.strip()
+        text = _create_message(
+            client, GUESS_PROMPT, f"What published work is this referencing?\n\n{fragment}", 600
+        ).strip()
         
         # Parse JSON response
         json_match = re.search(r'\{[\s\S]*\}', text)
@@ -386,6 +447,7 @@ def guess_and_search(fragment: str) -> Optional[CitationMetadata]:
         CitationMetadata if found/verified, None otherwise
     """
     from engines.academic import CrossrefEngine, OpenAlexEngine, PubMedEngine
+    from engines.doi_store import get_by_doi
     
     # Step 1: Get Claude's guess
     guess = guess_citation(fragment)
@@ -406,7 +468,7 @@ def guess_and_search(fragment: str) -> Optional[CitationMetadata]:
     # BUT verify the result actually matches the original fragment
     if doi:
         try:
-            result = CrossrefEngine().get_by_id(doi)
+            result = get_by_doi(doi)
             if result and result.title:
                 # Verify result matches ORIGINAL fragment, not just Claude's guess
                 if _fragment_matches_result(fragment, result):
@@ -484,7 +546,7 @@ def guess_and_search(fragment: str) -> Optional[CitationMetadata]:
         # Try to verify web search result via APIs
         if web_doi:
             try:
-                result = CrossrefEngine().get_by_id(web_doi)
+                result = get_by_doi(web_doi)
                 if result:
                     print(f"[WebSearch] Verified via DOI: {web_doi}")
                     result.source_engine = "Web Search + Crossref (DOI)"
@@ -648,13 +710,9 @@ def _identify_with_claude(messy_note: str) -> dict:
         return {"possible_types": ["unknown"], "search_queries": [messy_note]}
     
     try:
-        response = client.messages.create(
-            model=CLAUDE_MODEL,
-            max_tokens=400,
-            system=IDENTIFY_PROMPT,
-            messages=[{"role": "user", "content": f"Identify this citation:\n\n{messy_note}"}]
-        )
-        text = response.content[0].text.strip()
+        text = _create_message(
+            client, IDENTIFY_PROMPT, f"Identify this citation:\n\n{messy_note}", 400
+        ).strip()
         json_match = re.search(r'\{[\s\S]*\}', text)
         if json_match:
             return json.loads(json_match.group())
@@ -1347,29 +1405,18 @@ def get_citation_options(messy_note: str, max_options: int = 5) -> list:
     doi_match = re.search(r'(10\.\d{4,}/[^\s\'"<>]+)', messy_note)
     if doi_match:
         doi = doi_match.group(1).rstrip('.,;')
-        # Direct DOI lookup via Crossref
+        # Direct DOI lookup via the canonical DOI store (Crossref)
         try:
-            url = f"https://api.crossref.org/works/{doi}"
-            headers = {"User-Agent": "CiteFlex/1.0"}
-            resp = requests.get(url, headers=headers, timeout=10)
-            if resp.status_code == 200:
-                item = resp.json().get("message", {})
-                title = item.get("title", [""])[0] if item.get("title") else ""
-                authors = []
-                for a in item.get("author", []):
-                    given = a.get('given', '')
-                    family = a.get('family', '')
-                    if given and family:
-                        authors.append(f"{given} {family}")
-                
-                year = ""
-                if item.get("published"):
-                    year = str(item["published"].get("date-parts", [[""]])[0][0])
-                
-                journal = item.get("container-title", [""])[0] if item.get("container-title") else ""
-                volume = item.get("volume", "")
-                issue = item.get("issue", "")
-                pages = item.get("page", "")
+            from engines.doi_store import get_by_doi
+            result = get_by_doi(doi)
+            if result:
+                title = result.title or ""
+                authors = result.authors or []
+                year = result.year or ""
+                journal = result.journal or ""
+                volume = result.volume or ""
+                issue = result.issue or ""
+                pages = result.pages or ""
                 
                 author_str = _format_authors(authors)
                 cite = f'{author_str}, "{title},"'
@@ -1410,26 +1457,28 @@ def get_citation_options(messy_note: str, max_options: int = 5) -> list:
     if not queries:
         queries = [messy_note]
     
-    # Search multiple APIs in parallel
-    with ThreadPoolExecutor(max_workers=6) as executor:
-        futures = []
-        
-        for query in queries[:2]:
-            futures.append(executor.submit(_search_google_books, query, 2))
-            futures.append(executor.submit(_search_crossref, query, 2))
-            futures.append(executor.submit(_search_pubmed, query, 2))
-        
-        if messy_note not in queries:
-            futures.append(executor.submit(_search_google_books, messy_note, 2))
-            futures.append(executor.submit(_search_crossref, messy_note, 2))
-            futures.append(executor.submit(_search_pubmed, messy_note, 2))
-        
+    # Search multiple APIs in parallel on the shared network pool
+    futures = []
+    
+    for query in queries[:2]:
+        futures.append(submit('network', _search_google_books, query, 2))
+        futures.append(submit('network', _search_crossref, query, 2))
+        futures.append(submit('network', _search_pubmed, query, 2))
+    
+    if messy_note not in queries:
+        futures.append(submit('network', _search_google_books, messy_note, 2))
+        futures.append(submit('network', _search_crossref, messy_note, 2))
+        futures.append(submit('network', _search_pubmed, messy_note, 2))
+    
+    try:
         for future in as_completed(futures, timeout=20):
             try:
                 results = future.result(timeout=5)
                 all_results.extend(results)
             except Exception:
                 pass
+    except FuturesTimeout:
+        pass  # Use whatever arrived; stragglers finish in the background
     
     return _dedupe_results(all_results)[:max_options]
 
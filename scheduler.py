@@ -0,0 +1,277 @@
+"""
+citeflex/scheduler.py
+
+Named, bounded, process-wide worker pools.
+
+Fan-out used to create a ThreadPoolExecutor per call (_route_journal per
+citation, AuthorDateEngine.search, get_citation_options, every document's
+note fetch), so thread counts grew with request concurrency: 4 gunicorn
+threads each processing a document with 5 note workers, each note fanning
+out to 6 engines, is 120+ short-lived threads per worker, all created and
+torn down per call. The pools here are created once per worker process and
+shared by every request, so concurrency is capped by configuration.
+
+Pools (sizes in config.POOL_SIZES, overridable with POOL_SIZES env):
+    notes   - per-note / per-citation document work
+    network - engine and API calls (notes tasks submit here)
+    ai      - AI provider calls
+
+Tasks in one pool may wait on tasks in a pool further down the list, never
+the other way round. A task that submits to its own pool runs inline, so
+nested use can't deadlock the pool on itself.
+
+Per-request batches (a document's notes or citations) use map_window(),
+which keeps at most `window` of the batch in flight and bounds each item
+and the whole batch in time; map() is for small, already-bounded fan-out.
+
+Tasks run in a copy of the submitter's contextvars context, so per-request
+state such as lookup_status tracking follows the work into the pool.
+
+Every pool reports queue depth and utilization (stats(), shown on /health).
+
+Usage:
+    from scheduler import submit, get_pool
+
+    future = submit('network', engine.search, query)
+    results = get_pool('notes').map(process_one, items)
+    results = get_pool('notes').map_window(process_one, items, window=10, item_timeout=8)
+
+Version History:
+    2026-10-16: Dropped the 'cpu' pool - nothing submitted to it
+    2026-10-16: Added Pool.map_window() - windowed submission with per-item timeouts
+    2026-10-16: Tasks run in a copy of the submitting thread's context
+    2026-10-16: Initial implementation
+"""
+
+import time
+import threading
+import contextvars
+from concurrent.futures import Future, ThreadPoolExecutor, wait, FIRST_COMPLETED
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+from config import POOL_SIZES
+
+
+class Pool:
+    """
+    A lazily started, bounded ThreadPoolExecutor with usage counters.
+    """
+
+    def __init__(self, name: str, max_workers: int):
+        self.name = name
+        self.max_workers = max_workers
+        self._executor = None
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._queued = 0
+        self._active = 0
+        self._stats = {'submitted': 0, 'completed': 0, 'failed': 0, 'inline': 0, 'cancelled': 0}
+        self._busy_seconds = 0.0
+        self._started = time.time()
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.max_workers,
+                    thread_name_prefix=f"pool-{self.name}"
+                )
+            return self._executor
+
+    def submit(self, fn: Callable, *args, **kwargs) -> Future:
+        """
+        Schedule fn(*args, **kwargs) on this pool.
+
+        Returns:
+            A Future; already completed if called from one of this pool's
+            own threads (the call runs inline)
+        """
+        if getattr(self._local, 'inside', False):
+            return self._run_inline(fn, *args, **kwargs)
+
+        with self._lock:
+            self._queued += 1
+            self._stats['submitted'] += 1
+        context = contextvars.copy_context()
+        future = self._get_executor().submit(context.run, self._run, fn, args, kwargs)
+        future.add_done_callback(self._on_done)
+        return future
+
+    def map(self, fn: Callable, items: Iterable) -> List[Any]:
+        """Run fn over items on this pool; results in input order."""
+        futures = [self.submit(fn, item) for item in items]
+        return [future.result() for future in futures]
+
+    def map_window(self, fn: Callable, items: Iterable, window: int,
+                   item_timeout: Optional[float] = None, deadline: Optional[float] = None,
+                   default: Any = None, label: str = 'Pool') -> List[Any]:
+        """
+        Run fn over items with at most `window` of them in flight at once.
+
+        One large batch can't queue ahead of every other request's work,
+        and slow items are bounded. Items that fail, run longer than
+        item_timeout once started, or haven't finished when the deadline
+        passes get `default` and aren't waited on. A timed-out item keeps
+        its thread until fn returns, so it still counts against the window
+        until then - abandoned calls can't pile up on the pool.
+
+        Args:
+            fn: Called with one item
+            items: Work items
+            window: Max items of this batch submitted at a time
+            item_timeout: Seconds allowed per item once it has started (None = no limit)
+            deadline: Seconds allowed for the whole batch (None = no limit)
+            default: Result for items that failed or timed out
+            label: Log prefix
+
+        Returns:
+            Results in input order
+        """
+        items = list(items)
+        results = [default] * len(items)
+        if not items:
+            return results
+
+        started: Dict[int, float] = {}  # index -> monotonic start time
+
+        def run(index: int):
+            started[index] = time.monotonic()
+            return fn(items[index])
+
+        window = max(1, window)
+        next_index = 0
+        futures: Dict[Future, int] = {}
+        pending = set()
+        timed_out = set()  # Gave up on these, but they still hold a pool thread
+
+        def top_up():
+            nonlocal next_index
+            while next_index < len(items) and len(pending) + len(timed_out) < window:
+                future = self.submit(run, next_index)
+                futures[future] = next_index
+                pending.add(future)
+                next_index += 1
+
+        top_up()
+        end = time.monotonic() + deadline if deadline is not None else None
+
+        try:
+            while pending or next_index < len(items):
+                now = time.monotonic()
+                if end is not None and now >= end:
+                    break
+
+                # Wake up on the next completion (including a timed-out item
+                # finishing and freeing its slot), item timeout or the deadline
+                wake = [end] if end is not None else []
+                if item_timeout is not None:
+                    wake.extend(started[futures[f]] + item_timeout for f in pending if futures[f] in started)
+                    if not wake:
+                        wake.append(now + item_timeout)
+                done, _ = wait(
+                    pending | timed_out,
+                    timeout=max(0.05, min(wake) - now) if wake else None,
+                    return_when=FIRST_COMPLETED
+                )
+                timed_out -= done
+
+                for future in done & pending:
+                    pending.discard(future)
+                    try:
+                        results[futures[future]] = future.result()
+                    except Exception as e:
+                        print(f"[{label}] Error: {e}")
+
+                if item_timeout is not None:
+                    now = time.monotonic()
+                    for future in list(pending):
+                        index = futures[future]
+                        if index in started and now - started[index] > item_timeout:
+                            pending.discard(future)
+                            timed_out.add(future)
+                            print(f"[{label}] Timeout after {item_timeout}s for: {str(items[index])[:50]}...")
+
+                top_up()
+        finally:
+            unresolved = len(pending) + len(items) - next_index
+            if unresolved:
+                print(f"[{label}] Deadline of {deadline}s reached; {unresolved} items left unresolved")
+            for future in pending:
+                future.cancel()  # Only succeeds for items that haven't started
+
+        return results
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self._stats)
+            stats.update({
+                'workers': self.max_workers,
+                'queued': self._queued,
+                'active': self._active,
+                'utilization': round(self._active / self.max_workers, 2),
+                'busy_fraction': round(
+                    self._busy_seconds / (self.max_workers * max(time.time() - self._started, 1e-9)), 4
+                ),
+            })
+        return stats
+
+    # =========================================================================
+    # INTERNALS
+    # =========================================================================
+
+    def _run(self, fn: Callable, args: tuple, kwargs: dict) -> Any:
+        with self._lock:
+            self._queued -= 1
+            self._active += 1
+        self._local.inside = True
+        start = time.time()
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            self._local.inside = False
+            with self._lock:
+                self._active -= 1
+                self._busy_seconds += time.time() - start
+
+    def _on_done(self, future: Future) -> None:
+        with self._lock:
+            if future.cancelled():
+                # Never started, so _run didn't take it off the queue
+                self._queued -= 1
+                self._stats['cancelled'] += 1
+            elif future.exception() is not None:
+                self._stats['failed'] += 1
+            else:
+                self._stats['completed'] += 1
+
+    def _run_inline(self, fn: Callable, *args, **kwargs) -> Future:
+        with self._lock:
+            self._stats['inline'] += 1
+        future = Future()
+        try:
+            future.set_result(fn(*args, **kwargs))
+        except BaseException as e:
+            future.set_exception(e)
+        return future
+
+
+# =============================================================================
+# REGISTRY
+# =============================================================================
+
+_pools: Dict[str, Pool] = {name: Pool(name, size) for name, size in POOL_SIZES.items()}
+
+
+def get_pool(name: str) -> Pool:
+    """The named pool (KeyError for a name missing from config.POOL_SIZES)."""
+    return _pools[name]
+
+
+def submit(pool: str, fn: Callable, *args, **kwargs) -> Future:
+    """Shortcut for get_pool(pool).submit(fn, *args, **kwargs)."""
+    return _pools[pool].submit(fn, *args, **kwargs)
+
+
+def stats() -> Dict[str, Dict[str, Any]]:
+    """Usage counters for every pool."""
+    return {name: pool.stats() for name, pool in _pools.items()}
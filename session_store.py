@@ -0,0 +1,867 @@
+"""
+citeflex/session_store.py
+
+Disk persistence for SessionManager (app.py).
+
+Each session is stored as a small JSON record plus references. Large binary
+values (uploaded and processed .docx bytes) are written once to a shared,
+content-addressed blob store and referenced by hash, so saving a new
+'results' list or 'style' no longer re-serializes the documents.
+
+Two backends implement the SessionStore interface (select with
+SESSION_BACKEND):
+    file    - FileSessionStore (default)
+    sqlite  - SQLiteSessionStore: one WAL-mode database shared by all
+              gunicorn workers, one row per session key
+
+File backend layout under SESSIONS_DIR:
+    index.jsonl                  append-only session_id -> expiry/size index
+    blobs/ab/ab12...ef           sha256-addressed binary values (raw)
+    blobs/ab/ab12...ef.z         ... zlib-compressed, when that saves space
+    <session_id>/session.json    expiry, JSON-able keys, blob references
+    <session_id>/<key>.pkl       keys that are neither bytes nor JSON-able
+
+Version History:
+    2026-10-16: SQLiteSessionStore keeps a per-session revision; save() takes
+                expected_revision and raises StaleSessionError if another
+                worker saved the session first (compare-and-set)
+    2026-10-16: Blobs are zlib-compressed when it pays off; added
+                SessionStore.load_record() and BlobStore.stream_path() so
+                downloads can be served from disk without loading the session
+    2026-10-16: Added SessionStore interface and SQLiteSessionStore backend
+    2026-10-16: Added SessionIndex so startup reads one small file instead of
+                every session's payload
+    2026-10-16: Initial implementation - per-key persistence replacing the
+                single pickle per session that was rewritten on every set()
+"""
+
+import os
+import re
+import json
+import fcntl
+import pickle
+import shutil
+import zlib
+import hashlib
+import sqlite3
+import tempfile
+import threading
+import time
+from abc import ABC, abstractmethod
+from pathlib import Path
+from datetime import datetime
+from typing import Optional, Dict, Any, Iterable, Set, List
+
+
+# =============================================================================
+# HELPERS
+# =============================================================================
+
+def _atomic_write(path: Path, data: bytes) -> None:
+    """
+    Write bytes to path via temp file + fsync + rename.
+
+    Readers (including other gunicorn workers) see either the old file
+    or the new one, never a partial write.
+    """
+    fd, temp_path = tempfile.mkstemp(dir=path.parent, prefix='.', suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, path)
+    except Exception:
+        try:
+            os.unlink(temp_path)
+        except OSError:
+            pass
+        raise
+
+
+def _safe_key(key: str) -> str:
+    """Map a session key to a safe file name."""
+    return re.sub(r'[^A-Za-z0-9_.-]', '_', key)
+
+
+def _is_json_value(value: Any) -> bool:
+    """Check if a value survives a JSON round trip."""
+    try:
+        json.dumps(value)
+        return True
+    except (TypeError, ValueError):
+        return False
+
+
+# =============================================================================
+# BLOB STORE
+# =============================================================================
+
+class BlobStore:
+    """
+    Content-addressed storage for large binary session values.
+
+    Identical bytes are stored once no matter how many sessions (or keys)
+    reference them. Blobs are never modified after being written; unused
+    blobs are removed by sweep().
+
+    The digest is always of the uncompressed bytes. A blob is stored
+    zlib-compressed (with a '.z' suffix) only if that saves at least
+    MIN_COMPRESSION_SAVING; .docx files are already deflated zips, so they
+    normally stay raw and can be streamed straight from disk (stream_path).
+    """
+
+    # Don't sweep blobs younger than this - another worker may have written
+    # the blob but not yet committed the session record that references it.
+    SWEEP_GRACE_SECONDS = 10 * 60
+
+    COMPRESSED_SUFFIX = '.z'
+    COMPRESSION_LEVEL = 6
+    MIN_COMPRESSION_SAVING = 0.10  # Keep raw unless compression saves 10%+
+
+    def __init__(self, root: Path):
+        self.root = root
+
+    def path(self, digest: str) -> Path:
+        """Get the file path for an uncompressed blob."""
+        return self.root / digest[:2] / digest
+
+    def _compressed_path(self, digest: str) -> Path:
+        return self.root / digest[:2] / (digest + self.COMPRESSED_SUFFIX)
+
+    def locate(self, digest: str) -> Optional[Path]:
+        """Get the file holding a blob (raw or compressed), or None."""
+        for path in (self.path(digest), self._compressed_path(digest)):
+            if path.exists():
+                return path
+        return None
+
+    def stream_path(self, digest: str) -> Optional[Path]:
+        """Get the path of a blob stored uncompressed, i.e. servable as-is."""
+        path = self.path(digest)
+        return path if path.exists() else None
+
+    def put(self, data: bytes) -> str:
+        """
+        Store bytes and return their sha256 digest.
+
+        Skips the write entirely if the blob already exists.
+        """
+        digest = hashlib.sha256(data).hexdigest()
+        existing = self.locate(digest)
+        if existing is not None:
+            # Refresh mtime so a concurrent sweep treats it as recently used
+            try:
+                os.utime(existing)
+            except OSError:
+                pass
+            return digest
+
+        compressed = zlib.compress(data, self.COMPRESSION_LEVEL)
+        if len(compressed) <= len(data) * (1 - self.MIN_COMPRESSION_SAVING):
+            path, payload = self._compressed_path(digest), compressed
+        else:
+            path, payload = self.path(digest), data
+
+        path.parent.mkdir(parents=True, exist_ok=True)
+        _atomic_write(path, payload)
+        return digest
+
+    def get(self, digest: str) -> Optional[bytes]:
+        """Read a blob, or None if it doesn't exist."""
+        try:
+            return self.path(digest).read_bytes()
+        except FileNotFoundError:
+            pass
+        try:
+            return zlib.decompress(self._compressed_path(digest).read_bytes())
+        except FileNotFoundError:
+            return None
+
+    def sweep(self, live_digests: Set[str]) -> int:
+        """
+        Delete blobs not referenced by any live session.
+
+        Returns:
+            Number of blobs removed
+        """
+        if not self.root.exists():
+            return 0
+
+        removed = 0
+        cutoff = time.time() - self.SWEEP_GRACE_SECONDS
+
+        for path in self.root.glob('*/*'):
+            digest = path.name
+            if digest.endswith(self.COMPRESSED_SUFFIX):
+                digest = digest[:-len(self.COMPRESSED_SUFFIX)]
+            if path.name.startswith('.') or digest in live_digests:
+                continue
+            try:
+                if path.stat().st_mtime < cutoff:
+                    path.unlink()
+                    removed += 1
+            except OSError:
+                pass
+
+        return removed
+
+
+# =============================================================================
+# SESSION INDEX
+# =============================================================================
+
+class SessionIndex:
+    """
+    Append-only index of session_id -> {'expires_at': ts, 'size': bytes}.
+
+    Lets SessionManager learn which sessions exist (and which have expired)
+    at startup without reading any payloads. Each save appends one short
+    JSON line; deletions append a tombstone. compact() rewrites the file
+    with only live entries. Appends and compaction take an flock so
+    gunicorn workers sharing the volume don't interleave.
+
+    The index is a hint: a session missing from it is still found by
+    FileSessionStore.load(), and a missing index file is rebuilt from the
+    session records.
+    """
+
+    def __init__(self, path: Path):
+        self.path = path
+
+    def _append(self, entry: dict) -> None:
+        line = (json.dumps(entry) + '\n').encode('utf-8')
+        while True:
+            with open(self.path, 'ab') as f:
+                fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+                try:
+                    # compact() may have replaced the file while we waited
+                    # for the lock; appending to the old inode would be lost
+                    if os.fstat(f.fileno()).st_ino != os.stat(self.path).st_ino:
+                        continue
+                    f.write(line)
+                    return
+                finally:
+                    fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+    def record(self, session_id: str, expires_at: float, size: int) -> None:
+        """Record (or update) a session's expiry and on-disk size."""
+        self._append({'id': session_id, 'expires_at': expires_at, 'size': size})
+
+    def remove(self, session_id: str) -> None:
+        """Record that a session was deleted."""
+        self._append({'id': session_id, 'deleted': True})
+
+    def exists(self) -> bool:
+        return self.path.exists()
+
+    def read(self) -> Dict[str, dict]:
+        """Replay the index into {session_id: {'expires_at', 'size'}}."""
+        entries = {}
+        try:
+            with open(self.path, 'rb') as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        continue  # Torn line from a crash mid-append
+                    session_id = entry.get('id')
+                    if not session_id:
+                        continue
+                    if entry.get('deleted'):
+                        entries.pop(session_id, None)
+                    else:
+                        entries[session_id] = {
+                            'expires_at': entry.get('expires_at', 0),
+                            'size': entry.get('size', 0),
+                        }
+        except FileNotFoundError:
+            pass
+        return entries
+
+    def compact(self) -> Dict[str, dict]:
+        """
+        Rewrite the index with one line per live session.
+
+        Returns:
+            The compacted entries
+        """
+        with open(self.path, 'ab') as lock_file:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+            try:
+                entries = self.read()
+                lines = ''.join(
+                    json.dumps({'id': sid, **entry}) + '\n'
+                    for sid, entry in entries.items()
+                )
+                _atomic_write(self.path, lines.encode('utf-8'))
+            finally:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+        return entries
+
+
+# =============================================================================
+# STORE INTERFACE
+# =============================================================================
+
+class StaleSessionError(Exception):
+    """A conditional save() lost to a newer save of the same session."""
+
+
+class SessionStore(ABC):
+    """
+    Abstract base class for SessionManager persistence backends.
+
+    Backends shared between worker processes set TRACKS_REVISIONS and keep
+    a revision per session that every save() bumps; SessionManager uses it
+    to detect copies made stale by another worker.
+
+    Sessions are passed around in SessionManager's in-memory shape:
+        {
+            'created_at': datetime,
+            'expires_at': datetime,
+            'data': {key: value, ...},
+            'refs': {...}   # backend bookkeeping, optional
+        }
+    """
+
+    TRACKS_REVISIONS = False
+
+    @abstractmethod
+    def save(self, session_id: str, session: dict, keys: Optional[Iterable[str]] = None,
+             expected_revision: Optional[int] = None) -> Optional[int]:
+        """
+        Persist a session.
+
+        Args:
+            session_id: Session ID
+            session: In-memory session dict
+            keys: Data keys changed since the last save (None = all keys)
+            expected_revision: Revision the changes were made against; if the
+                stored revision differs, nothing is written and
+                StaleSessionError is raised (None = unconditional)
+
+        Returns:
+            The session's new revision, or None if the backend doesn't
+            track revisions
+        """
+        pass
+
+    def revision(self, session_id: str) -> Optional[int]:
+        """Current stored revision, or None if untracked or not stored."""
+        return None
+
+    @abstractmethod
+    def load(self, session_id: str) -> Optional[dict]:
+        """Load a session, or None if it isn't stored."""
+        pass
+
+    @abstractmethod
+    def load_record(self, session_id: str) -> Optional[dict]:
+        """
+        Load a session's metadata without reading any blobs or pickles.
+
+        Returns:
+            {'expires_at': timestamp, 'fields': {JSON-able keys},
+             'blobs': {key: sha256}}, or None if the session isn't stored
+        """
+        pass
+
+    @abstractmethod
+    def delete(self, session_id: str) -> None:
+        """Delete a session."""
+        pass
+
+    @abstractmethod
+    def index_entries(self) -> Dict[str, dict]:
+        """Get {session_id: {'expires_at', 'size'}} without loading payloads."""
+        pass
+
+    def expired_session_ids(self, now: float) -> List[str]:
+        """
+        List stored sessions whose expiry is before now (a Unix timestamp).
+        Override in backends that can answer this from an index.
+        """
+        return [
+            session_id for session_id, entry in self.index_entries().items()
+            if now > entry['expires_at']
+        ]
+
+    def compact_index(self) -> None:
+        """Tidy the session index. Override in backends that need it."""
+        pass
+
+    def sweep_blobs(self) -> int:
+        """Remove unreferenced blobs. Returns number removed."""
+        return 0
+
+
+# =============================================================================
+# FILE SESSION STORE
+# =============================================================================
+
+class FileSessionStore(SessionStore):
+    """
+    Per-key session persistence on the local filesystem.
+
+    The in-memory session dict managed by SessionManager looks like:
+        {
+            'created_at': datetime,
+            'expires_at': datetime,
+            'data': {key: value, ...},
+            'refs': {key: 'blob:<sha256>' or 'pickle'}   # maintained here
+        }
+
+    save() only writes the blobs/pickles for the keys that changed; the
+    JSON record (expiry + small keys + references) is committed atomically
+    once per save() call.
+    """
+
+    RECORD_NAME = 'session.json'
+    INDEX_NAME = 'index.jsonl'
+
+    def __init__(self, root: Path):
+        self.root = root
+        self.blobs = BlobStore(root / 'blobs')
+        self.index = SessionIndex(root / self.INDEX_NAME)
+
+    def _session_dir(self, session_id: str) -> Path:
+        return self.root / session_id
+
+    def _record_path(self, session_id: str) -> Path:
+        return self._session_dir(session_id) / self.RECORD_NAME
+
+    def save(self, session_id: str, session: dict, keys: Optional[Iterable[str]] = None,
+             expected_revision: Optional[int] = None) -> None:
+        """
+        Persist a session; only the changed keys' blobs/pickles are written.
+
+        Revisions aren't tracked (expected_revision is ignored).
+        """
+        changed = set(session['data']) if keys is None else set(keys)
+        refs = session.setdefault('refs', {})
+        session_dir = self._session_dir(session_id)
+        session_dir.mkdir(parents=True, exist_ok=True)
+
+        fields = {}
+        blobs = {}
+        pickled = []
+        size = 0
+
+        for key, value in session['data'].items():
+            ref = refs.get(key)
+
+            if key in changed or (ref is None and isinstance(value, (bytes, bytearray))):
+                if isinstance(value, (bytes, bytearray)):
+                    ref = 'blob:' + self.blobs.put(bytes(value))
+                elif _is_json_value(value):
+                    ref = None
+                else:
+                    _atomic_write(session_dir / f"{_safe_key(key)}.pkl", pickle.dumps(value))
+                    ref = 'pickle'
+
+                # Drop a stale per-key pickle if the key became JSON/bytes
+                if ref != 'pickle' and refs.get(key) == 'pickle':
+                    try:
+                        (session_dir / f"{_safe_key(key)}.pkl").unlink()
+                    except OSError:
+                        pass
+
+                if ref is None:
+                    refs.pop(key, None)
+                else:
+                    refs[key] = ref
+
+            if ref is None:
+                fields[key] = value
+            elif ref == 'pickle':
+                pickled.append(key)
+            else:
+                blobs[key] = ref[len('blob:'):]
+                size += len(value)
+
+        record = {
+            'created_at': session['created_at'].timestamp(),
+            'expires_at': session['expires_at'].timestamp(),
+            'fields': fields,
+            'blobs': blobs,
+            'pickled': pickled,
+        }
+        encoded = json.dumps(record).encode('utf-8')
+        _atomic_write(self._record_path(session_id), encoded)
+        self.index.record(session_id, record['expires_at'], size + len(encoded))
+
+    def load(self, session_id: str) -> Optional[dict]:
+        """
+        Load a session from disk.
+
+        Returns:
+            Session dict (same shape as SessionManager's), or None if absent
+        """
+        record = self._read_record(session_id)
+        if record is None:
+            return None
+
+        data = dict(record.get('fields', {}))
+        refs = {}
+
+        for key, digest in record.get('blobs', {}).items():
+            value = self.blobs.get(digest)
+            if value is None:
+                print(f"[SessionStore] Missing blob for {session_id[:8]}/{key}")
+                continue
+            data[key] = value
+            refs[key] = 'blob:' + digest
+
+        for key in record.get('pickled', []):
+            try:
+                with open(self._session_dir(session_id) / f"{_safe_key(key)}.pkl", 'rb') as f:
+                    data[key] = pickle.load(f)
+                refs[key] = 'pickle'
+            except Exception as e:
+                print(f"[SessionStore] Failed to load {session_id[:8]}/{key}: {e}")
+
+        return {
+            'created_at': datetime.fromtimestamp(record['created_at']),
+            'expires_at': datetime.fromtimestamp(record['expires_at']),
+            'data': data,
+            'refs': refs,
+        }
+
+    def _read_record(self, session_id: str) -> Optional[dict]:
+        """Read the JSON record for a session, or None if absent."""
+        try:
+            with open(self._record_path(session_id), 'rb') as f:
+                return json.loads(f.read())
+        except FileNotFoundError:
+            return None
+
+    def load_record(self, session_id: str) -> Optional[dict]:
+        record = self._read_record(session_id)
+        if record is None:
+            return None
+        return {
+            'expires_at': record['expires_at'],
+            'fields': record.get('fields', {}),
+            'blobs': record.get('blobs', {}),
+        }
+
+    def exists(self, session_id: str) -> bool:
+        return self._record_path(session_id).exists()
+
+    def delete(self, session_id: str) -> None:
+        """Delete a session's record and per-key files (blobs are swept later)."""
+        shutil.rmtree(self._session_dir(session_id), ignore_errors=True)
+        self.index.remove(session_id)
+
+    def session_ids(self) -> List[str]:
+        """List IDs of all sessions stored on disk."""
+        return [
+            path.parent.name
+            for path in self.root.glob(f"*/{self.RECORD_NAME}")
+            if path.parent.name != 'blobs'
+        ]
+
+    def index_entries(self) -> Dict[str, dict]:
+        """
+        Get {session_id: {'expires_at', 'size'}} for all stored sessions
+        without loading payloads.
+
+        Rebuilds the index from session records the first time (e.g. right
+        after upgrading from a version without an index).
+        """
+        if self.index.exists():
+            return self.index.read()
+
+        for session_id in self.session_ids():
+            try:
+                record = self._read_record(session_id)
+            except Exception:
+                continue
+            if record:
+                paths = [self.blobs.locate(digest) for digest in record.get('blobs', {}).values()]
+                size = sum(path.stat().st_size for path in paths if path is not None)
+                self.index.record(session_id, record['expires_at'], size)
+        return self.index.read()
+
+    def compact_index(self) -> None:
+        """Rewrite the index without tombstoned or superseded lines."""
+        if self.index.exists():
+            self.index.compact()
+
+    def sweep_blobs(self) -> int:
+        """
+        Remove blobs no longer referenced by any session record on disk.
+
+        Reads records from disk (not memory) so blobs referenced by other
+        workers' sessions are kept.
+        """
+        live = set()
+        for session_id in self.session_ids():
+            try:
+                record = self._read_record(session_id)
+            except Exception:
+                continue
+            if record:
+                live.update(record.get('blobs', {}).values())
+        return self.blobs.sweep(live)
+
+
+# =============================================================================
+# SQLITE SESSION STORE
+# =============================================================================
+
+class SQLiteSessionStore(SessionStore):
+    """
+    Session persistence in a single SQLite database in WAL mode.
+
+    All gunicorn workers open the same database file, so a session created
+    by one worker is visible to the others after one indexed lookup -
+    no per-worker pickle files to race on. Each session key is its own row
+    (upserted individually); document bytes are still kept in the shared
+    content-addressed BlobStore and referenced by digest, which keeps the
+    WAL small.
+
+    Each save() bumps the session's revision, and a save with
+    expected_revision only commits if nobody else saved in between - a
+    worker holding a stale in-memory copy can't overwrite another
+    worker's edits.
+
+    Schema:
+        sessions(session_id PK, created_at, expires_at [indexed], size, revision)
+        session_values(session_id, key, kind, value)   PK (session_id, key)
+            kind: 'json' (value = JSON text), 'pickle' (value = pickle
+            bytes) or 'blob' (value = sha256 digest in the BlobStore)
+    """
+
+    DB_NAME = 'sessions.db'
+    BUSY_TIMEOUT_MS = 5000
+    TRACKS_REVISIONS = True
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS sessions (
+            session_id TEXT PRIMARY KEY,
+            created_at REAL NOT NULL,
+            expires_at REAL NOT NULL,
+            size INTEGER NOT NULL DEFAULT 0,
+            revision INTEGER NOT NULL DEFAULT 0
+        );
+        CREATE INDEX IF NOT EXISTS idx_sessions_expires_at ON sessions(expires_at);
+        CREATE TABLE IF NOT EXISTS session_values (
+            session_id TEXT NOT NULL,
+            key TEXT NOT NULL,
+            kind TEXT NOT NULL,
+            value BLOB,
+            PRIMARY KEY (session_id, key)
+        ) WITHOUT ROWID;
+    """
+
+    def __init__(self, root: Path):
+        self.root = root
+        self.db_path = root / self.DB_NAME
+        self.blobs = BlobStore(root / 'blobs')
+        self._local = threading.local()
+
+        conn = self._conn()
+        conn.executescript(self.SCHEMA)
+        columns = {row[1] for row in conn.execute('PRAGMA table_info(sessions)')}
+        if 'revision' not in columns:
+            # Database created before revisions were tracked
+            conn.execute('ALTER TABLE sessions ADD COLUMN revision INTEGER NOT NULL DEFAULT 0')
+
+    def _conn(self) -> sqlite3.Connection:
+        """Get this thread's connection (sqlite3 connections aren't shareable)."""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(
+                str(self.db_path),
+                timeout=self.BUSY_TIMEOUT_MS / 1000,
+                isolation_level=None  # Explicit BEGIN/COMMIT below
+            )
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            conn.execute(f'PRAGMA busy_timeout={self.BUSY_TIMEOUT_MS}')
+            self._local.conn = conn
+        return conn
+
+    def save(self, session_id: str, session: dict, keys: Optional[Iterable[str]] = None,
+             expected_revision: Optional[int] = None) -> int:
+        """
+        Upsert the session row and one row per changed key in one transaction.
+
+        Raises:
+            StaleSessionError: expected_revision given and not the stored one
+        """
+        data = session['data']
+        changed = set(data) if keys is None else set(keys) & set(data)
+
+        # Serialize (and write blobs) before opening the write transaction
+        rows = []
+        for key in changed:
+            value = data[key]
+            if isinstance(value, (bytes, bytearray)):
+                rows.append((session_id, key, 'blob', self.blobs.put(bytes(value))))
+            elif _is_json_value(value):
+                rows.append((session_id, key, 'json', json.dumps(value)))
+            else:
+                rows.append((session_id, key, 'pickle', pickle.dumps(value)))
+
+        size = sum(len(v) for v in data.values() if isinstance(v, (bytes, bytearray)))
+
+        conn = self._conn()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            row = conn.execute(
+                'SELECT revision FROM sessions WHERE session_id = ?', (session_id,)
+            ).fetchone()
+            current = row[0] if row else 0
+            if expected_revision is not None and current != expected_revision:
+                raise StaleSessionError(
+                    f"session {session_id[:8]} is at revision {current}, not {expected_revision}"
+                )
+            revision = current + 1
+            conn.execute(
+                """INSERT INTO sessions (session_id, created_at, expires_at, size, revision)
+                   VALUES (?, ?, ?, ?, ?)
+                   ON CONFLICT(session_id) DO UPDATE SET
+                       expires_at = excluded.expires_at,
+                       size = excluded.size,
+                       revision = excluded.revision""",
+                (session_id, session['created_at'].timestamp(),
+                 session['expires_at'].timestamp(), size, revision)
+            )
+            conn.executemany(
+                """INSERT INTO session_values (session_id, key, kind, value)
+                   VALUES (?, ?, ?, ?)
+                   ON CONFLICT(session_id, key) DO UPDATE SET
+                       kind = excluded.kind,
+                       value = excluded.value""",
+                rows
+            )
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+        return revision
+
+    def revision(self, session_id: str) -> Optional[int]:
+        """One primary-key lookup; None if the session isn't stored."""
+        row = self._conn().execute(
+            'SELECT revision FROM sessions WHERE session_id = ?', (session_id,)
+        ).fetchone()
+        return row[0] if row else None
+
+    def load(self, session_id: str) -> Optional[dict]:
+        """Load a session with one indexed query."""
+        rows = self._conn().execute(
+            """SELECT s.created_at, s.expires_at, s.revision, v.key, v.kind, v.value
+               FROM sessions s
+               LEFT JOIN session_values v ON v.session_id = s.session_id
+               WHERE s.session_id = ?""",
+            (session_id,)
+        ).fetchall()
+        if not rows:
+            return None
+
+        data = {}
+        for _, _, _, key, kind, value in rows:
+            if key is None:
+                continue  # Session with no keys yet
+            try:
+                if kind == 'json':
+                    data[key] = json.loads(value)
+                elif kind == 'pickle':
+                    data[key] = pickle.loads(value)
+                elif kind == 'blob':
+                    blob = self.blobs.get(value)
+                    if blob is None:
+                        print(f"[SessionStore] Missing blob for {session_id[:8]}/{key}")
+                        continue
+                    data[key] = blob
+            except Exception as e:
+                print(f"[SessionStore] Failed to load {session_id[:8]}/{key}: {e}")
+
+        return {
+            'created_at': datetime.fromtimestamp(rows[0][0]),
+            'expires_at': datetime.fromtimestamp(rows[0][1]),
+            'data': data,
+            'revision': rows[0][2],
+        }
+
+    def load_record(self, session_id: str) -> Optional[dict]:
+        """Same query as load(), skipping pickled values and blob reads."""
+        rows = self._conn().execute(
+            """SELECT s.expires_at, v.key, v.kind, v.value
+               FROM sessions s
+               LEFT JOIN session_values v
+                   ON v.session_id = s.session_id AND v.kind != 'pickle'
+               WHERE s.session_id = ?""",
+            (session_id,)
+        ).fetchall()
+        if not rows:
+            return None
+
+        fields = {}
+        blobs = {}
+        for _, key, kind, value in rows:
+            if kind == 'json':
+                fields[key] = json.loads(value)
+            elif kind == 'blob':
+                blobs[key] = value
+
+        return {'expires_at': rows[0][0], 'fields': fields, 'blobs': blobs}
+
+    def delete(self, session_id: str) -> None:
+        conn = self._conn()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            conn.execute('DELETE FROM session_values WHERE session_id = ?', (session_id,))
+            conn.execute('DELETE FROM sessions WHERE session_id = ?', (session_id,))
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+
+    def index_entries(self) -> Dict[str, dict]:
+        rows = self._conn().execute('SELECT session_id, expires_at, size FROM sessions').fetchall()
+        return {
+            session_id: {'expires_at': expires_at, 'size': size}
+            for session_id, expires_at, size in rows
+        }
+
+    def expired_session_ids(self, now: float) -> List[str]:
+        """Uses the expires_at index - no full scan."""
+        rows = self._conn().execute(
+            'SELECT session_id FROM sessions WHERE expires_at < ?', (now,)
+        ).fetchall()
+        return [row[0] for row in rows]
+
+    def sweep_blobs(self) -> int:
+        rows = self._conn().execute(
+            "SELECT DISTINCT value FROM session_values WHERE kind = 'blob'"
+        ).fetchall()
+        return self.blobs.sweep({row[0] for row in rows})
+
+
+# =============================================================================
+# FACTORY
+# =============================================================================
+
+SESSION_BACKENDS = {
+    'file': FileSessionStore,
+    'sqlite': SQLiteSessionStore,
+}
+
+
+def create_session_store(root: Path, backend: str = 'file') -> SessionStore:
+    """
+    Create a session store.
+
+    Args:
+        root: Storage directory (SESSIONS_DIR)
+        backend: 'file' or 'sqlite'
+    """
+    store_class = SESSION_BACKENDS.get(backend.lower())
+    if store_class is None:
+        raise ValueError(f"Unknown session backend '{backend}' (expected one of: {', '.join(SESSION_BACKENDS)})")
+    return store_class(root)
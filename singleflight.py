@@ -0,0 +1,191 @@
+"""
+citeflex/singleflight.py
+
+Single-flight coalescing of identical in-flight lookups.
+
+Document processing resolves notes concurrently, and manuscripts cite the
+same sources over and over: a 200-note document that cites one book 15
+times used to send 15 identical searches to Google Books, LoC and Open
+Library at once. With single-flight, the first caller for a key does the
+work and every concurrent caller with the same key waits for its result.
+
+Nothing is cached once the call finishes - that's the job of
+citation_cache / engines.http_cache / engines.doi_store. This only
+collapses calls that overlap in time (across threads of one worker).
+
+If the call hit a failed or skipped upstream (lookup_status), callers
+that joined it report that to their own lookup too, so none of them
+negative-caches a result that isn't definitive.
+
+Waiting is bounded: a caller whose leader hasn't finished within
+SINGLEFLIGHT_WAIT_SECONDS stops waiting and makes the call itself, so a
+hung upstream request can't block every coalesced caller indefinitely.
+
+Callers that joined an in-flight call get a deep copy of the result, so
+code that tags results afterwards (result.source_engine = ..., result.url
+= ...) can't affect anyone else. Exceptions are re-raised in every caller.
+
+Usage:
+    from singleflight import coalesced, normalize_key
+
+    @coalesced('GoogleBooks.search')
+    def search(query): ...
+
+    # or explicitly
+    flights.do(('get_citation', key), route_citation, query, style)
+
+Version History:
+    2026-10-16: Followers wait at most SINGLEFLIGHT_WAIT_SECONDS, then call directly
+    2026-10-16: Followers inherit the leader's lookup_status failures
+    2026-10-16: Initial implementation
+"""
+
+import os
+import copy
+import functools
+import threading
+from typing import Any, Callable, Dict, Hashable
+
+from lookup_status import track, mark_incomplete
+
+
+# How long a caller waits on someone else's in-flight call before making its own
+SINGLEFLIGHT_WAIT_SECONDS = float(os.environ.get('SINGLEFLIGHT_WAIT_SECONDS', '30'))
+
+
+def normalize_key(text: Any) -> Any:
+    """Collapse whitespace and case so trivially different queries share a flight."""
+    if isinstance(text, str):
+        return ' '.join(text.split()).casefold()
+    return text
+
+
+class _Flight:
+    """One in-progress call."""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.waiters = 0
+        self.result: Any = None
+        self.error: BaseException = None
+        self.complete = True  # Every upstream the call asked answered
+
+
+class SingleFlight:
+    """
+    Registry of in-flight calls keyed by an arbitrary hashable key.
+
+    Re-entrant: if the thread already running the call for a key asks for
+    the same key again (e.g. a subclass search() delegating to its
+    parent's), the inner call runs directly instead of waiting on itself.
+    """
+
+    def __init__(self, wait_timeout: float = SINGLEFLIGHT_WAIT_SECONDS):
+        self.wait_timeout = wait_timeout
+        self._lock = threading.Lock()
+        self._flights: Dict[Hashable, _Flight] = {}
+        self._local = threading.local()
+        self._stats = {'calls': 0, 'coalesced': 0, 'wait_timeouts': 0}
+
+    def do(self, key: Hashable, fn: Callable, *args, **kwargs) -> Any:
+        """
+        Call fn(*args, **kwargs), or wait for an identical in-flight call.
+
+        Args:
+            key: Identifies calls that are interchangeable
+            fn: The call to make
+
+        Returns:
+            fn's result (a private copy for callers that waited). A caller
+            that waited longer than wait_timeout gets the result of its
+            own direct call instead.
+        """
+        held = self._held()
+        if key in held:
+            return fn(*args, **kwargs)
+
+        with self._lock:
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+                self._stats['calls'] += 1
+            else:
+                flight.waiters += 1
+                self._stats['coalesced'] += 1
+
+        if not leader:
+            if not flight.done.wait(self.wait_timeout):
+                with self._lock:
+                    self._stats['wait_timeouts'] += 1
+                print(f"[SingleFlight] {key!r} still running after {self.wait_timeout:g}s - calling directly")
+                return fn(*args, **kwargs)
+            if not flight.complete:
+                mark_incomplete(f"coalesced call {key!r} incomplete")
+            if flight.error is not None:
+                raise flight.error
+            return copy.deepcopy(flight.result)
+
+        held.add(key)
+        status = None
+        try:
+            with track() as status:
+                flight.result = fn(*args, **kwargs)
+        except BaseException as e:
+            flight.error = e
+            raise
+        finally:
+            flight.complete = status is not None and status.complete
+            held.discard(key)
+            with self._lock:
+                self._flights.pop(key, None)
+                shared = flight.waiters > 0
+            flight.done.set()
+
+        # Waiters copy flight.result; give the leader its own copy so it can
+        # modify the result while they do
+        return copy.deepcopy(flight.result) if shared else flight.result
+
+    def _held(self) -> set:
+        held = getattr(self._local, 'held', None)
+        if held is None:
+            held = self._local.held = set()
+        return held
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            stats = dict(self._stats)
+            stats['in_flight'] = len(self._flights)
+        return stats
+
+
+# Global instance (per worker process)
+flights = SingleFlight()
+
+
+def coalesced(namespace: str, key: Callable[..., Hashable] = None):
+    """
+    Decorator: coalesce concurrent calls with the same arguments.
+
+    Args:
+        namespace: Prefix distinguishing this function's keys from others'
+        key: Optional function of the call's arguments returning the key
+             (default: all arguments, strings normalized with normalize_key)
+    """
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if key is not None:
+                call_key = (namespace, key(*args, **kwargs))
+            else:
+                call_key = (namespace,
+                            tuple(normalize_key(a) for a in args),
+                            tuple(sorted((k, normalize_key(v)) for k, v in kwargs.items())))
+            try:
+                hash(call_key)
+            except TypeError:
+                return fn(*args, **kwargs)
+            return flights.do(call_key, fn, *args, **kwargs)
+        wrapper.__coalesced__ = True
+        return wrapper
+    return decorator
@@ -0,0 +1,126 @@
+"""
+citeflex/sqlite_db.py
+
+Lazily opened SQLite databases shared by all gunicorn workers.
+
+citation_cache, engines.http_cache, engines.doi_store, engines.ai_cache
+and engines.rate_limit each keep a small table under CITATION_CACHE_DIR.
+They used to carry their own copy of the connection boilerplate and
+created their database when the module was imported. SQLiteDB does it
+once:
+
+    - Opened on first use, not at import: importing a module (or forking
+      workers after gunicorn --preload) doesn't touch the disk
+    - Falls back to <tmp>/citeflex-cache if the directory isn't writable;
+      if neither works, available is False and the owner runs without it
+    - One connection per thread, never reused across a fork; WAL journal,
+      synchronous=NORMAL and autocommit (isolation_level=None - use an
+      explicit BEGIN for transactions)
+
+Usage:
+    from sqlite_db import SQLiteDB
+
+    db = SQLiteDB('citations.db', CACHE_DIR, SCHEMA, owner='CitationCache')
+
+    if db.available:
+        row = db.conn().execute('SELECT ...').fetchone()
+
+Version History:
+    2026-10-16: Initial implementation
+"""
+
+import os
+import sqlite3
+import tempfile
+import threading
+from pathlib import Path
+from typing import Optional
+
+
+FALLBACK_DIR = Path(tempfile.gettempdir()) / 'citeflex-cache'
+
+
+class SQLiteDB:
+    """
+    One database file plus per-thread connections to it.
+
+    Thread-safe. Opening (directory creation + schema) happens once per
+    process, on the first call to available or conn().
+    """
+
+    def __init__(self, name: str, directory: Path, schema: str, owner: str,
+                 busy_timeout_ms: int = 2000):
+        """
+        Args:
+            name: Database file name, e.g. 'citations.db'
+            directory: Preferred directory (created if missing)
+            schema: CREATE ... IF NOT EXISTS statements, run on open
+            owner: Class name used in log lines
+            busy_timeout_ms: How long a write waits for another writer
+        """
+        self.name = name
+        self.directory = Path(directory)
+        self.schema = schema
+        self.owner = owner
+        self.busy_timeout_ms = busy_timeout_ms
+        self.path: Optional[Path] = None
+
+        self._opened = False
+        self._open_lock = threading.Lock()
+        self._local = threading.local()
+
+    @property
+    def available(self) -> bool:
+        """Whether the database exists and is usable (opens it on first use)."""
+        if not self._opened:
+            self._open()
+        return self.path is not None
+
+    def conn(self) -> sqlite3.Connection:
+        """
+        Get this thread's connection.
+
+        Raises:
+            sqlite3.OperationalError: The database couldn't be created
+        """
+        if not self.available:
+            raise sqlite3.OperationalError(f"{self.name}: no writable directory")
+        return self._connect()
+
+    # =========================================================================
+    # INTERNALS
+    # =========================================================================
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or getattr(self._local, 'pid', None) != os.getpid():
+            conn = sqlite3.connect(
+                str(self.path),
+                timeout=self.busy_timeout_ms / 1000,
+                isolation_level=None
+            )
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def _open(self) -> None:
+        """Create the database, falling back to FALLBACK_DIR."""
+        with self._open_lock:
+            if self._opened:
+                return
+            for directory in (self.directory, FALLBACK_DIR):
+                try:
+                    directory.mkdir(parents=True, exist_ok=True)
+                    self.path = directory / self.name
+                    self._connect().executescript(self.schema)
+                    print(f"[{self.owner}] Using {self.path}")
+                    break
+                except Exception as e:
+                    print(f"[{self.owner}] Cannot use {directory}: {e}")
+                    self.path = None
+                    self._local = threading.local()
+            if self.path is None:
+                print(f"[{self.owner}] No writable directory - running without {self.name}")
+            self._opened = True
@@ -4,6 +4,21 @@ citeflex/unified_router.py
 Unified routing logic combining the best of CiteFlex Pro and Cite Fix Pro.
 
 Version History:
+    2026-10-16 V3.11: Misses are only negatively cached when every engine asked gave an
+                      answer - timeouts, errors, 5xx/429 and skipped requests
+                      (lookup_status) leave the miss uncached
+    2026-10-16 V3.10: _route_journal fan-out runs on the process-wide 'network' pool (scheduler.py)
+    2026-10-16 V3.9: _route_journal fans out on a shared executor and returns on the first
+                     result with a DOI and matching title; remaining engines are cancelled
+                     or abandoned instead of holding up the response
+    2026-10-16 V3.8: _route_journal consults the local Crossref/OpenAlex snapshot
+                     (engines/snapshot.py) before the network engines
+    2026-10-16 V3.7: get_citation() coalesces concurrent identical lookups (singleflight.py)
+    2026-10-16 V3.6: All DOI lookups (_route_journal, _route_url, get_multiple_citations)
+                     go through engines.doi_store - one cached, coalesced Crossref fetch per DOI
+    2026-10-16 V3.5: route_citation checks the persistent citation_cache (normalized
+                     query -> CitationMetadata, shared across workers) before any
+                     detection or search; misses are negatively cached
     2025-12-06 13:45 V3.4: Added citation parser to extract metadata from already-formatted
                            citations. Reformats without database search when citation is complete.
                            Preserves authoritative content while applying consistent style.
@@ -36,28 +51,35 @@ KEY IMPROVEMENTS OVER ORIGINAL router.py:
 
 ARCHITECTURE:
 - Wrapper classes convert superlegal.py/books.py dicts → CitationMetadata
-- Parallel execution via ThreadPoolExecutor (12s timeout)
+- Parallel execution on the shared 'network' pool (12s deadline, early exit on a confident result)
 - Routing priority: Legal → URL handling → Parallel search → Fallback
 """
 
 import re
+import time
 from typing import Optional, Tuple, List
-from concurrent.futures import ThreadPoolExecutor, as_completed, TimeoutError as FuturesTimeout
+from concurrent.futures import wait, FIRST_COMPLETED
 
 from models import CitationMetadata, CitationType
 from config import NEWSPAPER_DOMAINS, GOV_AGENCY_MAP
 from detectors import detect_type, DetectionResult, is_url
 from extractors import extract_by_type
 from formatters.base import get_formatter
+from citation_cache import citation_cache, normalize_query
+from singleflight import flights
+from scheduler import submit
+from lookup_status import track, mark_incomplete
 
 # Import CiteFlex Pro engines
 from engines.academic import CrossrefEngine, OpenAlexEngine, SemanticScholarEngine, PubMedEngine
 from engines.doi import extract_doi_from_url, is_academic_publisher_url
+from engines.doi_store import get_by_doi
+from engines.snapshot import SnapshotEngine
 
 # Import Cite Fix Pro modules (now in engines/)
 from engines import superlegal
 from engines import books
-from engines.famous_papers import find_famous_paper
+from engines.famous_papers import find_famous_paper, tokenize
 
 # =============================================================================
 # AI ROUTER CONFIGURATION (Claude primary, Gemini fallback)
@@ -114,6 +136,11 @@ else:
 PARALLEL_TIMEOUT = 12  # seconds
 MAX_WORKERS = 4
 
+
+# Share of a result title's words that must appear in the query for an
+# early exit
+EARLY_EXIT_TITLE_COVERAGE = 0.6
+
 # Medical domains that should NOT route to government engine
 MEDICAL_DOMAINS = ['pubmed', 'ncbi.nlm.nih.gov', 'nih.gov/health', 'medlineplus']
 
@@ -126,6 +153,7 @@ _crossref = CrossrefEngine()
 _openalex = OpenAlexEngine()
 _semantic = SemanticScholarEngine()
 _pubmed = PubMedEngine()
+_snapshot = SnapshotEngine()
 
 
 # =============================================================================
@@ -618,6 +646,7 @@ def _route_legal(query: str) -> Optional[CitationMetadata]:
             return _legal_dict_to_metadata(data, query)
     except Exception as e:
         print(f"[UnifiedRouter] Legal search error: {e}")
+        mark_incomplete(f"legal: {e}")
     
     return None
 
@@ -641,6 +670,7 @@ def _route_book(query: str) -> Optional[CitationMetadata]:
             return _book_dict_to_metadata(results[0], query)
     except Exception as e:
         print(f"[UnifiedRouter] Book search error: {e}")
+        mark_incomplete(f"books: {e}")
     
     return None
 
@@ -649,10 +679,22 @@ def _route_book(query: str) -> Optional[CitationMetadata]:
 # UNIFIED JOURNAL SEARCH (parallel execution)
 # =============================================================================
 
+def _title_matches_query(title: str, query: str) -> bool:
+    """True if most of title's content words appear in the query."""
+    title_words = set(tokenize(title or ''))
+    if not title_words:
+        return False
+    query_words = set(tokenize(query))
+    return len(title_words & query_words) / len(title_words) >= EARLY_EXIT_TITLE_COVERAGE
+
+
 def _route_journal(query: str) -> Optional[CitationMetadata]:
     """
     Route journal/academic queries using parallel API execution.
     
+    The local snapshot (engines/snapshot.py) is tried before any network
+    engine; it's used when it has the DOI or a match >= SNAPSHOT_MIN_SCORE.
+    
     Engines tried (in parallel):
     1. Crossref - best for DOIs, formal citations
     2. OpenAlex - good coverage, fast
@@ -663,45 +705,74 @@ def _route_journal(query: str) -> Optional[CitationMetadata]:
     famous = find_famous_paper(query)
     if famous:
         try:
-            result = _crossref.get_by_id(famous["doi"])
+            result = get_by_doi(famous["doi"])
             if result:
                 print("[UnifiedRouter] Found via Famous Papers cache")
                 return result
-        except Exception:
-            pass
+        except Exception as e:
+            mark_incomplete(f"famous paper DOI: {e}")
     
     # Check for DOI in query (instant lookup)
     doi_match = re.search(r'(10\.\d{4,}/[^\s]+)', query)
     if doi_match:
         doi = doi_match.group(1).rstrip('.,;')
         try:
-            result = _crossref.get_by_id(doi)
+            result = _snapshot.get_by_id(doi) or get_by_doi(doi)
             if result:
                 print("[UnifiedRouter] Found via direct DOI lookup")
                 return result
-        except Exception:
-            pass
+        except Exception as e:
+            mark_incomplete(f"DOI lookup: {e}")
     
-    # Parallel search across academic engines
+    # Local snapshot before the network
+    try:
+        result = _snapshot.search(query)
+        if result:
+            print("[UnifiedRouter] Found in local snapshot")
+            return result
+    except Exception:
+        pass
+    
+    # Parallel search across academic engines. A result with a DOI whose
+    # title matches the query is returned as soon as it arrives; the other
+    # engines' futures are cancelled if not started, otherwise abandoned.
     results = []
     
-    with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
-        futures = {
-            executor.submit(_crossref.search, query): "Crossref",
-            executor.submit(_openalex.search, query): "OpenAlex",
-            executor.submit(_semantic.search, query): "Semantic Scholar",
-            executor.submit(_pubmed.search, query): "PubMed",
-        }
-        
-        for future in as_completed(futures, timeout=PARALLEL_TIMEOUT):
-            engine_name = futures[future]
-            try:
-                result = future.result(timeout=2)
+    futures = {
+        submit('network', _crossref.search, query): "Crossref",
+        submit('network', _openalex.search, query): "OpenAlex",
+        submit('network', _semantic.search, query): "Semantic Scholar",
+        submit('network', _pubmed.search, query): "PubMed",
+    }
+    pending = set(futures)
+    deadline = time.monotonic() + PARALLEL_TIMEOUT
+    
+    try:
+        while pending:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                print(f"[UnifiedRouter] Journal search timed out; {len(pending)} engines abandoned")
+                for future in pending:
+                    mark_incomplete(f"{futures[future]}: no answer in {PARALLEL_TIMEOUT}s")
+                break
+            done, pending = wait(pending, timeout=remaining, return_when=FIRST_COMPLETED)
+            
+            for future in done:
+                engine_name = futures[future]
+                try:
+                    result = future.result()
+                except Exception as e:
+                    mark_incomplete(f"{engine_name}: {e}")
+                    continue
                 if result and result.has_minimum_data():
                     result.source_engine = engine_name
                     results.append(result)
-            except Exception:
-                pass
+                    if result.doi and _title_matches_query(result.title, query):
+                        print(f"[UnifiedRouter] Early exit on {engine_name} result")
+                        return result
+    finally:
+        for future in pending:
+            future.cancel()
     
     # Return best result (prefer one with DOI)
     if results:
@@ -739,7 +810,7 @@ def _route_url(url: str) -> Optional[CitationMetadata]:
     doi = extract_doi_from_url(url)
     if doi:
         try:
-            result = _crossref.get_by_id(doi)
+            result = get_by_doi(doi)
             if result and result.has_minimum_data():
                 result.url = url
                 return result
@@ -751,7 +822,7 @@ def _route_url(url: str) -> Optional[CitationMetadata]:
     if doi_match:
         doi = doi_match.group(1).rstrip('.,;')
         try:
-            result = _crossref.get_by_id(doi)
+            result = get_by_doi(doi)
             if result and result.has_minimum_data():
                 result.url = url
                 print("[UnifiedRouter] Found via DOI in URL path")
@@ -797,13 +868,16 @@ def route_citation(query: str, style: str = "chicago") -> Tuple[Optional[Citatio
     If the citation is complete (has author, title, journal/publisher, year),
     it reformats without searching databases. This preserves authoritative
     content while applying consistent style formatting.
+    
+    NEW (V3.5): Resolved metadata (or a miss) is cached per normalized query
+    in citation_cache, so repeat lookups skip detection and searching.
+    A miss is only cached if every engine asked actually answered.
     """
     query = query.strip()
     if not query:
         return None, ""
     
     formatter = get_formatter(style)
-    metadata = None
     
     # 0. TRY PARSING FIRST: If citation is already complete, just reformat
     # This preserves user's authoritative content while applying style
@@ -812,17 +886,42 @@ def route_citation(query: str, style: str = "chicago") -> Tuple[Optional[Citatio
         print(f"[UnifiedRouter] Parsed complete citation: {parsed.citation_type.name}")
         return parsed, formatter.format(parsed)
     
+    # Cached resolution (style-independent) - formatting is the only work left
+    found, metadata = citation_cache.get(query)
+    if not found:
+        with track() as status:
+            metadata = _resolve_metadata(query)
+        if metadata is not None or status.complete:
+            citation_cache.put(query, metadata)
+        else:
+            print(f"[UnifiedRouter] Not caching miss - {len(status.failures)} upstream calls failed: "
+                  f"{status.failures[0]}")
+    
+    # Format and return
+    if metadata:
+        return metadata, formatter.format(metadata)
+    
+    return None, ""
+
+
+def _resolve_metadata(query: str) -> Optional[CitationMetadata]:
+    """
+    Route a query to the appropriate engines and return its metadata
+    (uncached - see route_citation).
+    """
+    metadata = None
+    
     # 1. Check for legal citation FIRST (superlegal.py handles famous cases)
     if superlegal.is_legal_citation(query):
         metadata = _route_legal(query)
         if metadata:
-            return metadata, formatter.format(metadata)
+            return metadata
     
     # 2. Check for URL
     if is_url(query):
         metadata = _route_url(query)
         if metadata:
-            return metadata, formatter.format(metadata)
+            return metadata
     
     # 3. Detect type using standard detectors
     detection = detect_type(query)
@@ -880,11 +979,7 @@ def route_citation(query: str, style: str = "chicago") -> Tuple[Optional[Citatio
         if not metadata:
             metadata = _route_journal(query)
     
-    # Format and return
-    if metadata:
-        return metadata, formatter.format(metadata)
-    
-    return None, ""
+    return metadata
 
 
 # =============================================================================
@@ -922,7 +1017,7 @@ def get_multiple_citations(query: str, style: str = "chicago", limit: int = 5) -
         doi = extract_doi_from_url(query)
         if doi:
             try:
-                result = _crossref.get_by_id(doi)
+                result = get_by_doi(doi)
                 if result and result.has_minimum_data():
                     result.url = query
                     formatted = formatter.format(result)
@@ -1341,8 +1436,13 @@ def get_parenthetical_metadata(
 
 # Alias for app.py compatibility
 def get_citation(query: str, style: str = "chicago") -> Tuple[Optional[CitationMetadata], str]:
-    """Alias for route_citation() - backward compatibility."""
-    return route_citation(query, style)
+    """
+    Alias for route_citation() - backward compatibility.
+    
+    Concurrent calls for the same (normalized) query and style are
+    coalesced into one route_citation() call.
+    """
+    return flights.do(("get_citation", normalize_query(query), style), route_citation, query, style)
 
 
 def search_citation(query: str) -> List[dict]: